@@ -1,6 +1,7 @@
 """App configuration for the API app."""
 
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 
 class ApiConfig(AppConfig):
@@ -8,3 +9,44 @@ class ApiConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self) -> None:
+        """Count the changes to the versioned models and log the journaled ones."""
+        from api.models import (
+            JOURNALED_MODELS,
+            VERSIONED_MODELS,
+            journal_delete,
+            journal_relation_change,
+            journal_save,
+            record_change,
+            record_relation_change,
+        )
+
+        for label in VERSIONED_MODELS:
+            model = apps.get_model(label)
+            post_save.connect(
+                record_change, sender=model, dispatch_uid=f"version_save_{label}"
+            )
+            post_delete.connect(
+                record_change, sender=model, dispatch_uid=f"version_delete_{label}"
+            )
+            for field in model._meta.local_many_to_many:
+                m2m_changed.connect(
+                    record_relation_change,
+                    sender=field.remote_field.through,
+                    dispatch_uid=f"version_m2m_{label}_{field.name}",
+                )
+        for label in JOURNALED_MODELS:
+            model = apps.get_model(label)
+            post_save.connect(
+                journal_save, sender=model, dispatch_uid=f"journal_save_{label}"
+            )
+            post_delete.connect(
+                journal_delete, sender=model, dispatch_uid=f"journal_delete_{label}"
+            )
+            for field in model._meta.local_many_to_many:
+                m2m_changed.connect(
+                    journal_relation_change,
+                    sender=field.remote_field.through,
+                    dispatch_uid=f"journal_m2m_{label}_{field.name}",
+                )
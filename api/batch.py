@@ -0,0 +1,538 @@
+"""Batch writes for the API app."""
+
+from typing import Any, Iterable, Optional
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import ProtectedError, RestrictedError
+from rest_framework import serializers, status
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueValidator
+
+from api.models import bump_model_versions, record_changes
+
+BATCH_LIMIT = 5000
+BATCH_SIZE = 500
+
+# Position in the request, row being updated or None and the item's values.
+BatchRow = tuple[int, Optional[models.Model], dict[str, Any]]
+
+
+class BatchPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field that reads related rows fetched once for a whole batch."""
+
+    def __init__(self, **kwargs) -> None:
+        """
+        Initialise BatchPrimaryKeyRelatedField.
+
+        Args:
+            kwargs: Field options
+        """
+        super().__init__(**kwargs)
+        self.batch_objects: Optional[dict[str, models.Model]] = None
+
+    def to_internal_value(self, data: Any) -> models.Model:
+        """
+        Find the related row for a primary key.
+
+        Args:
+            data: Primary key from the request
+
+        Returns:
+            Related row
+        """
+        if self.batch_objects is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool) or not isinstance(data, (int, str)):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return self.batch_objects[str(data)]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+
+    def prefetch(self, values: Iterable[Any]) -> None:
+        """
+        Fetch the related rows for every primary key in the batch in one query.
+
+        Args:
+            values: Primary keys from the request
+        """
+        pk_field = self.get_queryset().model._meta.pk
+        keys = set()
+        for value in values:
+            if isinstance(value, bool) or not isinstance(value, (int, str)):
+                continue
+            try:
+                keys.add(pk_field.to_python(value))
+            except DjangoValidationError:
+                continue
+        self.batch_objects = {
+            str(related.pk): related
+            for related in self.get_queryset().filter(pk__in=keys)
+        }
+
+
+class BatchSerializer(serializers.ModelSerializer):
+    """
+    Model serializer for batch writes.
+
+    Relations are read from rows fetched once per batch and uniqueness is
+    checked for the whole batch by BatchWrite, so validating an item makes no
+    queries.
+    """
+
+    serializer_related_field = BatchPrimaryKeyRelatedField
+
+    def build_standard_field(self, field_name, model_field) -> tuple:
+        """
+        Build a field without its per item unique validator.
+
+        Args:
+            field_name: Name of the serializer field
+            model_field: Model field it maps to
+
+        Returns:
+            Field class and keyword arguments
+        """
+        field_class, field_kwargs = super().build_standard_field(
+            field_name, model_field
+        )
+        field_kwargs["validators"] = [
+            validator
+            for validator in field_kwargs.get("validators", [])
+            if not isinstance(validator, UniqueValidator)
+        ]
+        return field_class, field_kwargs
+
+    def get_validators(self) -> list:
+        """
+        Leave unique together checks to BatchWrite.
+
+        Returns:
+            Empty list of validators
+        """
+        return []
+
+
+class BatchWrite:
+    """
+    Class to create, update or delete many rows in a single transaction.
+
+    Items are validated in one pass before anything is written. If any item is
+    invalid nothing is written and every item's result is returned.
+    """
+
+    __slots__ = ["_model", "_serializer"]
+
+    def __init__(
+        self,
+        serializer_class: type[BatchSerializer],
+        context: dict[str, Any],
+        partial: bool = False,
+    ) -> None:
+        """
+        Initialise BatchWrite.
+
+        Args:
+            serializer_class: Serializer to validate each item with
+            context: Serializer context
+            partial: True if items only hold the fields being changed
+        """
+        self._model: type[models.Model] = serializer_class.Meta.model
+        self._serializer = serializer_class(context=context, partial=partial)
+
+    def create(self, items: list[Any]) -> tuple[int, list[dict[str, Any]]]:
+        """
+        Create a row for each item.
+
+        Args:
+            items: Values for the new rows
+
+        Returns:
+            HTTP status code and the result for each item
+        """
+        rows: list[BatchRow] = [(index, None, item) for index, item in enumerate(items)]
+        with transaction.atomic():
+            validated, results = self._validate(rows=rows, count=len(items))
+            if validated is None:
+                return status.HTTP_400_BAD_REQUEST, results
+            try:
+                instances = self._insert(validated)
+            except IntegrityError as exc:
+                transaction.set_rollback(True)
+                return status.HTTP_409_CONFLICT, [
+                    {"status": "error", "error": str(exc)}
+                ]
+        return status.HTTP_201_CREATED, [
+            {"index": index, "status": "created", "id": instance.pk}
+            for index, instance in enumerate(instances)
+        ]
+
+    def update(self, items: list[Any]) -> tuple[int, list[dict[str, Any]]]:
+        """
+        Update the row identified by each item's id.
+
+        Args:
+            items: Changed values and the id of the row to change
+
+        Returns:
+            HTTP status code and the result for each item
+        """
+        keys = [
+            self._key(item.get("id") if isinstance(item, dict) else None)
+            for item in items
+        ]
+        with transaction.atomic():
+            instances = self._model.objects.select_for_update().in_bulk(
+                {key for key in keys if key is not None}
+            )
+            rows: list[BatchRow] = []
+            missing: dict[int, dict[str, list[str]]] = {}
+            seen = set()
+            for index, (key, item) in enumerate(zip(keys, items)):
+                if key not in instances or key in seen:
+                    message = "Not found." if key not in instances else "Duplicate id."
+                    missing[index] = {"id": [message]}
+                    continue
+                seen.add(key)
+                rows.append((index, instances[key], item))
+            validated, results = self._validate(
+                rows=rows, count=len(items), errors=missing
+            )
+            if validated is None:
+                return status.HTTP_400_BAD_REQUEST, results
+            try:
+                self._save(rows=rows, validated=validated)
+            except IntegrityError as exc:
+                transaction.set_rollback(True)
+                return status.HTTP_409_CONFLICT, [
+                    {"status": "error", "error": str(exc)}
+                ]
+        return status.HTTP_200_OK, [
+            {"index": index, "status": "updated", "id": instance.pk}
+            for index, instance, _ in rows
+        ]
+
+    def delete(self, items: list[Any]) -> tuple[int, list[dict[str, Any]]]:
+        """
+        Delete the rows with the given ids.
+
+        Args:
+            items: Ids, or objects holding an id, of the rows to delete
+
+        Returns:
+            HTTP status code and the result for each item
+        """
+        keys = [
+            self._key(item.get("id") if isinstance(item, dict) else item)
+            for item in items
+        ]
+        with transaction.atomic():
+            rows = self._model.objects.filter(
+                pk__in={key for key in keys if key is not None}
+            )
+            found = set(rows.values_list("pk", flat=True))
+            try:
+                rows.delete()
+            except (ProtectedError, RestrictedError) as exc:
+                transaction.set_rollback(True)
+                return status.HTTP_409_CONFLICT, [
+                    {"status": "error", "error": exc.args[0]}
+                ]
+        return status.HTTP_200_OK, [
+            {
+                "index": index,
+                "status": "deleted" if key in found else "not_found",
+                "id": key,
+            }
+            for index, key in enumerate(keys)
+        ]
+
+    def _key(self, value: Any) -> Any:
+        """
+        Convert an id from the request to a primary key.
+
+        Args:
+            value: Id from the request
+
+        Returns:
+            Primary key, None if the value is not a valid key
+        """
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            return None
+        try:
+            return self._model._meta.pk.to_python(value)
+        except DjangoValidationError:
+            return None
+
+    def _validate(
+        self,
+        rows: list[BatchRow],
+        count: int,
+        errors: Optional[dict[int, dict[str, list[str]]]] = None,
+    ) -> tuple[Optional[list[dict[str, Any]]], list[dict[str, Any]]]:
+        """
+        Validate every item, then check uniqueness across the batch and stored rows.
+
+        Args:
+            rows: Items to validate
+            count: Number of items in the request
+            errors: Errors already found, by position in the request
+
+        Returns:
+            Validated values in row order, or None if any item is invalid, and the
+            result for each item
+        """
+        errors = dict(errors or {})
+        self._prefetch_relations(item for _, _, item in rows)
+        validated: list[dict[str, Any]] = []
+        checked: list[BatchRow] = []
+        for index, instance, item in rows:
+            try:
+                attrs = self._serializer.run_validation(item)
+            except serializers.ValidationError as exc:
+                errors[index] = exc.detail
+                continue
+            validated.append(attrs)
+            checked.append((index, instance, attrs))
+        for index, error in self._unique_errors(checked).items():
+            errors.setdefault(index, error)
+        if not errors:
+            return validated, []
+        return None, [
+            (
+                {"index": index, "status": "invalid", "errors": errors[index]}
+                if index in errors
+                else {"index": index, "status": "valid"}
+            )
+            for index in range(count)
+        ]
+
+    def _prefetch_relations(self, items: Iterable[Any]) -> None:
+        """
+        Fetch the related rows referenced by the batch, one query per relation.
+
+        Args:
+            items: Items from the request
+        """
+        items = [item for item in items if isinstance(item, dict)]
+        for field in self._serializer.fields.values():
+            if field.read_only:
+                continue
+            many = isinstance(field, serializers.ManyRelatedField)
+            relation = field.child_relation if many else field
+            if not isinstance(relation, BatchPrimaryKeyRelatedField):
+                continue
+            values = []
+            for item in items:
+                value = item.get(field.field_name)
+                if many and isinstance(value, list):
+                    values.extend(value)
+                elif not many:
+                    values.append(value)
+            relation.prefetch(values)
+
+    def _unique_errors(self, rows: list[BatchRow]) -> dict[int, dict[str, list[str]]]:
+        """
+        Find items that would break a unique field or unique together constraint.
+
+        Each constraint is checked against the stored rows with one query.
+
+        Args:
+            rows: Validated items
+
+        Returns:
+            Errors by position in the request
+        """
+        opts = self._model._meta
+        unique_sets = [
+            (field,)
+            for field in opts.concrete_fields
+            if field.unique and not field.primary_key
+        ]
+        unique_sets += [
+            tuple(opts.get_field(name) for name in names)
+            for names in opts.unique_together
+        ]
+        unique_sets += [
+            tuple(opts.get_field(name) for name in constraint.fields)
+            for constraint in opts.total_unique_constraints
+            if constraint.fields
+        ]
+        errors: dict[int, dict[str, list[str]]] = {}
+        for fields in unique_sets:
+            if len(fields) == 1:
+                name = fields[0].name
+                message = {
+                    name: [f"{opts.verbose_name} with this {name} already exists."]
+                }
+            else:
+                names = ", ".join(field.name for field in fields)
+                message = {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        f"The fields {names} must make a unique set."
+                    ]
+                }
+            claims: dict[tuple, int] = {}
+            owners: dict[int, Any] = {}
+            changing = set()
+            for index, instance, attrs in rows:
+                if instance is not None and any(
+                    field.name in attrs for field in fields
+                ):
+                    changing.add(instance.pk)
+                key = tuple(
+                    self._final_value(instance, attrs, field) for field in fields
+                )
+                if None in key:
+                    continue
+                if key in claims:
+                    errors.setdefault(index, message)
+                    continue
+                claims[key] = index
+                owners[index] = instance.pk if instance is not None else None
+            if not claims:
+                continue
+            attnames = [field.attname for field in fields]
+            stored = self._model.objects.filter(
+                **{f"{attnames[0]}__in": {key[0] for key in claims}}
+            ).values_list("pk", *attnames)
+            for pk, *values in stored:
+                index = claims.get(tuple(values))
+                if index is None or pk in changing or owners[index] == pk:
+                    continue
+                errors.setdefault(index, message)
+        return errors
+
+    @staticmethod
+    def _final_value(
+        instance: Optional[models.Model], attrs: dict[str, Any], field: models.Field
+    ) -> Any:
+        """
+        Find the value a field will hold once the item is written.
+
+        Args:
+            instance: Row being updated, None when creating
+            attrs: Validated values of the item
+            field: Model field
+
+        Returns:
+            Value of the field, related rows as their primary key
+        """
+        if field.name in attrs:
+            value = attrs[field.name]
+        elif instance is not None:
+            value = getattr(instance, field.attname)
+        else:
+            value = field.get_default()
+        return value.pk if isinstance(value, models.Model) else value
+
+    def _insert(self, validated: list[dict[str, Any]]) -> list[models.Model]:
+        """
+        Insert the new rows and their many to many relations.
+
+        Databases that cannot return the new primary keys from a bulk insert,
+        such as MySQL, save the rows one at a time instead.
+
+        Args:
+            validated: Validated values of each item
+
+        Returns:
+            New rows
+        """
+        relations = self._relation_names()
+        instances = [
+            self._model(
+                **{
+                    name: value
+                    for name, value in attrs.items()
+                    if name not in relations
+                }
+            )
+            for attrs in validated
+        ]
+        if connection.features.can_return_rows_from_bulk_insert:
+            self._model.objects.bulk_create(instances, batch_size=BATCH_SIZE)
+            bump_model_versions(self._model)
+            record_changes(self._model, (instance.pk for instance in instances))
+        else:
+            for instance in instances:
+                instance.save()
+        self._set_relations(instances=instances, validated=validated, replace=False)
+        return instances
+
+    def _save(self, rows: list[BatchRow], validated: list[dict[str, Any]]) -> None:
+        """
+        Write the changed values of existing rows and their many to many relations.
+
+        Args:
+            rows: Rows being updated
+            validated: Validated values of each item, in row order
+        """
+        relations = self._relation_names()
+        instances = [instance for _, instance, _ in rows]
+        fields = set()
+        for instance, attrs in zip(instances, validated):
+            for name, value in attrs.items():
+                if name not in relations:
+                    setattr(instance, name, value)
+                    fields.add(name)
+        if fields:
+            for field in self._model._meta.concrete_fields:
+                if getattr(field, "auto_now", False):
+                    for instance in instances:
+                        field.pre_save(instance, add=False)
+                    fields.add(field.name)
+            self._model.objects.bulk_update(instances, fields, batch_size=BATCH_SIZE)
+            bump_model_versions(self._model)
+        self._set_relations(instances=instances, validated=validated, replace=True)
+        if fields or any(relations.intersection(attrs) for attrs in validated):
+            record_changes(self._model, (instance.pk for instance in instances))
+
+    def _relation_names(self) -> set[str]:
+        """
+        List the many to many fields of the model.
+
+        Returns:
+            Names of the many to many fields
+        """
+        return {field.name for field in self._model._meta.many_to_many}
+
+    def _set_relations(
+        self,
+        instances: list[models.Model],
+        validated: list[dict[str, Any]],
+        replace: bool,
+    ) -> None:
+        """
+        Write the many to many relations given in the batch.
+
+        Args:
+            instances: Rows the relations belong to
+            validated: Validated values of each item, in the same order
+            replace: True if existing relations of the rows are removed first
+        """
+        for field in self._model._meta.many_to_many:
+            pairs = [
+                (instance, attrs[field.name])
+                for instance, attrs in zip(instances, validated)
+                if field.name in attrs
+            ]
+            if not pairs:
+                continue
+            through = field.remote_field.through
+            source = through._meta.get_field(field.m2m_field_name()).attname
+            target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+            if replace:
+                through.objects.filter(
+                    **{f"{source}__in": [instance.pk for instance, _ in pairs]}
+                ).delete()
+            through.objects.bulk_create(
+                (
+                    through(**{source: instance.pk, target: related_pk})
+                    for instance, related in pairs
+                    for related_pk in dict.fromkeys(value.pk for value in related)
+                ),
+                batch_size=BATCH_SIZE,
+            )
+            bump_model_versions(self._model, field.related_model)
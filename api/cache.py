@@ -0,0 +1,131 @@
+"""Cache of API responses keyed by their ETag."""
+
+from hashlib import sha256
+from threading import Lock
+from time import monotonic
+from typing import Any, Optional
+
+from django.core.cache import cache
+
+from api.models import counter_values, increment_counter
+
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+RESPONSE_CACHE_HITS = "api:response_cache:hits"
+RESPONSE_CACHE_MISSES = "api:response_cache:misses"
+RESPONSE_CACHE_FLUSH_INTERVAL = 60
+
+
+class CounterBuffer:
+    """
+    Class to count events in memory and add them to the database periodically.
+
+    Counting a request does not write to the database, only the first count
+    after the interval does, so counts from other workers can lag by up to the
+    interval and those not yet added when a worker stops are lost.
+    """
+
+    __slots__ = ("_counts", "_flushed_at", "_interval", "_lock")
+
+    def __init__(self, interval: float) -> None:
+        """
+        Initialise CounterBuffer.
+
+        Args:
+            interval: Seconds between additions to the database
+        """
+        self._counts: dict[str, int] = {}
+        self._flushed_at: float = monotonic()
+        self._interval = interval
+        self._lock = Lock()
+
+    def add(self, name: str) -> None:
+        """
+        Count an event.
+
+        Args:
+            name: Name of the counter
+        """
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+            if monotonic() - self._flushed_at < self._interval:
+                return
+        self.flush()
+
+    def flush(self) -> None:
+        """Add the counts held in memory to the database counters."""
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            self._flushed_at = monotonic()
+        for name, amount in counts.items():
+            increment_counter(name, amount)
+
+
+RESPONSE_CACHE_COUNTS = CounterBuffer(interval=RESPONSE_CACHE_FLUSH_INTERVAL)
+
+
+def response_cache_key(etag: str, url: str) -> str:
+    """
+    Create the cache key for a response.
+
+    The ETag covers the user, media type and model change counts, so a change to
+    any row the response reads moves it to a new key.
+
+    Args:
+        etag: ETag of the response
+        url: Absolute URL including the query string
+
+    Returns:
+        Cache key
+    """
+    content = f"{etag}|{url}".encode()
+    return f"api:response:{sha256(content).hexdigest()}"
+
+
+def cached_response_data(key: str) -> Optional[Any]:
+    """
+    Fetch cached response data and count the hit or miss.
+
+    The counts are kept in the database rather than the cache, so culling the
+    cache does not reset them, but are held in memory between additions so a
+    hit does not write to the database.
+
+    Args:
+        key: Cache key of the response
+
+    Returns:
+        Response data, None on a miss
+    """
+    data = cache.get(key)
+    RESPONSE_CACHE_COUNTS.add(
+        RESPONSE_CACHE_MISSES if data is None else RESPONSE_CACHE_HITS
+    )
+    return data
+
+
+def cache_response_data(key: str, data: Any) -> None:
+    """
+    Store response data.
+
+    Args:
+        key: Cache key of the response
+        data: Response data before rendering
+    """
+    cache.set(key, data, timeout=RESPONSE_CACHE_TIMEOUT)
+
+
+def response_cache_statistics() -> dict[str, int]:
+    """
+    Read the hit and miss counts of the response cache.
+
+    The counts held by this worker are added first, those of other workers may
+    lag by up to RESPONSE_CACHE_FLUSH_INTERVAL seconds.
+
+    Returns:
+        Dictionary of hits and misses
+    """
+    RESPONSE_CACHE_COUNTS.flush()
+    counts = counter_values(RESPONSE_CACHE_HITS, RESPONSE_CACHE_MISSES)
+    return {
+        "hits": counts.get(RESPONSE_CACHE_HITS, 0),
+        "misses": counts.get(RESPONSE_CACHE_MISSES, 0),
+    }
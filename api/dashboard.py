@@ -0,0 +1,251 @@
+"""Sections of the home dashboard, each cached until its models change."""
+
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from time import perf_counter
+from typing import Any, Callable, Optional
+
+from django.core.cache import cache
+from django.db import models
+from django.utils import timezone
+
+from api.models import model_versions
+from events.models import Event, Venue
+from finance.models import Bill, PaidFrom, bills_paid_in_month
+from network.models import Device
+from tasks.models import Task
+from wishlist.models import WishlistItem
+
+DASHBOARD_CACHE_TIMEOUT = 60 * 60 * 24
+DASHBOARD_LIMIT = 5
+
+# Name, time taken in seconds and an optional description of a Server-Timing metric.
+Timing = tuple[str, float, Optional[str]]
+
+
+class DashboardSection:
+    """Class to build and cache one section of the dashboard."""
+
+    __slots__ = ["build", "models", "name"]
+
+    def __init__(
+        self,
+        name: str,
+        read_models: tuple[type[models.Model], ...],
+        build: Callable[[date], Any],
+    ) -> None:
+        """
+        Initialise DashboardSection.
+
+        Args:
+            name: Key of the section in the dashboard
+            read_models: Models the section is built from
+            build: Function building the section for a day
+        """
+        self.build = build
+        self.models = read_models
+        self.name = name
+
+    def cache_key(self, versions: dict[str, int], today: date) -> str:
+        """
+        Create the cache key for the section.
+
+        Args:
+            versions: Change counts of the models, from model_versions
+            today: Day the section is built for
+
+        Returns:
+            Cache key that moves whenever a row the section reads changes
+        """
+        counts = ".".join(
+            str(versions.get(model._meta.label_lower, 0)) for model in self.models
+        )
+        return f"api:dashboard:{self.name}:{today}:{counts}"
+
+
+def bills_this_month(today: date) -> dict[str, Any]:
+    """
+    Build the bills paid this month.
+
+    Args:
+        today: Day the dashboard is built for
+
+    Returns:
+        Bills in due day order and the total paid
+    """
+    bills = list(
+        bills_paid_in_month(_start_of(today.replace(day=1)))
+        .order_by("due_day", "name")
+        .values("id", "name", "due_day", "monthly_payments", "paid_from__name")
+    )
+    total = sum((bill["monthly_payments"] for bill in bills), Decimal(0))
+    return {
+        "total": str(total),
+        "bills": [
+            {
+                "id": bill["id"],
+                "name": bill["name"],
+                "due_day": bill["due_day"],
+                "monthly_payments": str(bill["monthly_payments"]),
+                "paid_from": bill["paid_from__name"],
+            }
+            for bill in bills
+        ],
+    }
+
+
+def upcoming_events(today: date) -> list[dict[str, Any]]:
+    """
+    Build the next events, including any still running today.
+
+    Args:
+        today: Day the dashboard is built for
+
+    Returns:
+        Events in start order
+    """
+    return [
+        {
+            "id": event["id"],
+            "name": event["name"],
+            "venue": event["venue__name"],
+            "start": event["start"],
+            "ends": event["ends"],
+        }
+        for event in Event.objects.filter(ends__gte=_start_of(today))
+        .order_by("start", "pk")
+        .values("id", "name", "venue__name", "start", "ends")[:DASHBOARD_LIMIT]
+    ]
+
+
+def due_tasks(today: date) -> list[dict[str, Any]]:
+    """
+    Build the incomplete tasks due by the end of the day.
+
+    Args:
+        today: Day the dashboard is built for
+
+    Returns:
+        Tasks with the longest overdue first
+    """
+    return list(
+        Task.objects.filter(
+            completed=False, due_by__lt=_start_of(today + timedelta(days=1))
+        )
+        .order_by("due_by", "pk")
+        .values("id", "title", "due_by")[:DASHBOARD_LIMIT]
+    )
+
+
+def wishlist_changes(today: date) -> list[dict[str, Any]]:
+    """
+    Build the most recently changed wishlist items.
+
+    Args:
+        today: Day the dashboard is built for
+
+    Returns:
+        Items with the latest change first
+    """
+    return list(
+        WishlistItem.objects.order_by("-last_updated", "-pk").values(
+            "id", "name", "price", "in_stock", "last_updated"
+        )[:DASHBOARD_LIMIT]
+    )
+
+
+def device_count(today: date) -> int:
+    """
+    Count the network devices.
+
+    Args:
+        today: Day the dashboard is built for
+
+    Returns:
+        Number of devices
+    """
+    return Device.objects.count()
+
+
+DASHBOARD_SECTIONS = (
+    DashboardSection("bills", (Bill, PaidFrom), bills_this_month),
+    DashboardSection("events", (Event, Venue), upcoming_events),
+    DashboardSection("tasks", (Task,), due_tasks),
+    DashboardSection("wishlist", (WishlistItem,), wishlist_changes),
+    DashboardSection("devices", (Device,), device_count),
+)
+
+
+def build_dashboard(
+    today: Optional[date] = None,
+) -> tuple[dict[str, Any], list[Timing]]:
+    """
+    Build every section of the dashboard, reusing cached sections.
+
+    The change counts of every section's models are read in one query and the
+    cached sections in one cache lookup, so only sections whose models have
+    changed are queried.
+
+    Args:
+        today: Day to build the dashboard for, defaults to today
+
+    Returns:
+        Sections keyed by name and the time spent on each step
+    """
+    today = today or timezone.localdate()
+    start = perf_counter()
+    versions = model_versions(
+        *{model for section in DASHBOARD_SECTIONS for model in section.models}
+    )
+    timings: list[Timing] = [("versions", perf_counter() - start, None)]
+    keys = {
+        section.name: section.cache_key(versions=versions, today=today)
+        for section in DASHBOARD_SECTIONS
+    }
+    start = perf_counter()
+    cached = cache.get_many(keys.values())
+    timings.append(("cache", perf_counter() - start, None))
+    sections = {}
+    built = {}
+    for section in DASHBOARD_SECTIONS:
+        key = keys[section.name]
+        start = perf_counter()
+        if key in cached:
+            sections[section.name] = cached[key]
+            timings.append((section.name, perf_counter() - start, "hit"))
+            continue
+        sections[section.name] = built[key] = section.build(today)
+        timings.append((section.name, perf_counter() - start, "miss"))
+    if built:
+        cache.set_many(built, timeout=DASHBOARD_CACHE_TIMEOUT)
+    return sections, timings
+
+
+def server_timing(timings: list[Timing]) -> str:
+    """
+    Format timings as a Server-Timing header value.
+
+    Args:
+        timings: Name, seconds taken and optional description of each step
+
+    Returns:
+        Header value with durations in milliseconds
+    """
+    return ", ".join(
+        f"{name};dur={elapsed * 1000:.2f}"
+        + (f';desc="{description}"' if description else "")
+        for name, elapsed, description in timings
+    )
+
+
+def _start_of(day: date) -> datetime:
+    """
+    Return the start of a day in the current time zone.
+
+    Args:
+        day: Day to start
+
+    Returns:
+        Aware date time of midnight
+    """
+    return timezone.make_aware(datetime.combine(day, time.min))
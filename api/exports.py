@@ -0,0 +1,236 @@
+"""Tables that can be exported a row at a time."""
+
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Any, Iterator, Optional
+
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from finance.models import BillHistory, InvestmentValue, MonzoTransaction
+from network.models import Device
+
+EXPORT_CHUNK_SIZE = 2_000
+
+# Matched as GZipMiddleware does, with the quality checked so q=0 is a refusal.
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+QUALITY = re.compile(r"\bq=([0-9.]+)")
+
+
+class Export:
+    """Class to read the rows of an exportable table."""
+
+    __slots__ = ["_columns", "_date_field", "_ordering", "_queryset"]
+
+    def __init__(
+        self,
+        queryset: models.QuerySet,
+        columns: dict[str, str],
+        ordering: tuple[str, ...],
+        date_field: Optional[str] = None,
+    ) -> None:
+        """
+        Initialise Export.
+
+        Args:
+            queryset: Rows of the table
+            columns: Column names mapped to the lookups reading them
+            ordering: Ascending ordering of the rows, ending in a unique field
+            date_field: Field the start and end dates filter on, None if not filterable
+        """
+        self._columns = columns
+        self._date_field = date_field
+        self._ordering = ordering
+        self._queryset = queryset
+
+    @property
+    def headers(self) -> list[str]:
+        """
+        Return the column names.
+
+        Returns:
+            Column names in the order of each row's values
+        """
+        return list(self._columns)
+
+    @property
+    def filterable(self) -> bool:
+        """
+        Return whether rows can be filtered by date.
+
+        Returns:
+            True if the table has a date field
+        """
+        return self._date_field is not None
+
+    def rows(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> Iterator[tuple[Any, ...]]:
+        """
+        Read the rows a chunk at a time, so memory use does not grow with the table.
+
+        Each chunk is a separate query for the rows after the last one read, rather
+        than a server side cursor, which mysqlclient would buffer whole.
+
+        Args:
+            start: First date to include
+            end: Last date to include
+            chunk_size: Number of rows read per query
+
+        Returns:
+            Iterator of row values in the order of headers
+        """
+        queryset = self._queryset.all()
+        if self._date_field is not None:
+            field = queryset.model._meta.get_field(self._date_field)
+            if start is not None:
+                after = {f"{self._date_field}__gte": _bound(field, start)}
+                queryset = queryset.filter(**after)
+            # Every date is on or before the last one, which has no next day.
+            if end is not None and end < date.max:
+                before = {f"{self._date_field}__lt": _bound(field, end + timedelta(1))}
+                queryset = queryset.filter(**before)
+        lookups = list(self._columns.values())
+        lookups += [name for name in self._ordering if name not in lookups]
+        positions = [lookups.index(name) for name in self._ordering]
+        return self._chunks(
+            queryset=queryset.order_by(*self._ordering).values_list(*lookups),
+            positions=positions,
+            chunk_size=chunk_size,
+        )
+
+    def _chunks(
+        self, queryset: models.QuerySet, positions: list[int], chunk_size: int
+    ) -> Iterator[tuple[Any, ...]]:
+        """
+        Read ordered rows a chunk at a time, starting each after the last row read.
+
+        Args:
+            queryset: Ordered rows, the columns followed by any ordering fields
+            positions: Position in each row of every ordering field
+            chunk_size: Number of rows read per query
+
+        Returns:
+            Iterator of row values in the order of headers
+        """
+        width = len(self._columns)
+        chunk = list(queryset[:chunk_size])
+        while chunk:
+            for row in chunk:
+                yield row[:width]
+            if len(chunk) < chunk_size:
+                return
+            last = [chunk[-1][position] for position in positions]
+            chunk = list(queryset.filter(self._after(last))[:chunk_size])
+
+    def _after(self, values: list[Any]) -> Q:
+        """
+        Build the condition for rows ordered after the given ordering values.
+
+        Args:
+            values: Value of each ordering field in the last row read
+
+        Returns:
+            Condition matching the rows after it
+        """
+        condition = Q()
+        for index, name in enumerate(self._ordering):
+            equal = dict(zip(self._ordering[:index], values[:index]))
+            condition |= Q(**equal, **{f"{name}__gt": values[index]})
+        return condition
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Check an Accept-Encoding header accepts gzip.
+
+    Args:
+        accept_encoding: Value of the header
+
+    Returns:
+        True if gzip is listed without a quality of zero
+    """
+    for coding in accept_encoding.split(","):
+        name, _, parameters = coding.partition(";")
+        if not ACCEPTS_GZIP.search(name):
+            continue
+        quality = QUALITY.search(parameters)
+        return not quality or float(quality.group(1)) > 0
+    return False
+
+
+def _bound(field: models.Field, day: date) -> date:
+    """
+    Convert a date to a value the field can be compared with.
+
+    Args:
+        field: Field being filtered
+        day: Date of the bound
+
+    Returns:
+        Start of the day for date time fields, otherwise the date
+    """
+    if isinstance(field, models.DateTimeField):
+        return timezone.make_aware(datetime.combine(day, time.min))
+    return day
+
+
+EXPORTS: dict[str, Export] = {
+    "bill-history": Export(
+        queryset=BillHistory.objects.all(),
+        columns={
+            "id": "pk",
+            "bill": "bill_id",
+            "current_balance": "current_balance",
+            "date": "date",
+        },
+        ordering=("date", "pk"),
+        date_field="date",
+    ),
+    "devices": Export(
+        queryset=Device.objects.all(),
+        columns={
+            "id": "pk",
+            "hostname": "hostname",
+            "ip_address": "ip_address",
+            "mac_address": "mac_address",
+            "operating_system": "operating_system__name",
+            "model": "model__name",
+            "device_type": "device_type__name",
+            "connected_too": "connected_too__hostname",
+            "port": "port",
+            "description": "description",
+        },
+        ordering=("pk",),
+    ),
+    "investment-history": Export(
+        queryset=InvestmentValue.objects.all(),
+        columns={
+            "id": "pk",
+            "investment": "investment_id",
+            "value": "value",
+            "date": "date",
+        },
+        ordering=("date", "pk"),
+        date_field="date",
+    ),
+    "transactions": Export(
+        queryset=MonzoTransaction.objects.all(),
+        columns={
+            "transaction_id": "transaction_id",
+            "created": "created",
+            "value": "value",
+            "currency": "currency",
+            "description": "description",
+            "merchant": "merchant__name",
+            "has_receipt": "has_receipt",
+            "bill": "for_bill_id",
+        },
+        ordering=("created", "pk"),
+        date_field="created",
+    ),
+}
@@ -0,0 +1,102 @@
+"""Command to compare serializing API lists with building them from values()."""
+
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.values import ValuesRepresentation
+from api.views import NetworkSerializer, NetworkViewSet, sparse_queryset
+from network.models import (
+    ConnectionType,
+    Device,
+    DeviceType,
+    Model,
+    OperatingSystem,
+    Vendor,
+)
+
+
+class Command(BaseCommand):
+    """Command to compare serializing API lists with building them from values()."""
+
+    help = (
+        "Time listing synthetic devices through the serializer and through "
+        "values(), all changes are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser) -> None:
+        """
+        Add arguments for the command.
+
+        Args:
+            parser: Argument parser for the command
+        """
+        parser.add_argument(
+            "--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Time both ways of listing each number of devices."""
+        request = Request(APIRequestFactory().get("/api/network/"))
+        context = {"request": request, "format": None, "view": None}
+        for count in options["rows"]:
+            with transaction.atomic():
+                self._create_devices(count)
+                queryset = NetworkViewSet.queryset.order_by("pk")
+
+                start = perf_counter()
+                serializer = NetworkSerializer(context=context)
+                expected = NetworkSerializer(
+                    sparse_queryset(queryset, serializer), many=True, context=context
+                ).data
+                serializer_elapsed = perf_counter() - start
+
+                start = perf_counter()
+                representation = ValuesRepresentation.for_serializer(
+                    NetworkSerializer(context=context)
+                )
+                rows = representation.represent(representation.queryset(queryset))
+                values_elapsed = perf_counter() - start
+
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f"{count} devices: serializer {serializer_elapsed:.2f}s, values "
+                f"{values_elapsed:.2f}s ({serializer_elapsed / values_elapsed:.1f}x), "
+                f"{'matching' if rows == expected else 'DIFFERENT'} output"
+            )
+
+    @staticmethod
+    def _create_devices(count: int) -> None:
+        """
+        Create devices, every other one connected to the first.
+
+        Args:
+            count: Number of devices to create
+        """
+        vendor = Vendor.objects.create(name="Benchmark", url="https://benchmark")
+        fields = {
+            "operating_system": OperatingSystem.objects.create(
+                name="Benchmark OS", vendor=vendor
+            ),
+            "hardware_vendor": vendor,
+            "model": Model.objects.create(name="Benchmark", vendor=vendor),
+            "device_type": DeviceType.objects.create(name="Benchmark", image="server"),
+            "connection_type": ConnectionType.objects.create(name="Benchmark"),
+        }
+        first = Device.objects.create(hostname="benchmark-0", **fields)
+        Device.objects.bulk_create(
+            (
+                Device(
+                    hostname=f"benchmark-{index}",
+                    connected_too=first if index % 2 else None,
+                    port=index if index % 2 else None,
+                    description=f"Device {index}",
+                    **fields,
+                )
+                for index in range(1, count)
+            ),
+            batch_size=1_000,
+        )
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeLog",
+            fields=[
+                ("sequence", models.BigAutoField(primary_key=True, serialize=False)),
+                ("label", models.CharField(max_length=100)),
+                ("object_pk", models.CharField(max_length=64)),
+                (
+                    "operation",
+                    models.CharField(
+                        choices=[("upsert", "Upsert"), ("delete", "Delete")],
+                        max_length=6,
+                    ),
+                ),
+                ("changed", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
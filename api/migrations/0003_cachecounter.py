@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+def create_response_cache_counters(apps, schema_editor):
+    """Create the response cache counters so each count is a single update."""
+    CacheCounter = apps.get_model("api", "CacheCounter")
+    CacheCounter.objects.bulk_create(
+        [
+            CacheCounter(name="api:response_cache:hits"),
+            CacheCounter(name="api:response_cache:misses"),
+        ],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_changelog"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CacheCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("count", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_response_cache_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_cachecounter"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="changelog",
+            index=models.Index(fields=["changed"], name="changelog_changed_idx"),
+        ),
+    ]
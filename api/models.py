@@ -0,0 +1,272 @@
+"""Models for the API app."""
+
+from typing import Any, Iterable
+
+from django.db import models
+from django.db.models import F
+
+# Models whose saves and deletes are counted through signals. Models only written
+# in bulk, such as the rollups, call bump_model_versions where they are written.
+VERSIONED_MODELS = (
+    "auth.User",
+    "books.Author",
+    "books.Book",
+    "events.Event",
+    "events.Venue",
+    "finance.Bill",
+    "finance.BillHistory",
+    "finance.BillType",
+    "finance.Investments",
+    "finance.InvestmentValue",
+    "finance.MonzoMerchant",
+    "finance.Organisation",
+    "finance.PaidFrom",
+    "network.Device",
+    "network.DeviceType",
+    "network.DomainName",
+    "network.Model",
+    "network.OperatingSystem",
+    "network.Vendor",
+    "network.Website",
+    "tasks.Task",
+    "wishlist.WishlistItem",
+)
+
+# Models whose saves and deletes are written to the change log, clients syncing
+# from /api/changes/ receive their rows.
+JOURNALED_MODELS = (
+    "books.Author",
+    "books.Book",
+    "events.Event",
+    "finance.Bill",
+    "finance.BillHistory",
+    "finance.Investments",
+    "finance.InvestmentValue",
+    "network.Device",
+    "network.Website",
+    "wishlist.WishlistItem",
+)
+JOURNALED_LABELS = frozenset(label.lower() for label in JOURNALED_MODELS)
+
+
+class ModelVersion(models.Model):
+    """Model to count the changes made to the rows of a model."""
+
+    label: models.CharField = models.CharField(max_length=100, unique=True)
+    version: models.PositiveBigIntegerField = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        """
+        Return the label and version.
+
+        Returns:
+            Label and version of the model
+        """
+        return f"{self.label} v{self.version}"
+
+
+class CacheCounter(models.Model):
+    """Model to count events of a cache, such as hits and misses."""
+
+    name: models.CharField = models.CharField(max_length=100, unique=True)
+    count: models.PositiveBigIntegerField = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        """
+        Return the name and count.
+
+        Returns:
+            Name and count of the counter
+        """
+        return f"{self.name} {self.count}"
+
+
+class ChangeLog(models.Model):
+    """Model to record each save and delete of a journaled row in order."""
+
+    UPSERT = "upsert"
+    DELETE = "delete"
+    OPERATION_CHOICES = [(UPSERT, "Upsert"), (DELETE, "Delete")]
+
+    sequence: models.BigAutoField = models.BigAutoField(primary_key=True)
+    label: models.CharField = models.CharField(max_length=100)
+    object_pk: models.CharField = models.CharField(max_length=64)
+    operation: models.CharField = models.CharField(
+        max_length=6, choices=OPERATION_CHOICES
+    )
+    changed: models.DateTimeField = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Metaclass."""
+
+        indexes = [models.Index(fields=["changed"], name="changelog_changed_idx")]
+
+    def __str__(self) -> str:
+        """
+        Return the sequence, operation and row.
+
+        Returns:
+            Description of the change
+        """
+        return f"{self.sequence} {self.operation} {self.label} {self.object_pk}"
+
+
+def bump_model_versions(*changed_models: type[models.Model]) -> None:
+    """
+    Record that rows of the given models have changed.
+
+    Args:
+        changed_models: Models that have changed
+    """
+    labels = {model._meta.label_lower for model in changed_models}
+    versions = ModelVersion.objects.filter(label__in=labels)
+    if versions.update(version=F("version") + 1) < len(labels):
+        ModelVersion.objects.bulk_create(
+            (ModelVersion(label=label) for label in labels), ignore_conflicts=True
+        )
+        versions.update(version=F("version") + 1)
+
+
+def model_versions(*read_models: type[models.Model]) -> dict[str, int]:
+    """
+    Fetch the change counts of the given models.
+
+    Args:
+        read_models: Models to fetch the counts for
+
+    Returns:
+        Dictionary of model labels to change counts, models never changed are missing
+    """
+    return dict(
+        ModelVersion.objects.filter(
+            label__in={model._meta.label_lower for model in read_models}
+        ).values_list("label", "version")
+    )
+
+
+def increment_counter(name: str, amount: int = 1) -> None:
+    """
+    Add to a cache counter.
+
+    The count is incremented by the database, so concurrent workers do not lose
+    increments.
+
+    Args:
+        name: Name of the counter
+        amount: Amount to add
+    """
+    counters = CacheCounter.objects.filter(name=name)
+    if not counters.update(count=F("count") + amount):
+        CacheCounter.objects.bulk_create(
+            [CacheCounter(name=name)], ignore_conflicts=True
+        )
+        counters.update(count=F("count") + amount)
+
+
+def counter_values(*names: str) -> dict[str, int]:
+    """
+    Fetch the counts of cache counters.
+
+    Args:
+        names: Names of the counters
+
+    Returns:
+        Dictionary of counter names to counts, counters never incremented are missing
+    """
+    return dict(
+        CacheCounter.objects.filter(name__in=names).values_list("name", "count")
+    )
+
+
+def record_change(sender, **kwargs) -> None:
+    """
+    Signal receiver to count a saved or deleted row.
+
+    Args:
+        sender: Model of the row
+        kwargs: Signal arguments
+    """
+    bump_model_versions(sender)
+
+
+def record_relation_change(sender, instance, action, model, **kwargs) -> None:
+    """
+    Signal receiver to count a changed many to many relation.
+
+    Args:
+        sender: Model joining the relation
+        instance: Row whose relation changed
+        action: Stage of the change
+        model: Model on the other side of the relation
+        kwargs: Signal arguments
+    """
+    if action.startswith("post_"):
+        bump_model_versions(type(instance), model)
+
+
+def record_changes(
+    model: type[models.Model],
+    pks: Iterable[Any],
+    operation: str = ChangeLog.UPSERT,
+) -> None:
+    """
+    Write changed rows to the change log.
+
+    Rows saved or deleted one at a time are logged by signals, rows written in
+    bulk must be logged by the code writing them.
+
+    Args:
+        model: Model of the rows
+        pks: Primary keys of the rows that changed
+        operation: ChangeLog.UPSERT or ChangeLog.DELETE
+    """
+    label = model._meta.label_lower
+    if label not in JOURNALED_LABELS:
+        return
+    ChangeLog.objects.bulk_create(
+        (ChangeLog(label=label, object_pk=str(pk), operation=operation) for pk in pks),
+        batch_size=500,
+    )
+
+
+def journal_save(sender, instance, **kwargs) -> None:
+    """
+    Signal receiver to log a saved row.
+
+    Args:
+        sender: Model of the row
+        instance: Row saved
+        kwargs: Signal arguments
+    """
+    record_changes(sender, [instance.pk])
+
+
+def journal_delete(sender, instance, **kwargs) -> None:
+    """
+    Signal receiver to log a deleted row.
+
+    Args:
+        sender: Model of the row
+        instance: Row deleted
+        kwargs: Signal arguments
+    """
+    record_changes(sender, [instance.pk], operation=ChangeLog.DELETE)
+
+
+def journal_relation_change(sender, instance, action, model, pk_set, **kwargs) -> None:
+    """
+    Signal receiver to log the rows on both sides of a changed many to many relation.
+
+    Args:
+        sender: Model joining the relation
+        instance: Row whose relation changed
+        action: Stage of the change
+        model: Model on the other side of the relation
+        pk_set: Primary keys added or removed, None when the relation is cleared
+        kwargs: Signal arguments
+    """
+    if not action.startswith("post_"):
+        return
+    record_changes(type(instance), [instance.pk])
+    if pk_set:
+        record_changes(model, sorted(pk_set))
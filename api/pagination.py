@@ -0,0 +1,18 @@
+"""Pagination for the API app."""
+
+from rest_framework.pagination import CursorPagination
+
+
+class StableCursorPagination(CursorPagination):
+    """
+    Cursor pagination ordered by primary key.
+
+    The primary key never changes and is unique, so pages stay consistent while
+    rows are added or removed, and each page is a single indexed range query
+    however deep the client pages.
+    """
+
+    ordering = "pk"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
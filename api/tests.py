@@ -0,0 +1,1187 @@
+"""Tests for the API."""
+
+import csv
+import gzip
+import json
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from typing import Callable
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone as django_timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.cache import RESPONSE_CACHE_HITS, CounterBuffer
+from api.dashboard import build_dashboard
+from api.exports import EXPORTS
+from api.models import JOURNALED_LABELS, ChangeLog
+from api.values import ValuesRepresentation
+from api.views import CHANGE_FEEDS, CHANGES_SETTLE_TIME, BookSerializer
+from books.models import Author, Book
+from events.models import Event
+from finance.models import (
+    Bill,
+    BillHistory,
+    BillType,
+    Investments,
+    InvestmentValue,
+    MonzoMerchant,
+    MonzoTransaction,
+    Organisation,
+    PaidFrom,
+)
+from network.models import (
+    ConnectionType,
+    Device,
+    DeviceType,
+    Model,
+    OperatingSystem,
+    Vendor,
+    Website,
+)
+from tasks.models import Task
+from wishlist.models import WishlistItem
+
+
+class ApiQueryCountTests(TestCase):
+    """Tests that API query counts do not grow with the number of rows."""
+
+    def setUp(self) -> None:
+        """Log in and create the objects rows refer to."""
+        cache.clear()
+        self.user = User.objects.create_user(username="user")
+        self.client.force_login(self.user)
+        vendor = Vendor.objects.create(name="Vendor", url="https://vendor")
+        self.device_fields = {
+            "operating_system": OperatingSystem.objects.create(
+                name="OS", vendor=vendor
+            ),
+            "hardware_vendor": vendor,
+            "model": Model.objects.create(name="Model", vendor=vendor),
+            "device_type": DeviceType.objects.create(name="Server", image="server"),
+            "connection_type": ConnectionType.objects.create(name="Ethernet"),
+        }
+        self.organisation = Organisation.objects.create(name="Bank", url="https://bank")
+        self.bill_fields = {
+            "organisation": self.organisation,
+            "bill_type": BillType.objects.create(name="Loan"),
+            "paid_from": PaidFrom.objects.create(name="Main Balance"),
+        }
+
+    def assertConstantQueries(
+        self, create: Callable[[int, int], None], *urls: str
+    ) -> None:
+        """
+        Check each URL makes the same number of queries for 1 and 500 rows.
+
+        Args:
+            create: Callable creating rows numbered from the first to the second argument
+            urls: URLs to request
+        """
+        create(0, 1)
+        counts = [self._count_queries(url) for url in urls]
+        create(1, 500)
+        self.assertEqual([self._count_queries(url) for url in urls], counts)
+
+    def _count_queries(self, url: str) -> int:
+        """
+        Request a URL and count the queries made building the response.
+
+        Args:
+            url: URL to request
+
+        Returns:
+            Number of queries
+        """
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def test_authors(self) -> None:
+        """Authors are listed in a fixed number of queries."""
+
+        def create(start: int, end: int) -> None:
+            Author.objects.bulk_create(
+                Author(name=f"Author {index}") for index in range(start, end)
+            )
+
+        self.assertConstantQueries(create, "/api/authors/")
+
+    def test_books(self) -> None:
+        """Books and their authors are listed in a fixed number of queries."""
+        authors = Author.objects.bulk_create(
+            Author(name=f"Author {index}") for index in range(2)
+        )
+
+        def create(start: int, end: int) -> None:
+            books = Book.objects.bulk_create(
+                Book(
+                    title=f"Book {index}",
+                    subtitle="",
+                    publisher="Publisher",
+                    published=date(2024, 1, 1),
+                    isbn10=f"{index:010d}",
+                    isbn13=f"{index:013d}",
+                    description="Book",
+                    thumbnail="",
+                )
+                for index in range(start, end)
+            )
+            Book.authors.through.objects.bulk_create(
+                Book.authors.through(book_id=book.pk, author_id=author.pk)
+                for book in books
+                for author in authors
+            )
+
+        create(0, 1)
+        first = Book.objects.get()
+        self.assertConstantQueries(
+            lambda start, end: create(max(start, 1), end),
+            "/api/books/",
+            f"/api/books/{first.pk}/",
+        )
+
+    def test_network(self) -> None:
+        """Devices are listed in a fixed number of queries."""
+
+        def create(start: int, end: int) -> None:
+            connected_too = Device.objects.first()
+            Device.objects.bulk_create(
+                Device(
+                    hostname=f"device-{index}",
+                    connected_too=connected_too,
+                    port=index if connected_too else None,
+                    **self.device_fields,
+                )
+                for index in range(start, end)
+            )
+
+        self.assertConstantQueries(create, "/api/network/")
+        first = Device.objects.order_by("pk").first()
+        self.assertEqual(
+            self._count_queries(f"/api/network/{first.pk}/"),
+            self._count_queries(f"/api/network/{Device.objects.last().pk}/"),
+        )
+
+    def test_websites(self) -> None:
+        """Websites are listed in a fixed number of queries."""
+        device = Device.objects.create(hostname="server", **self.device_fields)
+
+        def create(start: int, end: int) -> None:
+            Website.objects.bulk_create(
+                Website(name=f"Site {index}", hosted_on=device, port=index)
+                for index in range(start, end)
+            )
+
+        self.assertConstantQueries(create, "/api/websites/")
+
+    def test_wishlist(self) -> None:
+        """Wishlist items are listed in a fixed number of queries."""
+
+        def create(start: int, end: int) -> None:
+            WishlistItem.objects.bulk_create(
+                WishlistItem(
+                    name=f"Item {index}",
+                    description="Item",
+                    product_url="https://shop",
+                    info_url="https://shop",
+                )
+                for index in range(start, end)
+            )
+
+        self.assertConstantQueries(create, "/api/wishlist/")
+
+    def test_bills(self) -> None:
+        """Bills, bills for a month and bill history use a fixed number of queries."""
+        bill = Bill.objects.create(name="Bill", description="Bill", **self.bill_fields)
+
+        def create(start: int, end: int) -> None:
+            Bill.objects.bulk_create(
+                Bill(
+                    name=f"Bill {index}",
+                    description="Bill",
+                    start_date="2024-01-01T00:00:00Z",
+                    **self.bill_fields,
+                )
+                for index in range(start, end)
+            )
+            BillHistory.objects.bulk_create(
+                BillHistory(bill=bill, current_balance=Decimal(index))
+                for index in range(start, end)
+            )
+
+        self.assertConstantQueries(
+            create,
+            "/api/finance/bills/",
+            f"/api/finance/bills/{bill.pk}/",
+            "/api/finance/bills/bills_for_month/?month=3&year=2024",
+            f"/api/finance/bills/{bill.pk}/history/",
+        )
+
+    def test_bill_history_for_bill(self) -> None:
+        """Bill history only includes the requested bill."""
+        bills = [
+            Bill.objects.create(name=name, description=name, **self.bill_fields)
+            for name in ("One", "Two")
+        ]
+        response = self.client.get(f"/api/finance/bills/{bills[1].pk}/history/")
+        self.assertEqual(
+            [value["bill"] for value in response.json()["results"]],
+            [bills[1].pk],
+        )
+
+    def test_investments(self) -> None:
+        """Investments and their history use a fixed number of queries."""
+        investment = Investments.objects.create(
+            organisation=self.organisation,
+            description="Fund",
+            current_value=Decimal("1.00"),
+            date_purchased=date(2024, 1, 1),
+        )
+
+        def create(start: int, end: int) -> None:
+            Investments.objects.bulk_create(
+                Investments(
+                    organisation=self.organisation,
+                    description=f"Fund {index}",
+                    current_value=Decimal("1.00"),
+                    date_purchased=date(2024, 1, 1),
+                )
+                for index in range(start, end)
+            )
+            InvestmentValue.objects.bulk_create(
+                InvestmentValue(investment=investment, value=Decimal(index))
+                for index in range(start, end)
+            )
+
+        self.assertConstantQueries(
+            create,
+            "/api/finance/investments/",
+            f"/api/finance/investments/{investment.pk}/",
+            f"/api/finance/investments/{investment.pk}/history/",
+        )
+
+    def test_whoami(self) -> None:
+        """Users are listed in a fixed number of queries."""
+
+        def create(start: int, end: int) -> None:
+            User.objects.bulk_create(
+                User(username=f"user-{index}") for index in range(start, end)
+            )
+
+        self.assertConstantQueries(
+            create,
+            "/api/whoami/",
+            "/api/whoami/current/",
+            f"/api/whoami/{self.user.pk}/",
+        )
+
+
+class ApiPaginationTests(TestCase):
+    """Tests for cursor pagination and sparse fieldsets."""
+
+    def setUp(self) -> None:
+        """Log in and create a device."""
+        cache.clear()
+        self.client.force_login(User.objects.create_user(username="user"))
+        vendor = Vendor.objects.create(name="Vendor", url="https://vendor")
+        self.device = Device.objects.create(
+            hostname="server",
+            description="Server",
+            operating_system=OperatingSystem.objects.create(name="OS", vendor=vendor),
+            hardware_vendor=vendor,
+            model=Model.objects.create(name="Model", vendor=vendor),
+            device_type=DeviceType.objects.create(name="Server", image="server"),
+            connection_type=ConnectionType.objects.create(name="Ethernet"),
+        )
+
+    def test_cursor_pages(self) -> None:
+        """Pages follow the primary key and end with no next link."""
+        WishlistItem.objects.bulk_create(
+            WishlistItem(
+                name=f"Item {index}",
+                description="Item",
+                product_url="https://shop",
+                info_url="https://shop",
+            )
+            for index in range(150)
+        )
+        first = self.client.get("/api/wishlist/?page_size=100").json()
+        self.assertEqual(len(first["results"]), 100)
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).json()
+        self.assertEqual(len(second["results"]), 50)
+        self.assertIsNone(second["next"])
+        names = [item["name"] for item in first["results"] + second["results"]]
+        self.assertEqual(names, [f"Item {index}" for index in range(150)])
+
+    def test_fields(self) -> None:
+        """Only the requested fields are returned and selected."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/network/?fields=hostname,operating_system")
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {
+                    "hostname": "server",
+                    "operating_system": {"name": "OS", "vendor": "Vendor"},
+                }
+            ],
+        )
+        sql = queries[-1]["sql"]
+        self.assertIn("network_operatingsystem", sql)
+        self.assertNotIn("network_model", sql)
+        self.assertNotIn('"description"', sql)
+
+    def test_fields_on_detail(self) -> None:
+        """Detail views honour the requested fields."""
+        response = self.client.get(f"/api/network/{self.device.pk}/?fields=hostname")
+        self.assertEqual(response.json(), {"hostname": "server"})
+
+    def test_fields_with_property(self) -> None:
+        """Fields that are not columns are still returned."""
+        Website.objects.create(name="Site", hosted_on=self.device, port=80)
+        response = self.client.get("/api/websites/?fields=name,full_url")
+        self.assertEqual(list(response.json()["results"][0]), ["name", "full_url"])
+
+    def test_history_fields(self) -> None:
+        """History is paginated and honours the requested fields."""
+        organisation = Organisation.objects.create(name="Bank", url="https://bank")
+        investment = Investments.objects.create(
+            organisation=organisation,
+            description="Fund",
+            current_value=Decimal("1.00"),
+            date_purchased=date(2024, 1, 1),
+        )
+        InvestmentValue.objects.create(investment=investment, value=Decimal("2.00"))
+        response = self.client.get(
+            f"/api/finance/investments/{investment.pk}/history/?fields=value"
+        )
+        self.assertEqual(
+            response.json()["results"], [{"value": "1.00"}, {"value": "2.00"}]
+        )
+
+
+class ApiConditionalGetTests(TestCase):
+    """Tests for ETags built from model change counts."""
+
+    def setUp(self) -> None:
+        """Log in."""
+        cache.clear()
+        self.client.force_login(User.objects.create_user(username="user"))
+
+    def assertNotModified(self, url: str, etag: str) -> None:
+        """
+        Check a URL answers 304 to the ETag without querying its rows.
+
+        Args:
+            url: URL to request
+            etag: ETag the client holds
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(
+            [query["sql"].split(" FROM ")[1].split()[0] for query in queries],
+            ['"django_session"', '"auth_user"', '"api_modelversion"'],
+        )
+
+    def test_not_modified_until_saved(self) -> None:
+        """The ETag holds until a row is saved or deleted."""
+        item = WishlistItem.objects.create(
+            name="Item",
+            description="Item",
+            product_url="https://shop",
+            info_url="https://shop",
+        )
+        etag = self.client.get("/api/wishlist/")["ETag"]
+        self.assertNotModified("/api/wishlist/", etag)
+        self.assertNotModified(f"/api/wishlist/{item.pk}/", etag)
+        item.save()
+        response = self.client.get("/api/wishlist/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        etag = response["ETag"]
+        item.delete()
+        response = self.client.get("/api/wishlist/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_relation_change(self) -> None:
+        """Adding an author to a book changes the book list ETag."""
+        book = Book.objects.create(
+            title="Book",
+            subtitle="",
+            publisher="Publisher",
+            published=date(2024, 1, 1),
+            isbn10="0000000000",
+            isbn13="0000000000000",
+            description="Book",
+            thumbnail="",
+        )
+        etag = self.client.get("/api/books/")["ETag"]
+        self.assertNotModified("/api/books/", etag)
+        book.authors.add(Author.objects.create(name="Author"))
+        response = self.client.get("/api/books/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_specific(self) -> None:
+        """Each user gets their own ETag."""
+        etag = self.client.get("/api/whoami/current/")["ETag"]
+        self.client.force_login(User.objects.create_user(username="other"))
+        response = self.client.get("/api/whoami/current/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()["username"], "other")
+
+    def test_json_views(self) -> None:
+        """The rack view answers 304 until a device changes."""
+        vendor = Vendor.objects.create(name="Vendor", url="https://vendor")
+        device = Device.objects.create(
+            hostname="server",
+            operating_system=OperatingSystem.objects.create(name="OS", vendor=vendor),
+            hardware_vendor=vendor,
+            model=Model.objects.create(name="Model", vendor=vendor),
+            device_type=DeviceType.objects.create(name="Server", image="server"),
+            connection_type=ConnectionType.objects.create(name="Ethernet"),
+        )
+        etag = self.client.get("/network/rack.json")["ETag"]
+        self.assertNotModified("/network/rack.json", etag)
+        device.save()
+        response = self.client.get("/network/rack.json", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ApiBatchTests(TestCase):
+    """Tests for the batch write endpoints."""
+
+    def setUp(self) -> None:
+        """Log in and create the rows devices refer to."""
+        self.client.force_login(User.objects.create_user(username="user"))
+        vendor = Vendor.objects.create(name="Vendor", url="https://vendor")
+        self.device_fields = {
+            "operating_system": OperatingSystem.objects.create(
+                name="OS", vendor=vendor
+            ).pk,
+            "hardware_vendor": vendor.pk,
+            "model": Model.objects.create(name="Model", vendor=vendor).pk,
+            "device_type": DeviceType.objects.create(name="Server", image="server").pk,
+            "connection_type": ConnectionType.objects.create(name="Ethernet").pk,
+        }
+
+    def devices(self, start: int, end: int) -> list[dict]:
+        """
+        Build devices to send.
+
+        Args:
+            start: Number of the first device
+            end: Number after the last device
+
+        Returns:
+            List of device objects
+        """
+        return [
+            {"hostname": f"device-{index}", **self.device_fields}
+            for index in range(start, end)
+        ]
+
+    def batch(self, url: str, method: str, items: list) -> tuple[int, int, list]:
+        """
+        Send a batch and count the queries made.
+
+        Args:
+            url: Batch URL
+            method: HTTP method
+            items: Objects to send
+
+        Returns:
+            Status code, number of queries and the results
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(
+                url, data=items, content_type="application/json"
+            )
+        return response.status_code, len(queries), response.json()["results"]
+
+    def test_create_in_fixed_queries(self) -> None:
+        """Creating 10 or 50 devices makes the same number of queries."""
+        self.batch("/api/network/batch/", "post", self.devices(0, 1))
+        small = self.batch("/api/network/batch/", "post", self.devices(1, 11))
+        large = self.batch("/api/network/batch/", "post", self.devices(11, 61))
+        self.assertEqual((small[0], large[0]), (201, 201))
+        self.assertEqual(small[1], large[1])
+        self.assertEqual(Device.objects.count(), 61)
+        self.assertEqual(
+            large[2][0],
+            {
+                "index": 0,
+                "status": "created",
+                "id": Device.objects.get(hostname="device-11").pk,
+            },
+        )
+
+    def test_invalid_items_write_nothing(self) -> None:
+        """Any invalid object stops the batch and each object gets a result."""
+        self.batch("/api/network/batch/", "post", self.devices(0, 1))
+        items = self.devices(1, 4)
+        items[0]["hostname"] = "device-0"
+        items[1]["model"] = 999
+        items.append({"hostname": "device-3", **self.device_fields})
+        status_code, _, results = self.batch("/api/network/batch/", "post", items)
+        self.assertEqual(status_code, 400)
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["invalid", "invalid", "valid", "invalid"],
+        )
+        self.assertIn("hostname", results[0]["errors"])
+        self.assertIn("model", results[1]["errors"])
+        self.assertIn("hostname", results[3]["errors"])
+        self.assertEqual(Device.objects.count(), 1)
+
+    def test_update_in_fixed_queries(self) -> None:
+        """Updating 10 or 50 wishlist items makes the same number of queries."""
+        items = [
+            {
+                "name": f"Item {index}",
+                "description": "Item",
+                "product_url": "https://shop.example",
+                "info_url": "https://shop.example",
+            }
+            for index in range(60)
+        ]
+        created = self.batch("/api/wishlist/batch/", "post", items)[2]
+        ids = [result["id"] for result in created]
+        counts = [
+            self.batch(
+                "/api/wishlist/batch/",
+                "patch",
+                [{"id": pk, "price": 5} for pk in chunk],
+            )[1]
+            for chunk in (ids[:10], ids[10:])
+        ]
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(WishlistItem.objects.filter(price=5).count(), 60)
+        status_code, _, results = self.batch(
+            "/api/wishlist/batch/", "patch", [{"id": 0, "price": 1}]
+        )
+        self.assertEqual(status_code, 400)
+        self.assertEqual(results[0]["errors"], {"id": ["Not found."]})
+
+    def test_books_with_authors(self) -> None:
+        """Books are created and updated with their authors."""
+        authors = [Author.objects.create(name=name) for name in ("One", "Two")]
+        book = {
+            "title": "Book",
+            "subtitle": "",
+            "publisher": "Publisher",
+            "published": "2024-01-01",
+            "description": "Book",
+            "thumbnail": "",
+        }
+        _, _, results = self.batch(
+            "/api/books/batch/",
+            "post",
+            [
+                {
+                    **book,
+                    "isbn10": f"{index:010d}",
+                    "isbn13": f"{index:013d}",
+                    "authors": [authors[index].pk],
+                }
+                for index in range(2)
+            ],
+        )
+        first = Book.objects.get(pk=results[0]["id"])
+        self.assertEqual(list(first.authors.all()), [authors[0]])
+        self.batch(
+            "/api/books/batch/",
+            "patch",
+            [{"id": first.pk, "authors": [author.pk for author in authors]}],
+        )
+        self.assertEqual(first.authors.count(), 2)
+
+    def test_delete(self) -> None:
+        """Deleting reports rows that were not found."""
+        created = self.batch("/api/network/batch/", "post", self.devices(0, 2))[2]
+        status_code, _, results = self.batch(
+            "/api/network/batch/", "delete", [created[0]["id"], 0]
+        )
+        self.assertEqual(status_code, 200)
+        self.assertEqual(
+            [result["status"] for result in results], ["deleted", "not_found"]
+        )
+        self.assertEqual(Device.objects.count(), 1)
+
+
+class ApiResponseCacheTests(TestCase):
+    """Tests for the API response cache."""
+
+    def setUp(self) -> None:
+        """Log in and create a book."""
+        cache.clear()
+        self.user = User.objects.create_user(username="user")
+        self.client.force_login(self.user)
+        self.book = Book.objects.create(
+            title="Book",
+            subtitle="",
+            publisher="Publisher",
+            published=date(2024, 1, 1),
+            isbn10="0000000000",
+            isbn13="0000000000000",
+            description="Book",
+            thumbnail="",
+        )
+
+    def cache_counts(self) -> dict[str, int]:
+        """
+        Read the hit and miss counts, including those of earlier tests.
+
+        Returns:
+            Dictionary of hits and misses
+        """
+        return self.client.get("/api/cache/").json()
+
+    def test_hit_until_changed(self) -> None:
+        """Responses are served from the cache until a row they read changes."""
+        before = self.cache_counts()
+        first = self.client.get("/api/books/")
+        self.assertEqual(first["X-Cache"], "MISS")
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get("/api/books/")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.json(), first.json())
+        # Session, user and version lookups, counting the hit does not write.
+        self.assertEqual(len(queries), 3)
+        self.book.authors.add(Author.objects.create(name="Author"))
+        third = self.client.get("/api/books/")
+        self.assertEqual(third["X-Cache"], "MISS")
+        self.assertEqual(third.json()["results"][0]["authors"][0]["name"], "Author")
+        after = self.cache_counts()
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 2)
+
+    def test_counts_survive_cache_clear(self) -> None:
+        """Hit and miss counts are not lost when cache entries are removed."""
+        before = self.cache_counts()
+        self.client.get("/api/books/")
+        self.client.get("/api/books/")
+        cache.clear()
+        self.client.get("/api/books/")
+        after = self.cache_counts()
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 2)
+
+    def test_counts_flushed_after_interval(self) -> None:
+        """Counts are added to the database once the interval has passed."""
+        counts = CounterBuffer(interval=0)
+        with CaptureQueriesContext(connection) as queries:
+            counts.add(RESPONSE_CACHE_HITS)
+        self.assertEqual(len(queries), 1)
+        counts = CounterBuffer(interval=60)
+        with CaptureQueriesContext(connection) as queries:
+            counts.add(RESPONSE_CACHE_HITS)
+        self.assertEqual(len(queries), 0)
+
+    def test_keyed_by_query_and_user(self) -> None:
+        """Different query parameters and users do not share entries."""
+        self.client.get(f"/api/books/{self.book.pk}/")
+        response = self.client.get(f"/api/books/{self.book.pk}/?fields=title")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json(), {"title": "Book"})
+        self.client.force_login(User.objects.create_user(username="other"))
+        response = self.client.get(f"/api/books/{self.book.pk}/")
+        self.assertEqual(response["X-Cache"], "MISS")
+
+
+class ApiValuesListTests(TestCase):
+    """Tests that lists built from values() match the serializers."""
+
+    def setUp(self) -> None:
+        """Log in and create the rows to list."""
+        cache.clear()
+        self.user = User.objects.create_user(username="user")
+        self.client.force_login(self.user)
+        vendor = Vendor.objects.create(name="Vendor", url="https://vendor")
+        device_fields = {
+            "operating_system": OperatingSystem.objects.create(
+                name="OS", vendor=vendor
+            ),
+            "hardware_vendor": vendor,
+            "model": Model.objects.create(name="Model", vendor=vendor),
+            "device_type": DeviceType.objects.create(name="Switch", image="switch"),
+            "connection_type": ConnectionType.objects.create(name="Ethernet"),
+        }
+        switch = Device.objects.create(
+            hostname="switch", ip_address="10.0.0.1", **device_fields
+        )
+        Device.objects.create(
+            hostname="server", connected_too=switch, port=1, **device_fields
+        )
+        organisation = Organisation.objects.create(name="Bank", url="https://bank")
+        self.bill = Bill.objects.create(
+            name="Bill",
+            description="Bill",
+            organisation=organisation,
+            bill_type=BillType.objects.create(name="Loan"),
+            paid_from=PaidFrom.objects.create(name="Main Balance"),
+            current_balance=Decimal("12.50"),
+            start_date="2024-01-01T00:00:00Z",
+        )
+        BillHistory.objects.create(bill=self.bill, current_balance=Decimal("1.25"))
+
+    def assertMatchesDetail(self, url: str) -> None:
+        """
+        Check each row of a list matches the detail response of its URL.
+
+        Args:
+            url: URL of the list
+        """
+        rows = self.client.get(url).json()["results"]
+        self.assertTrue(rows)
+        for row in rows:
+            self.assertEqual(row, self.client.get(row["url"]).json())
+
+    def test_lists_match_details(self) -> None:
+        """Lists match the serializer, including null relations and decimals."""
+        self.assertMatchesDetail("/api/network/")
+        self.assertMatchesDetail("/api/finance/bills/")
+        rows = self.client.get("/api/network/").json()["results"]
+        self.assertNotIn("connected_too", rows[0])
+        self.assertEqual(rows[1]["connected_too"], "switch")
+        self.assertIsNone(rows[0]["description"])
+
+    def test_sparse_fields(self) -> None:
+        """Requested fields are respected."""
+        response = self.client.get("/api/network/?fields=hostname,model")
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {"hostname": "switch", "model": {"name": "Model", "vendor": "Vendor"}},
+                {"hostname": "server", "model": {"name": "Model", "vendor": "Vendor"}},
+            ],
+        )
+
+    def test_history(self) -> None:
+        """History matches its serializer."""
+        response = self.client.get(f"/api/finance/bills/{self.bill.pk}/history/")
+        history = BillHistory.objects.filter(bill=self.bill).order_by("pk")
+        self.assertEqual(len(history), 2)
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {
+                    "bill": self.bill.pk,
+                    "current_balance": str(entry.current_balance),
+                    "date": entry.date.isoformat(),
+                }
+                for entry in history
+            ],
+        )
+
+    def test_unsupported_serializer(self) -> None:
+        """Serializers with a many to many relation are not represented."""
+        request = APIRequestFactory().get("/api/books/")
+        self.assertIsNone(
+            ValuesRepresentation.for_serializer(
+                BookSerializer(context={"request": Request(request)})
+            )
+        )
+
+
+class ApiExportTests(TestCase):
+    """Tests for the streaming table exports."""
+
+    def setUp(self) -> None:
+        """Log in and create transactions to export."""
+        self.user = User.objects.create_user(username="user")
+        self.client.force_login(self.user)
+        merchant = MonzoMerchant.objects.create(merchant_id="merch_0", name="Shop")
+        MonzoTransaction.objects.bulk_create(
+            MonzoTransaction(
+                transaction_id=f"tx_{index}",
+                currency="GBP",
+                value=-100 * index,
+                created=datetime(2024, 1, 1 + index, 12, tzinfo=dt_timezone.utc),
+                description=f"Transaction {index}",
+                merchant=merchant if index else None,
+            )
+            for index in range(3)
+        )
+
+    def export(self, url: str, **headers: str) -> bytes:
+        """
+        Request an export and read the whole stream.
+
+        Args:
+            url: URL of the export
+            headers: Request headers
+
+        Returns:
+            Body of the response
+        """
+        response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_ndjson(self) -> None:
+        """Each row is a JSON object on its own line."""
+        lines = self.export("/api/export/transactions.ndjson").decode().splitlines()
+        self.assertEqual(
+            json.loads(lines[1]),
+            {
+                "transaction_id": "tx_1",
+                "created": "2024-01-02T12:00:00Z",
+                "value": -100,
+                "currency": "GBP",
+                "description": "Transaction 1",
+                "merchant": "Shop",
+                "has_receipt": False,
+                "bill": None,
+            },
+        )
+        self.assertEqual(len(lines), 3)
+
+    def test_csv_between_dates(self) -> None:
+        """CSV has a header line and only rows between the dates."""
+        content = self.export(
+            "/api/export/transactions.csv?start=2024-01-02&end=2024-01-03",
+            accept="text/csv",
+        )
+        rows = list(csv.reader(content.decode().splitlines()))
+        self.assertEqual(rows[0][:3], ["transaction_id", "created", "value"])
+        self.assertEqual([row[0] for row in rows[1:]], ["tx_1", "tx_2"])
+        self.assertEqual(rows[1][1], "2024-01-02T12:00:00Z")
+
+    def test_gzip(self) -> None:
+        """Clients accepting gzip get the same export compressed."""
+        response = self.client.get(
+            "/api/export/transactions.csv", headers={"accept-encoding": "gzip"}
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(
+            gzip.decompress(b"".join(response.streaming_content)),
+            self.export("/api/export/transactions.csv"),
+        )
+
+    def test_gzip_refused(self) -> None:
+        """Clients refusing gzip with a quality of zero get the export uncompressed."""
+        response = self.client.get(
+            "/api/export/transactions.csv",
+            headers={"accept-encoding": "gzip;q=0, identity"},
+        )
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_read_in_chunks(self) -> None:
+        """Each chunk is a query for the rows after the last one read."""
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(EXPORTS["transactions"].rows(chunk_size=2))
+        self.assertEqual([row[0] for row in rows], ["tx_0", "tx_1", "tx_2"])
+        self.assertEqual(len(queries), 2)
+
+    def test_last_date(self) -> None:
+        """The last possible end date includes every row."""
+        content = self.export("/api/export/transactions.ndjson?end=9999-12-31")
+        self.assertEqual(len(content.decode().splitlines()), 3)
+
+    def test_errors(self) -> None:
+        """Unknown exports, bad dates and dates on undated tables are rejected."""
+        self.assertEqual(self.client.get("/api/export/users.csv").status_code, 404)
+        self.assertEqual(self.client.get("/api/export/devices.xml").status_code, 404)
+        self.assertEqual(
+            self.client.get("/api/export/devices.csv?start=2024-01-01").status_code,
+            400,
+        )
+        self.assertEqual(
+            self.client.get("/api/export/bill-history.csv?end=soon").status_code,
+            400,
+        )
+        self.client.logout()
+        self.assertEqual(self.client.get("/api/export/devices.csv").status_code, 401)
+
+
+class ApiChangesTests(TestCase):
+    """Tests for the change journal and the change feed."""
+
+    def setUp(self) -> None:
+        """Log in and store the position of the change log."""
+        self.user = User.objects.create_user(username="user")
+        self.client.force_login(self.user)
+        self.since = self.client.get("/api/changes/").json()["next"]
+
+    def create_item(self, name: str) -> WishlistItem:
+        """
+        Create a wishlist item.
+
+        Args:
+            name: Name of the item
+
+        Returns:
+            New item
+        """
+        return WishlistItem.objects.create(
+            name=name,
+            description=name,
+            product_url="https://shop.example",
+            info_url="https://shop.example",
+        )
+
+    @staticmethod
+    def settle() -> None:
+        """Age the logged changes so the feed no longer holds them back."""
+        ChangeLog.objects.update(
+            changed=django_timezone.now() - CHANGES_SETTLE_TIME - timedelta(seconds=1)
+        )
+
+    def fetch_changes(self, settle: bool = True, **params: int) -> dict:
+        """
+        Fetch the changes since setUp.
+
+        Args:
+            settle: True to age the logged changes first
+            params: Query parameters replacing the defaults
+
+        Returns:
+            Response content
+        """
+        if settle:
+            self.settle()
+        response = self.client.get("/api/changes/", {"since": self.since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_upserts_and_deletes_in_order(self) -> None:
+        """Each row appears once at its last change, with its current data."""
+        first = self.create_item("First")
+        second = self.create_item("Second")
+        first.quantity = 2
+        first.save()
+        second_pk = second.pk
+        second.delete()
+        content = self.fetch_changes()
+        self.assertFalse(content["more"])
+        self.assertEqual(
+            [
+                (change["model"], change["pk"], change["operation"])
+                for change in content["changes"]
+            ],
+            [
+                ("wishlist.wishlistitem", first.pk, "upsert"),
+                ("wishlist.wishlistitem", second_pk, "delete"),
+            ],
+        )
+        self.assertEqual(
+            content["changes"][0]["data"],
+            self.client.get(f"/api/wishlist/{first.pk}/").json(),
+        )
+        self.assertNotIn("data", content["changes"][1])
+        self.assertEqual(content["next"], content["changes"][1]["sequence"])
+        self.assertEqual(self.fetch_changes(since=content["next"])["changes"], [])
+
+    def test_pages(self) -> None:
+        """Changes are returned a page at a time."""
+        items = [self.create_item(f"Item {index}") for index in range(3)]
+        content = self.fetch_changes(limit=2)
+        self.assertTrue(content["more"])
+        self.assertEqual(
+            [change["pk"] for change in content["changes"]],
+            [item.pk for item in items[:2]],
+        )
+        content = self.fetch_changes(since=content["next"], limit=2)
+        self.assertFalse(content["more"])
+        self.assertEqual([change["pk"] for change in content["changes"]], [items[2].pk])
+
+    def test_relations_and_batches(self) -> None:
+        """Many to many changes and batch writes are logged."""
+        book = Book.objects.create(
+            title="Book",
+            subtitle="",
+            publisher="Publisher",
+            published=date(2024, 1, 1),
+            isbn10="0000000000",
+            isbn13="0000000000000",
+            description="Book",
+            thumbnail="",
+        )
+        since = ChangeLog.objects.latest("sequence").sequence
+        book.authors.add(Author.objects.create(name="Author"))
+        self.client.post(
+            "/api/wishlist/batch/",
+            [
+                {
+                    "name": "Batch",
+                    "description": "Batch",
+                    "product_url": "https://shop.example",
+                    "info_url": "https://shop.example",
+                }
+            ],
+            content_type="application/json",
+        )
+        changes = self.fetch_changes(since=since)["changes"]
+        self.assertEqual(
+            [change["model"] for change in changes],
+            ["books.book", "books.author", "wishlist.wishlistitem"],
+        )
+        self.assertEqual(changes[0]["data"]["authors"][0]["name"], "Author")
+        self.assertEqual(changes[2]["data"]["name"], "Batch")
+
+    def test_fixed_queries(self) -> None:
+        """The feed makes the same number of queries for 2 and 50 changes."""
+
+        def count(items: int) -> int:
+            since = self.client.get("/api/changes/").json()["next"]
+            for index in range(items):
+                self.create_item(f"Item {index}")
+            with CaptureQueriesContext(connection) as queries:
+                self.fetch_changes(since=since)
+            return len(queries)
+
+        self.assertEqual(count(2), count(50))
+
+    def test_changes_held_until_settled(self) -> None:
+        """A change logged before another is not skipped if it commits later."""
+        # A long transaction logs the first change, a short one logs the second
+        # and commits while the first is still uncommitted, so not yet visible.
+        first = self.create_item("First")
+        first_entry = ChangeLog.objects.get(object_pk=first.pk)
+        ChangeLog.objects.filter(pk=first_entry.pk).delete()
+        second = self.create_item("Second")
+        content = self.fetch_changes(settle=False)
+        self.assertEqual(content, {"next": self.since, "more": False, "changes": []})
+        self.assertEqual(self.client.get("/api/changes/").json()["next"], self.since)
+        # The long transaction commits.
+        first_entry.save()
+        self.settle()
+        content = self.fetch_changes()
+        self.assertEqual(
+            self.client.get("/api/changes/").json()["next"], content["next"]
+        )
+        self.assertEqual(
+            [change["pk"] for change in content["changes"]], [first.pk, second.pk]
+        )
+
+    def test_every_journaled_model_has_a_feed(self) -> None:
+        """Every journaled model can be represented in the feed."""
+        self.assertEqual(set(CHANGE_FEEDS), JOURNALED_LABELS)
+
+    def test_invalid_parameters(self) -> None:
+        """Invalid since and limit values are rejected."""
+        for params in ({"since": "x"}, {"since": -1}, {"since": 0, "limit": 0}):
+            response = self.client.get("/api/changes/", params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class ApiDashboardTests(TestCase):
+    """Tests for the home dashboard."""
+
+    def setUp(self) -> None:
+        """Log in and create a row for each section."""
+        cache.clear()
+        self.user = User.objects.create_user(username="user")
+        self.client.force_login(self.user)
+        now = django_timezone.now()
+        self.task = Task.objects.create(title="Task", due_by=now + timedelta(seconds=5))
+        Event.objects.create(
+            name="Event",
+            description="Event",
+            start=now + timedelta(days=1),
+            ends=now + timedelta(days=2),
+        )
+        WishlistItem.objects.create(
+            name="Item",
+            description="Item",
+            product_url="https://shop.example",
+            info_url="https://shop.example",
+        )
+
+    def timings(self, response) -> dict[str, str]:
+        """
+        Read the descriptions of the Server-Timing metrics.
+
+        Args:
+            response: Response with a Server-Timing header
+
+        Returns:
+            Description of each metric, empty for metrics without one
+        """
+        metrics = {}
+        for metric in response["Server-Timing"].split(", "):
+            name, *params = metric.split(";")
+            metrics[name] = "".join(
+                param[6:-1] for param in params if param.startswith("desc=")
+            )
+        return metrics
+
+    def test_sections(self) -> None:
+        """Every section is returned in one response."""
+        content = self.client.get("/api/dashboard/").json()
+        self.assertEqual(content["bills"], {"total": "0", "bills": []})
+        self.assertEqual(content["events"][0]["name"], "Event")
+        self.assertEqual(content["tasks"][0]["title"], "Task")
+        self.assertEqual(content["wishlist"][0]["name"], "Item")
+        self.assertEqual(content["devices"], 0)
+
+    def test_bills_match_payments(self) -> None:
+        """Bills without a start date or starting later in the month are listed."""
+        organisation = Organisation.objects.create(name="Bank", url="https://bank")
+        bill_type = BillType.objects.create(name="Utility")
+        paid_from = PaidFrom.objects.create(name="Pot")
+        for name, start, end in [
+            ("Always", None, None),
+            ("Mid month", "2024-03-15", None),
+            ("Next month", "2024-04-01", None),
+            ("Finished", None, "2024-02-01"),
+        ]:
+            Bill.objects.create(
+                name=name,
+                description=name,
+                organisation=organisation,
+                bill_type=bill_type,
+                paid_from=paid_from,
+                monthly_payments=Decimal(10),
+                start_date=start and f"{start}T00:00:00Z",
+                last_payment=end and f"{end}T00:00:00Z",
+            )
+        bills = build_dashboard(today=date(2024, 3, 10))[0]["bills"]
+        self.assertEqual(
+            [bill["name"] for bill in bills["bills"]], ["Always", "Mid month"]
+        )
+        self.assertEqual(bills["total"], "20.00")
+        payments = self.client.get("/finance/payments/?month=2024-03")
+        self.assertEqual(
+            sorted(bill.name for bill in payments.context["payment_list"]),
+            ["Always", "Mid month"],
+        )
+
+    def test_sections_cached_until_changed(self) -> None:
+        """Cached sections are reused and only changed sections are rebuilt."""
+        with CaptureQueriesContext(connection) as cold:
+            first = self.client.get("/api/dashboard/")
+        self.assertEqual(set(self.timings(first).values()), {"", "miss"})
+        with CaptureQueriesContext(connection) as warm:
+            second = self.client.get("/api/dashboard/")
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(set(self.timings(second).values()), {"", "hit"})
+        self.assertEqual(len(cold) - len(warm), 5)
+        self.task.completed = True
+        self.task.save()
+        third = self.client.get("/api/dashboard/")
+        self.assertEqual(third.json()["tasks"], [])
+        self.assertEqual(self.timings(third)["tasks"], "miss")
+        self.assertEqual(self.timings(third)["events"], "hit")
+
+    def test_index(self) -> None:
+        """The index page shows the dashboard to signed in users."""
+        response = self.client.get("/")
+        self.assertContains(response, "Tasks due")
+        self.assertIn("tasks;dur=", response["Server-Timing"])
+        self.client.logout()
+        response = self.client.get("/")
+        self.assertNotContains(response, "Tasks due")
+        self.assertFalse(response.has_header("Server-Timing"))
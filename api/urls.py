@@ -7,11 +7,15 @@ from api.views import (
     AuthorViewSet,
     BillViewSet,
     BookViewSet,
+    ExportView,
     InvestmentViewSet,
     NetworkViewSet,
     WebsiteViewSet,
     WhoAmIViewSet,
     WishlistViewSet,
+    changes,
+    dashboard,
+    response_cache,
 )
 
 router = routers.DefaultRouter()
@@ -25,5 +29,13 @@ router.register(r"whoami", WhoAmIViewSet)
 router.register(r"wishlist", WishlistViewSet)
 
 urlpatterns = [
+    path("cache/", response_cache, name="response_cache"),
+    path("changes/", changes, name="changes"),
+    path("dashboard/", dashboard, name="dashboard"),
+    path(
+        "export/<slug:table>.<slug:export_format>",
+        ExportView.as_view(),
+        name="export",
+    ),
     path("", include(router.urls), name="api"),
 ]
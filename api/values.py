@@ -0,0 +1,251 @@
+"""Representations of model serializers built from values() rows."""
+
+from typing import Any, Callable, Iterable, Optional
+
+from django.db import models
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.reverse import reverse
+
+URL_PK_PLACEHOLDER = "__pk__"
+
+# Output name, values() key, converter applied to values that are not None, the
+# fields of a nested serializer, the keys of the relations a dotted source passes
+# through and whether the field is left out when one of those is null.
+ValuesField = tuple[
+    str, str, Optional[Callable[[Any], Any]], Optional[list], tuple[str, ...], bool
+]
+
+# Fields whose representation of a database value is the value itself.
+IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+
+
+class ValuesRepresentation:
+    """
+    Class to build the output of a model serializer from values() rows.
+
+    Each field is compiled once to the values() key it reads and the conversion
+    it needs, so rows are represented without creating model instances or
+    walking attributes. The output matches the serializer's exactly.
+    """
+
+    __slots__ = ["_fields", "_keys"]
+
+    def __init__(self, fields: list[ValuesField], keys: list[str]) -> None:
+        """
+        Initialise ValuesRepresentation.
+
+        Args:
+            fields: Compiled fields
+            keys: Lookup paths to read with values()
+        """
+        self._fields = fields
+        self._keys = keys
+
+    @classmethod
+    def for_serializer(
+        cls, serializer: serializers.ModelSerializer
+    ) -> Optional["ValuesRepresentation"]:
+        """
+        Compile the fields of a serializer.
+
+        Args:
+            serializer: Serializer to match, with its context
+
+        Returns:
+            Representation, None if a field cannot be read from values()
+        """
+        keys = ["pk"]
+        fields = _compile(serializer=serializer, prefix="", keys=keys)
+        if fields is None:
+            return None
+        return cls(fields=fields, keys=list(dict.fromkeys(keys)))
+
+    def queryset(self, queryset: models.QuerySet) -> models.QuerySet:
+        """
+        Read only the values the serializer needs.
+
+        Args:
+            queryset: Queryset of the serializer's model
+
+        Returns:
+            Queryset of dictionaries
+        """
+        return queryset.prefetch_related(None).values(*self._keys)
+
+    def represent(self, rows: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Represent values() rows as the serializer would their instances.
+
+        Args:
+            rows: Rows from queryset()
+
+        Returns:
+            List of representations
+        """
+        fields = self._fields
+        return [_represent(fields, row) for row in rows]
+
+
+def _represent(fields: list[ValuesField], row: dict[str, Any]) -> dict[str, Any]:
+    """
+    Represent a single row.
+
+    Args:
+        fields: Compiled fields
+        row: Row from values()
+
+    Returns:
+        Representation of the row
+    """
+    data = {}
+    for name, key, convert, nested, relations, skip in fields:
+        value = row[key]
+        if value is None:
+            if skip and any(row[relation] is None for relation in relations):
+                continue
+            data[name] = None
+        elif nested is not None:
+            data[name] = _represent(nested, row)
+        elif convert is None:
+            data[name] = value
+        else:
+            data[name] = convert(value)
+    return data
+
+
+def _compile(
+    serializer: serializers.ModelSerializer, prefix: str, keys: list[str]
+) -> Optional[list[ValuesField]]:
+    """
+    Compile the fields of a serializer or nested serializer.
+
+    Args:
+        serializer: Serializer to compile
+        prefix: Lookup path of a nested serializer's relation
+        keys: Lookup paths read so far, added to
+
+    Returns:
+        Compiled fields, None if a field cannot be read from values()
+    """
+    model = serializer.Meta.model
+    fields: list[ValuesField] = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.HyperlinkedIdentityField):
+            if prefix or field.lookup_field != "pk":
+                return None
+            fields.append((name, "pk", _url_converter(field), None, (), False))
+            continue
+        if isinstance(field, serializers.ModelSerializer):
+            if not _is_relation(model, field.source):
+                return None
+            path = f"{prefix}{field.source}"
+            nested = _compile(serializer=field, prefix=f"{path}{LOOKUP_SEP}", keys=keys)
+            if nested is None:
+                return None
+            keys.append(path)
+            fields.append((name, path, None, nested, (), False))
+            continue
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            if field.pk_field is not None:
+                return None
+            convert = None
+        elif isinstance(field, (serializers.FileField, serializers.RelatedField)):
+            return None
+        elif isinstance(field, serializers.Field) and not isinstance(
+            field, (serializers.BaseSerializer, serializers.ManyRelatedField)
+        ):
+            convert = (
+                None if isinstance(field, IDENTITY_FIELDS) else field.to_representation
+            )
+        else:
+            return None
+        if field.source == "*" or not _is_column(model, field.source):
+            return None
+        *names, _ = field.source.split(".")
+        relations = tuple(
+            f"{prefix}{LOOKUP_SEP.join(names[: index + 1])}"
+            for index in range(len(names))
+        )
+        if relations and field.default is not empty:
+            return None
+        path = f"{prefix}{field.source.replace('.', LOOKUP_SEP)}"
+        keys.extend((*relations, path))
+        skip = not field.allow_null and not field.required
+        fields.append((name, path, convert, None, relations, skip))
+    return fields
+
+
+def _url_converter(field: serializers.HyperlinkedIdentityField) -> Callable[[Any], str]:
+    """
+    Build the URL of a row from its primary key.
+
+    The URL is reversed once with a placeholder, rows only substitute their key.
+
+    Args:
+        field: Hyperlinked identity field of the serializer
+
+    Returns:
+        Function taking a primary key and returning the URL
+    """
+    request = field.context.get("request")
+    url_format = field.context.get("format")
+    if url_format and field.format and field.format != url_format:
+        url_format = field.format
+    template = reverse(
+        field.view_name,
+        kwargs={field.lookup_url_kwarg: URL_PK_PLACEHOLDER},
+        request=request,
+        format=url_format,
+    )
+    before, _, after = template.partition(URL_PK_PLACEHOLDER)
+    return lambda pk: f"{before}{pk}{after}"
+
+
+def _is_column(model: type[models.Model], source: str) -> bool:
+    """
+    Check a dotted source ends in a column of the model or a related model.
+
+    Args:
+        model: Model the source starts from
+        source: Serializer field source such as organisation.name
+
+    Returns:
+        True if the source names a column
+    """
+    *relations, name = source.split(".")
+    for relation in relations:
+        if not _is_relation(model, relation):
+            return False
+        model = model._meta.get_field(relation).related_model
+    try:
+        field = model._meta.get_field(name)
+    except Exception:
+        return False
+    return field.concrete and not field.many_to_many
+
+
+def _is_relation(model: type[models.Model], name: str) -> bool:
+    """
+    Check a name is a foreign key or one to one relation of the model.
+
+    Args:
+        model: Model holding the relation
+        name: Field name
+
+    Returns:
+        True for a forward single valued relation
+    """
+    try:
+        field = model._meta.get_field(name)
+    except Exception:
+        return False
+    return bool(field.concrete and (field.many_to_one or field.one_to_one))
@@ -1,21 +1,486 @@
 """Views for the API app."""
 
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from itertools import takewhile
+from typing import Iterable, Iterator, Optional
 
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models import Prefetch, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from rest_framework import serializers, viewsets
-from rest_framework.decorators import action
+from django.utils.cache import get_conditional_response
+from django.utils.text import compress_sequence
+from rest_framework import permissions, serializers, status, viewsets
+from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import APIException
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.request import Request
 from rest_framework.response import Response as response
-
+from rest_framework.views import APIView
+
+from api.batch import BATCH_LIMIT, BatchSerializer, BatchWrite
+from api.cache import (
+    cache_response_data,
+    cached_response_data,
+    response_cache_key,
+    response_cache_statistics,
+)
+from api.dashboard import build_dashboard, server_timing
+from api.etags import versions_etag
+from api.exports import EXPORTS, accepts_gzip
+from api.models import ChangeLog
+from api.values import ValuesRepresentation
 from books.models import Author, Book
-from finance.models import Bill, BillHistory, Investments, InvestmentValue
-from network.models import Device, DeviceType, Model, OperatingSystem, Website
+from events.models import Event
+from finance.models import (
+    Bill,
+    BillHistory,
+    BillType,
+    Investments,
+    InvestmentValue,
+    Organisation,
+    PaidFrom,
+)
+from intranet.helpers import stream_csv, stream_ndjson
+from network.models import (
+    Device,
+    DeviceType,
+    DomainName,
+    Model,
+    OperatingSystem,
+    Vendor,
+    Website,
+)
 from wishlist.models import WishlistItem
 
+CHANGES_PAGE_SIZE = 100
+CHANGES_MAX_PAGE_SIZE = 1000
+# Sequence numbers are taken when a change is logged rather than when it commits,
+# so newer changes are held back until any transaction logged before them has
+# had this long to commit.
+CHANGES_SETTLE_TIME = timedelta(seconds=30)
+
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv"),
+    "ndjson": (stream_ndjson, "application/x-ndjson"),
+}
+
+
+def requested_fields(request: Optional[Request]) -> Optional[set[str]]:
+    """
+    Read the field names asked for with ?fields=name,name.
+
+    Only reads are restricted so writes always see every field.
+
+    Args:
+        request: Request being served
+
+    Returns:
+        Set of field names, None if every field is wanted
+    """
+    if request is None or request.method not in permissions.SAFE_METHODS:
+        return None
+    fields = request.query_params.get("fields", "")
+    return {name.strip() for name in fields.split(",") if name.strip()} or None
+
+
+def sparse_queryset(
+    queryset: models.QuerySet, serializer: serializers.ModelSerializer
+) -> models.QuerySet:
+    """
+    Restrict a queryset to the columns and relations a serializer reads.
+
+    Relations the serializer no longer reads are dropped from select_related and
+    prefetch_related. The queryset is returned unchanged when a field reads
+    anything other than a column, such as a property.
+
+    Args:
+        queryset: Queryset for the serializer's model
+        serializer: Serializer whose fields have been restricted
+
+    Returns:
+        Restricted queryset
+    """
+    if requested_fields(serializer.context.get("request")) is None:
+        return queryset
+    if serializer.Meta.model is not queryset.model:
+        return queryset
+    columns = _serializer_columns(serializer)
+    relations = queryset.query.select_related
+    if columns is None or relations is True:
+        return queryset
+    roots = {field.source.split(".")[0] for field in serializer.fields.values()} | {
+        column.split(LOOKUP_SEP)[0] for column in columns
+    }
+    related = [
+        path
+        for path in _relation_paths(relations or {})
+        if path.split(LOOKUP_SEP)[0] in roots
+    ]
+    prefetches = [
+        lookup
+        for lookup in queryset._prefetch_related_lookups
+        if (lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup).split(
+            LOOKUP_SEP
+        )[0]
+        in roots
+    ]
+    return (
+        queryset.select_related(None)
+        .select_related(*related)
+        .prefetch_related(None)
+        .prefetch_related(*prefetches)
+        .only(*columns, *related)
+    )
+
+
+def _serializer_columns(serializer: serializers.ModelSerializer) -> Optional[list[str]]:
+    """
+    List the columns a model serializer reads, following nested serializers.
+
+    Primary keys are always loaded and many-to-many fields are prefetched, so
+    neither is listed.
+
+    Args:
+        serializer: Serializer to inspect
+
+    Returns:
+        Column paths, None if a field reads anything other than a column
+    """
+    columns = []
+    for field in serializer.fields.values():
+        if isinstance(
+            field,
+            (
+                serializers.HyperlinkedIdentityField,
+                serializers.ListSerializer,
+                serializers.ManyRelatedField,
+            ),
+        ):
+            continue
+        source = field.source.replace(".", LOOKUP_SEP)
+        if isinstance(field, serializers.ModelSerializer):
+            nested = _serializer_columns(field)
+            if nested is None:
+                return None
+            columns.append(source)
+            columns.extend(f"{source}{LOOKUP_SEP}{column}" for column in nested)
+        elif _is_column(serializer.Meta.model, source):
+            columns.append(source)
+        else:
+            return None
+    return columns
+
+
+def _is_column(model: type[models.Model], path: str) -> bool:
+    """
+    Check a lookup path ends in a column of the model or a related model.
+
+    Args:
+        model: Model the path starts from
+        path: Lookup path such as organisation__name
+
+    Returns:
+        True if the path names a column
+    """
+    *relations, name = path.split(LOOKUP_SEP)
+    try:
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+            if model is None:
+                return False
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return field.concrete and not field.many_to_many
+
+
+def _relation_paths(relations: dict, prefix: str = "") -> Iterator[str]:
+    """
+    Flatten a select_related tree into lookup paths, parents before children.
+
+    Args:
+        relations: Nested dictionary as held on Query.select_related
+        prefix: Path of the parent relation
+
+    Returns:
+        Iterator of lookup paths
+    """
+    for name, children in relations.items():
+        path = f"{prefix}{name}"
+        yield path
+        yield from _relation_paths(children, f"{path}{LOOKUP_SEP}")
+
+
+class SparseFieldsetSerializer(serializers.ModelSerializer):
+    """Model serializer that only outputs the fields asked for with ?fields=."""
+
+    def get_fields(self) -> dict[str, serializers.Field]:
+        """
+        Return the serializer's fields, restricted to those requested.
+
+        Nested serializers are left whole, the parameter names top level fields.
+
+        Returns:
+            Dictionary of field names to fields
+        """
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        requested = requested_fields(self.context.get("request"))
+        if parent is not None or requested is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in requested}
+
+
+class NotModified(APIException):
+    """Exception to end a request whose ETag matches If-None-Match."""
+
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+class ConditionalGetMixin:
+    """
+    Mixin for viewsets to answer If-None-Match from model change counts.
+
+    version_models lists the models a response is built from, actions reading
+    other models set their own with @action(version_models=...).
+    """
+
+    etag: Optional[str] = None
+    version_daily: bool = False
+    version_models: tuple[type[models.Model], ...] = ()
+
+    def initial(self, request: Request, *args, **kwargs) -> None:
+        """
+        Check the ETag once the request is authenticated, before any query.
+
+        Args:
+            request: Request being served
+            args: Positional view arguments
+            kwargs: Keyword view arguments
+
+        Raises:
+            NotModified: If the client already holds the current response
+        """
+        super().initial(request, *args, **kwargs)
+        if request.method not in ("GET", "HEAD") or not self.version_models:
+            return
+        self.etag = versions_etag(
+            self.version_models,
+            request.user.pk,
+            request.accepted_media_type,
+            date.today() if self.version_daily else None,
+        )
+        conditional = get_conditional_response(request, etag=self.etag)
+        if conditional is not None and conditional.status_code == 304:
+            raise NotModified()
+
+    def handle_exception(self, exc: Exception) -> response:
+        """
+        Answer an unchanged response with an empty 304.
+
+        Args:
+            exc: Exception raised while serving the request
+
+        Returns:
+            Response for the exception
+        """
+        if isinstance(exc, NotModified):
+            return response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request: Request, response, *args, **kwargs):
+        """
+        Add the ETag to successful responses.
+
+        Args:
+            request: Request being served
+            response: Response for the request
+            args: Positional view arguments
+            kwargs: Keyword view arguments
+
+        Returns:
+            Response with its ETag
+        """
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.etag and response.status_code in (200, 304):
+            response["ETag"] = self.etag
+        return response
+
+
+class CachedResponseMixin:
+    """
+    Mixin for viewsets to cache list and detail responses.
+
+    Must be combined with ConditionalGetMixin, whose ETag forms the cache key so
+    saving or deleting a row the response reads stops it being served.
+    """
+
+    def list(self, request: Request, *args, **kwargs) -> response:
+        """
+        Return the cached list, building it on a miss.
+
+        Args:
+            request: Request being served
+            args: Positional view arguments
+            kwargs: Keyword view arguments
+
+        Returns:
+            List response
+        """
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request: Request, *args, **kwargs) -> response:
+        """
+        Return the cached object, building it on a miss.
+
+        Args:
+            request: Request being served
+            args: Positional view arguments
+            kwargs: Keyword view arguments
+
+        Returns:
+            Detail response
+        """
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request: Request, *args, **kwargs) -> response:
+        """
+        Serve response data from the cache or build and store it.
+
+        Args:
+            handler: View method building the response
+            request: Request being served
+            args: Positional view arguments
+            kwargs: Keyword view arguments
+
+        Returns:
+            Response with an X-Cache header of HIT or MISS
+        """
+        if self.etag is None:
+            return handler(request, *args, **kwargs)
+        key = response_cache_key(etag=self.etag, url=request.build_absolute_uri())
+        data = cached_response_data(key)
+        if data is not None:
+            return response(data, headers={"X-Cache": "HIT"})
+        result = handler(request, *args, **kwargs)
+        if result.status_code == status.HTTP_200_OK:
+            cache_response_data(key=key, data=result.data)
+        result["X-Cache"] = "MISS"
+        return result
+
+
+class ValuesListMixin:
+    """
+    Mixin for viewsets to build list responses from values() rows.
+
+    Rows are represented by a ValuesRepresentation of the serializer rather than
+    by serializing model instances, giving the same output. Serializers with a
+    field values() cannot provide, such as a many to many relation, use the
+    serializer as normal.
+    """
+
+    def list(self, request: Request, *args, **kwargs) -> response:
+        """
+        Return the list of rows.
+
+        Args:
+            request: Request being served
+            args: Positional view arguments
+            kwargs: Keyword view arguments
+
+        Returns:
+            List response
+        """
+        return self.values_response(self.filter_queryset(self.get_queryset()))
+
+    def values_response(self, queryset: models.QuerySet) -> response:
+        """
+        Paginate and represent a queryset with the view's serializer.
+
+        Args:
+            queryset: Rows to represent
+
+        Returns:
+            Paginated response when the view paginates, otherwise the full list
+        """
+        serializer = self.get_serializer()
+        representation = ValuesRepresentation.for_serializer(serializer)
+        if representation is None:
+            page = self.paginate_queryset(queryset)
+            if page is None:
+                return response(self.get_serializer(queryset, many=True).data)
+            return self.get_paginated_response(
+                self.get_serializer(page, many=True).data
+            )
+        rows = representation.queryset(queryset)
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return response(representation.represent(rows))
+        return self.get_paginated_response(representation.represent(page))
+
+
+class SparseFieldsetMixin:
+    """Mixin for viewsets to only select the columns of the fields requested."""
+
+    def get_queryset(self) -> models.QuerySet:
+        """
+        Return the queryset restricted to the requested fields.
+
+        Returns:
+            Queryset for the view
+        """
+        return sparse_queryset(super().get_queryset(), self.get_serializer())
+
+
+class BatchMixin:
+    """
+    Mixin for viewsets to create, update and delete many rows in one request.
+
+    POST creates a row per object, PATCH changes the rows named by each object's
+    id and DELETE removes the rows with the given ids. Everything is validated
+    before anything is written and the response holds a result per object.
+    """
+
+    batch_serializer_class: type[BatchSerializer]
+
+    @action(detail=False, methods=["post", "patch", "delete"])
+    def batch(self, request: Request) -> response:
+        """
+        Write a batch of rows.
 
-class AuthorSerializer(serializers.ModelSerializer):
+        Args:
+            request: Request holding a list of objects
+
+        Returns:
+            Response holding the result for each object
+        """
+        items = request.data
+        if not isinstance(items, list) or not 0 < len(items) <= BATCH_LIMIT:
+            return response(
+                {"detail": f"Expected a list of 1 to {BATCH_LIMIT} objects."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        writer = BatchWrite(
+            serializer_class=self.batch_serializer_class,
+            context=self.get_serializer_context(),
+            partial=request.method == "PATCH",
+        )
+        if request.method == "POST":
+            status_code, results = writer.create(items)
+        elif request.method == "PATCH":
+            status_code, results = writer.update(items)
+        else:
+            status_code, results = writer.delete(items)
+        return response({"results": results}, status=status_code)
+
+
+class AuthorSerializer(SparseFieldsetSerializer):
     """Serializer to represent the Author model."""
 
     class Meta:
@@ -28,7 +493,7 @@ class AuthorSerializer(serializers.ModelSerializer):
         ]
 
 
-class BillSerializer(serializers.ModelSerializer):
+class BillSerializer(SparseFieldsetSerializer):
     """Serializer to represent the Bill model."""
 
     bill_type = serializers.ReadOnlyField(source="bill_type.name")
@@ -55,7 +520,7 @@ class BillSerializer(serializers.ModelSerializer):
         ]
 
 
-class BillHistorySerializer(serializers.ModelSerializer):
+class BillHistorySerializer(SparseFieldsetSerializer):
     """Serializer to represent the BillHistory model."""
 
     class Meta:
@@ -69,7 +534,7 @@ class BillHistorySerializer(serializers.ModelSerializer):
         ]
 
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(SparseFieldsetSerializer):
     """Serializer to represent the Book model."""
 
     authors = AuthorSerializer(many=True)
@@ -106,7 +571,26 @@ class DeviceTypeSerializer(serializers.ModelSerializer):
         ]
 
 
-class InvestmentSerializer(serializers.ModelSerializer):
+class EventSerializer(serializers.ModelSerializer):
+    """Serializer to represent the Event model."""
+
+    venue = serializers.ReadOnlyField(source="venue.name")
+
+    class Meta:
+        """Metaclass to map serializer's fields with the model fields."""
+
+        model = Event
+        fields = [
+            "id",
+            "name",
+            "description",
+            "venue",
+            "start",
+            "ends",
+        ]
+
+
+class InvestmentSerializer(SparseFieldsetSerializer):
     """Serializer to represent the Investment model."""
 
     organisation = serializers.ReadOnlyField(source="organisation.name")
@@ -124,7 +608,7 @@ class InvestmentSerializer(serializers.ModelSerializer):
         ]
 
 
-class InvestmentHistorySerializer(serializers.ModelSerializer):
+class InvestmentHistorySerializer(SparseFieldsetSerializer):
     """Serializer to represent the InvestmentValue model."""
 
     class Meta:
@@ -167,7 +651,7 @@ class OSSerializer(serializers.ModelSerializer):
         ]
 
 
-class WebsiteSerializer(serializers.ModelSerializer):
+class WebsiteSerializer(SparseFieldsetSerializer):
     """Serializer to represent the Website model."""
 
     hosted_on = serializers.ReadOnlyField(source="hosted_on.hostname")
@@ -184,7 +668,7 @@ class WebsiteSerializer(serializers.ModelSerializer):
         ]
 
 
-class WhoAmISerializer(serializers.ModelSerializer):
+class WhoAmISerializer(SparseFieldsetSerializer):
     """Serializer to represent the current user."""
 
     class Meta:
@@ -194,7 +678,7 @@ class WhoAmISerializer(serializers.ModelSerializer):
         fields = ["url", "username", "email", "is_staff"]
 
 
-class WishlistSerializer(serializers.ModelSerializer):
+class WishlistSerializer(SparseFieldsetSerializer):
     """Serializer to represent the WishlistItem model."""
 
     class Meta:
@@ -215,7 +699,7 @@ class WishlistSerializer(serializers.ModelSerializer):
         ]
 
 
-class NetworkSerializer(serializers.ModelSerializer):
+class NetworkSerializer(SparseFieldsetSerializer):
     """Serializer to represent the Device model."""
 
     operating_system = OSSerializer()
@@ -240,46 +724,154 @@ class NetworkSerializer(serializers.ModelSerializer):
         ]
 
 
-class AuthorViewSet(viewsets.ModelViewSet):
+class BookBatchSerializer(BatchSerializer):
+    """Serializer to write Book rows in a batch."""
+
+    class Meta:
+        """Metaclass to map serializer's fields with the model fields."""
+
+        model = Book
+        fields = [
+            "id",
+            "authors",
+            "description",
+            "isbn10",
+            "isbn13",
+            "published",
+            "publisher",
+            "read",
+            "subtitle",
+            "thumbnail",
+            "title",
+        ]
+
+
+class NetworkBatchSerializer(BatchSerializer):
+    """Serializer to write Device rows in a batch."""
+
+    class Meta:
+        """Metaclass to map serializer's fields with the model fields."""
+
+        model = Device
+        fields = [
+            "id",
+            "hostname",
+            "ip_address",
+            "mac_address",
+            "operating_system",
+            "hardware_vendor",
+            "model",
+            "device_type",
+            "connection_type",
+            "connected_too",
+            "port",
+            "rack_shelf",
+            "rack_shelf_position",
+            "description",
+            "ansible_managed",
+            "wol",
+            "applications",
+            "additional_ansible_groups",
+        ]
+
+
+class WishlistBatchSerializer(BatchSerializer):
+    """Serializer to write WishlistItem rows in a batch."""
+
+    class Meta:
+        """Metaclass to map serializer's fields with the model fields."""
+
+        model = WishlistItem
+        fields = [
+            "id",
+            "name",
+            "quantity",
+            "image",
+            "price",
+            "description",
+            "product_url",
+            "info_url",
+            "in_stock",
+        ]
+
+
+class AuthorViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """Viewset to represent the Author model."""
 
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
+    version_models = (Author,)
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(
+    BatchMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    SparseFieldsetMixin,
+    viewsets.ModelViewSet,
+):
     """Viewset to represent the Book model."""
 
-    queryset = Book.objects.all()
+    queryset = Book.objects.prefetch_related("authors")
     serializer_class = BookSerializer
+    batch_serializer_class = BookBatchSerializer
+    version_models = (Book, Author)
 
 
-class NetworkViewSet(viewsets.ModelViewSet):
+class NetworkViewSet(
+    BatchMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    SparseFieldsetMixin,
+    viewsets.ModelViewSet,
+):
     """Viewset to represent the Device model."""
 
-    queryset = Device.objects.all()
+    queryset = Device.objects.select_related(
+        "operating_system__vendor", "model__vendor", "device_type", "connected_too"
+    )
     serializer_class = NetworkSerializer
+    batch_serializer_class = NetworkBatchSerializer
+    version_models = (Device, DeviceType, Model, OperatingSystem, Vendor)
 
 
-class WebsiteViewSet(viewsets.ModelViewSet):
+class WebsiteViewSet(
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    SparseFieldsetMixin,
+    viewsets.ModelViewSet,
+):
     """Viewset to represent the Website model."""
 
-    queryset = Website.objects.all()
+    queryset = Website.objects.select_related("domain_name", "hosted_on")
     serializer_class = WebsiteSerializer
+    version_models = (Website, Device, DomainName)
 
 
-class WishlistViewSet(viewsets.ModelViewSet):
+class WishlistViewSet(
+    BatchMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    SparseFieldsetMixin,
+    viewsets.ModelViewSet,
+):
     """Viewset to represent the WishlistItem model."""
 
     queryset = WishlistItem.objects.all()
     serializer_class = WishlistSerializer
+    batch_serializer_class = WishlistBatchSerializer
+    version_models = (WishlistItem,)
 
 
-class WhoAmIViewSet(viewsets.ReadOnlyModelViewSet):
+class WhoAmIViewSet(
+    ConditionalGetMixin, SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet
+):
     """Viewset to represent the current user."""
 
     queryset = User.objects.all()
     serializer_class = WhoAmISerializer
+    version_models = (User,)
 
     def get_object(self):
         """Return the current user."""
@@ -287,13 +879,20 @@ class WhoAmIViewSet(viewsets.ReadOnlyModelViewSet):
         return self.request.user if pk == "current" else super().get_object()
 
 
-class BillViewSet(viewsets.ReadOnlyModelViewSet):
+class BillViewSet(
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    SparseFieldsetMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """Viewset to represent the Bill model."""
 
-    queryset = Bill.objects.all()
+    queryset = Bill.objects.select_related("bill_type", "organisation", "paid_from")
     serializer_class = BillSerializer
+    version_models = (Bill, BillType, Organisation, PaidFrom)
 
-    @action(detail=False)
+    @action(detail=False, version_daily=True)
     def bills_for_month(self, request):
         """Return the bills for the given month and year."""
         month = (
@@ -305,21 +904,25 @@ class BillViewSet(viewsets.ReadOnlyModelViewSet):
             or datetime.now().year
         )
         search_date = timezone.make_aware(datetime(year=year, month=month, day=1))
-        queryset = Bill.objects.all().order_by("name")
+        queryset = self.get_queryset().order_by("name")
         bills = queryset.filter(
             Q(start_date__lte=search_date)
             & Q(Q(last_payment__isnull=True) | Q(last_payment__gte=search_date)),
         )
-        serializer = BillSerializer(bills, many=True)
+        serializer = self.get_serializer(bills, many=True)
         return response(serializer.data)
 
-    @action(detail=True)
+    @action(
+        detail=True,
+        serializer_class=BillHistorySerializer,
+        version_models=(BillHistory,),
+    )
     def history(self, request, pk=None) -> response:
         """Return the history for the given bill."""
         filter_args = {}
-        queryset = BillHistory.objects.all().order_by("date")
+        queryset = BillHistory.objects.all()
         if pk:
-            filter_args["pk"] = pk
+            filter_args["bill"] = pk
         if "year" in request.query_params:
             year: int = (
                 int(request.query_params.get("year", datetime.now().year))
@@ -331,28 +934,38 @@ class BillViewSet(viewsets.ReadOnlyModelViewSet):
             end_date: datetime = timezone.make_aware(
                 datetime(year=year + 1, month=1, day=1)
             )
-            filter_args = {
-                "date__gte": start_date,
-                "date__lte": end_date,
-            }
+            filter_args["date__gte"] = start_date
+            filter_args["date__lt"] = end_date
         bill_history = queryset.filter(**filter_args)
-        serializer = BillHistorySerializer(bill_history, many=True)
-        return response(serializer.data)
+        return self.values_response(
+            sparse_queryset(bill_history, self.get_serializer())
+        )
 
 
-class InvestmentViewSet(viewsets.ReadOnlyModelViewSet):
+class InvestmentViewSet(
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    SparseFieldsetMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """Viewset to represent the Investment model."""
 
-    queryset = Investments.objects.all()
+    queryset = Investments.objects.select_related("organisation")
     serializer_class = InvestmentSerializer
+    version_models = (Investments, Organisation)
 
-    @action(detail=True)
+    @action(
+        detail=True,
+        serializer_class=InvestmentHistorySerializer,
+        version_models=(InvestmentValue,),
+    )
     def history(self, request, pk=None):
         """Return the history for the given investment."""
         filter_args = {}
-        queryset = InvestmentValue.objects.all().order_by("date")
+        queryset = InvestmentValue.objects.all()
         if pk:
-            filter_args["pk"] = pk
+            filter_args["investment"] = pk
         if "year" in request.query_params:
             year = (
                 int(request.query_params.get("year", datetime.now().year))
@@ -360,10 +973,273 @@ class InvestmentViewSet(viewsets.ReadOnlyModelViewSet):
             )
             start_date = timezone.make_aware(datetime(year=year, month=1, day=1))
             end_date = timezone.make_aware(datetime(year=year + 1, month=1, day=1))
-            filter_args = {
-                "date__gte": start_date,
-                "date__lte": end_date,
-            }
+            filter_args["date__gte"] = start_date
+            filter_args["date__lt"] = end_date
         investment_history = queryset.filter(**filter_args)
-        serializer = InvestmentHistorySerializer(investment_history, many=True)
-        return response(serializer.data)
+        return self.values_response(
+            sparse_queryset(investment_history, self.get_serializer())
+        )
+
+
+@api_view(["GET"])
+def response_cache(request: Request) -> response:
+    """
+    Return the hit and miss counts of the API response cache.
+
+    Args:
+        request: Request being served
+
+    Returns:
+        Response holding the counts
+    """
+    return response(response_cache_statistics())
+
+
+@api_view(["GET"])
+def dashboard(request: Request) -> response:
+    """
+    Return every section of the home dashboard in one response.
+
+    Args:
+        request: Request being served
+
+    Returns:
+        Response holding the sections, with the time spent on each in a
+        Server-Timing header
+    """
+    sections, timings = build_dashboard()
+    return response(sections, headers={"Server-Timing": server_timing(timings)})
+
+
+# Rows and serializer used to represent each journaled model in the change feed.
+CHANGE_FEEDS: dict[str, tuple[models.QuerySet, type[serializers.Serializer]]] = {
+    "books.author": (AuthorViewSet.queryset, AuthorSerializer),
+    "books.book": (BookViewSet.queryset, BookSerializer),
+    "events.event": (Event.objects.select_related("venue"), EventSerializer),
+    "finance.bill": (BillViewSet.queryset, BillSerializer),
+    "finance.billhistory": (BillHistory.objects.all(), BillHistorySerializer),
+    "finance.investments": (InvestmentViewSet.queryset, InvestmentSerializer),
+    "finance.investmentvalue": (
+        InvestmentValue.objects.all(),
+        InvestmentHistorySerializer,
+    ),
+    "network.device": (NetworkViewSet.queryset, NetworkSerializer),
+    "network.website": (WebsiteViewSet.queryset, WebsiteSerializer),
+    "wishlist.wishlistitem": (WishlistViewSet.queryset, WishlistSerializer),
+}
+
+
+@api_view(["GET"])
+def changes(request: Request) -> response:
+    """
+    Return the changes to journaled rows after a sequence number, oldest first.
+
+    Without since only the latest sequence number is returned, for clients to
+    store before fetching the full collections. A row changed more than once in
+    a page appears once, at its last change, and upserts hold the row as the
+    collection endpoints would return it. Rows deleted since their upsert was
+    logged are returned as deletes.
+
+    A change is only returned once it, and every change before it, was logged
+    CHANGES_SETTLE_TIME ago. A transaction logs a change with the next sequence
+    number straight away but may commit after later ones, so returning the later
+    ones sooner would move clients past it. Changes therefore reach clients up to
+    CHANGES_SETTLE_TIME late, and transactions writing journaled rows must
+    commit within that time.
+
+    Args:
+        request: Request with since and an optional limit
+
+    Returns:
+        Response holding the changes, the sequence number to pass as since next
+        and whether more changes follow
+    """
+    settled_before = timezone.now() - CHANGES_SETTLE_TIME
+    if "since" not in request.query_params:
+        settled = ChangeLog.objects.all()
+        unsettled = (
+            ChangeLog.objects.filter(changed__gte=settled_before)
+            .order_by("sequence")
+            .values_list("sequence", flat=True)
+            .first()
+        )
+        if unsettled is not None:
+            settled = settled.filter(sequence__lt=unsettled)
+        latest = settled.order_by("-sequence").values_list("sequence", flat=True)
+        return response({"next": latest.first() or 0, "more": False, "changes": []})
+    try:
+        since = int(request.query_params["since"])
+        limit = int(request.query_params.get("limit", CHANGES_PAGE_SIZE))
+    except ValueError:
+        return response(
+            {"detail": "since and limit must be integers."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if since < 0 or not 0 < limit <= CHANGES_MAX_PAGE_SIZE:
+        return response(
+            {
+                "detail": f"since must be positive and limit 1 to {CHANGES_MAX_PAGE_SIZE}."
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    logged = (
+        ChangeLog.objects.filter(sequence__gt=since)
+        .order_by("sequence")
+        .values_list("sequence", "label", "object_pk", "operation", "changed")
+    )
+    entries = list(
+        takewhile(lambda entry: entry[4] < settled_before, logged[: limit + 1])
+    )
+    more = len(entries) > limit
+    entries = [entry[:4] for entry in entries[:limit]]
+    latest_changes = {}
+    for entry in entries:
+        latest_changes.pop(entry[1:3], None)
+        latest_changes[entry[1:3]] = entry
+    rows = _changed_rows(request, latest_changes.values())
+    changed = []
+    for sequence, label, object_pk, operation in latest_changes.values():
+        data = rows.get((label, object_pk))
+        change = {
+            "sequence": sequence,
+            "model": label,
+            "pk": CHANGE_FEEDS[label][0].model._meta.pk.to_python(object_pk),
+            "operation": ChangeLog.DELETE if data is None else operation,
+        }
+        if data is not None:
+            change["data"] = data
+        changed.append(change)
+    return response(
+        {
+            "next": entries[-1][0] if entries else since,
+            "more": more,
+            "changes": changed,
+        }
+    )
+
+
+def _changed_rows(
+    request: Request, entries: Iterable[tuple[int, str, str, str]]
+) -> dict[tuple[str, str], dict]:
+    """
+    Represent the rows of upserts with a query per model.
+
+    Args:
+        request: Request being served, for hyperlinks
+        entries: Sequence, label, primary key and operation of each change
+
+    Returns:
+        Representations keyed by label and primary key, rows no longer present
+        are missing
+    """
+    upserts: dict[str, list[str]] = {}
+    for _, label, object_pk, operation in entries:
+        if operation == ChangeLog.UPSERT:
+            upserts.setdefault(label, []).append(object_pk)
+    rows = {}
+    for label, pks in upserts.items():
+        queryset, serializer_class = CHANGE_FEEDS[label]
+        instances = list(queryset.filter(pk__in=pks))
+        serializer = serializer_class(
+            instances, many=True, context={"request": request}
+        )
+        for instance, data in zip(instances, serializer.data):
+            rows[(label, str(instance.pk))] = data
+    return rows
+
+
+class ExportContentNegotiation(BaseContentNegotiation):
+    """Class to render export errors as JSON whatever the client accepts."""
+
+    def select_parser(self, request: Request, parsers: list) -> Optional[object]:
+        """
+        Select the first parser.
+
+        Args:
+            request: Request being served
+            parsers: Parsers of the view
+
+        Returns:
+            First parser
+        """
+        return parsers[0] if parsers else None
+
+    def select_renderer(
+        self, request: Request, renderers: list, format_suffix: Optional[str] = None
+    ) -> tuple[object, str]:
+        """
+        Select the first renderer, the export itself is not rendered by DRF.
+
+        Args:
+            request: Request being served
+            renderers: Renderers of the view
+            format_suffix: Format suffix of the URL
+
+        Returns:
+            First renderer and its media type
+        """
+        return renderers[0], renderers[0].media_type
+
+
+class ExportView(APIView):
+    """
+    View to stream a whole table as NDJSON or CSV.
+
+    Rows are read a chunk at a time and written as they are read, so memory use
+    does not grow with the table. The output is gzipped when the client accepts
+    it.
+    """
+
+    content_negotiation_class = ExportContentNegotiation
+
+    def get(self, request: Request, table: str, export_format: str):
+        """
+        Stream the rows of a table.
+
+        Accepts start and end (YYYY-MM-DD) query parameters, both inclusive, for
+        tables with a date.
+
+        Args:
+            request: Request being served
+            table: Name of the export
+            export_format: csv or ndjson
+
+        Returns:
+            Streaming response of the rows
+        """
+        export = EXPORTS.get(table)
+        if export is None or export_format not in EXPORT_FORMATS:
+            return response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            start, end = (
+                (
+                    date.fromisoformat(request.query_params[name])
+                    if name in request.query_params
+                    else None
+                )
+                for name in ("start", "end")
+            )
+        except ValueError:
+            return response(
+                {"detail": "Invalid date."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if (start or end) and not export.filterable:
+            return response(
+                {"detail": f"{table} cannot be filtered by date."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        encode, content_type = EXPORT_FORMATS[export_format]
+        content = (
+            chunk.encode()
+            for chunk in encode(export.headers, export.rows(start=start, end=end))
+        )
+        headers = {
+            "Content-Disposition": f'attachment; filename="{table}.{export_format}"',
+            "Vary": "Accept-Encoding",
+        }
+        if accepts_gzip(request.headers.get("Accept-Encoding", "")):
+            content = compress_sequence(content)
+            headers["Content-Encoding"] = "gzip"
+        return StreamingHttpResponse(
+            content, content_type=content_type, headers=headers
+        )
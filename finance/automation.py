@@ -1,15 +1,142 @@
 """Class to support Monzo automation."""
 
-from datetime import datetime, timedelta
-from typing import Union
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Callable, Iterator, Optional, Union
 
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
 from monzo.authentication import Authentication
 from monzo.endpoints.account import Account
 from monzo.endpoints.transaction import Transaction
 from monzo.exceptions import MonzoAuthenticationError
+from monzo.helpers import format_date
 
-from finance.models import DEBT_TYPES, Bill, MonzoMerchant, MonzoTransaction
-from finance.utilities import DjangoHandler
+from api.models import bump_model_versions, record_changes
+from finance.ingest import IngestTransaction, TransactionIngest
+from finance.models import (
+    DEBT_TYPES,
+    Bill,
+    BillHistory,
+    BillHistoryRollup,
+    MonzoMerchant,
+    MonzoSpendSummary,
+    MonzoTransaction,
+)
+from finance.rollups import record_rollups
+from finance.spend import rebuild_spend, spend_totals
+from finance.utilities import DjangoHandler, LockedAuthentication
+
+PAGE_SIZE = 100
+
+
+def fetch_transactions(
+    auth: Authentication,
+    account_id: str,
+    since: Union[datetime, str],
+    before: Optional[datetime] = None,
+    expand: Optional[list[str]] = None,
+    limit: int = PAGE_SIZE,
+) -> list[Transaction]:
+    """
+    Fetch a page of transactions after a date/time or a transaction.
+
+    Transaction.fetch only accepts a date/time for since, to the second. Monzo also
+    accepts the id of a transaction and returns those after it, which pages
+    through transactions that share a timestamp without skipping any.
+
+    Args:
+        auth: Monzo authentication object
+        account_id: ID of the account to fetch transactions for
+        since: Date/time or id of the transaction to fetch transactions after
+        before: Optional date/time transactions should be fetched before
+        expand: List of fields to expand
+        limit: Maximum number of transactions, Monzo allows 100
+
+    Returns:
+        List of transactions, oldest first
+    """
+    data: dict[str, Union[int, str]] = {
+        "account_id": account_id,
+        "since": since if isinstance(since, str) else format_date(since),
+        "limit": min(limit, 100),
+    }
+    if before:
+        data["before"] = format_date(before)
+    if expand:
+        data["expand"] = expand[0]
+    response = auth.make_request(path="/transactions", data=data)
+    return [
+        Transaction(auth=auth, transaction_data=transaction_data)
+        for transaction_data in response["data"]["transactions"]
+    ]
+
+
+class TransactionPager:
+    """Class to walk a window of Monzo transactions a page at a time."""
+
+    __slots__ = ("_account_id", "_auth", "_fetch", "_page_size")
+
+    def __init__(
+        self,
+        auth: Authentication,
+        account_id: str,
+        page_size: int = PAGE_SIZE,
+        fetch: Callable[..., list[Transaction]] = fetch_transactions,
+    ) -> None:
+        """
+        Initialise TransactionPager.
+
+        Args:
+            auth: Monzo authentication object
+            account_id: ID of the account to fetch transactions for
+            page_size: Maximum number of transactions per page, Monzo allows 100
+            fetch: Callable used to fetch a page of transactions
+        """
+        self._account_id = account_id
+        self._auth = auth
+        self._fetch = fetch
+        self._page_size = page_size
+
+    def pages(
+        self, since: datetime, before: Optional[datetime] = None
+    ) -> Iterator[list[Transaction]]:
+        """
+        Fetch transactions one page at a time, oldest first.
+
+        The first page starts from the given date/time and each later page from
+        the id of the last transaction on the previous page, so however many
+        transactions share a timestamp each is yielded exactly once.
+
+        Args:
+            since: Date/time transactions should be fetched from
+            before: Optional date/time transactions should be fetched before
+
+        Returns:
+            Iterator of transaction lists
+        """
+        # Monzo returns naive UTC date/times, compare like with like.
+        cursor: Union[datetime, str] = (
+            timezone.make_naive(since, dt_timezone.utc)
+            if timezone.is_aware(since)
+            else since
+        )
+        while True:
+            page = self._fetch(
+                auth=self._auth,
+                account_id=self._account_id,
+                since=cursor,
+                before=before,
+                expand=["merchant"],
+                limit=self._page_size,
+            )
+            if page:
+                yield page
+            if len(page) < self._page_size:
+                return
+            cursor = page[-1].transaction_id
 
 
 class FetchTransactions:
@@ -18,22 +145,34 @@ class FetchTransactions:
     __slots__ = (
         "_account_id",
         "_auth",
+        "_existing_transaction_count",
         "_handler",
-        "_last_transaction",
+        "_inserted_transaction_count",
+        "_page_count",
         "_process_transactions",
         "_processed_transaction_count",
         "_transaction_count",
     )
 
-    def __init__(self) -> None:
-        """Initialise MonzoAutomation."""
+    def __init__(self, auth: Optional[Authentication] = None) -> None:
+        """
+        Initialise MonzoAutomation.
+
+        Args:
+            auth: Optional Monzo authentication object, built from the stored credentials if not given
+        """
         self._handler: DjangoHandler = DjangoHandler()
-        self._last_transaction = None
+        self._existing_transaction_count = 0
+        self._inserted_transaction_count = 0
+        self._page_count = 0
         self._process_transactions: bool = True
         self._processed_transaction_count = 0
         self._transaction_count = 0
+        if auth:
+            self._auth = auth
+            return
         credentials: dict[str, Union[int, str]] = self._handler.fetch()
-        self._auth = Authentication(
+        self._auth = LockedAuthentication(
             client_id=credentials["client_id"],
             client_secret=credentials["client_secret"],
             redirect_url="",
@@ -51,7 +190,7 @@ class FetchTransactions:
         except MonzoAuthenticationError as exc:
             return {
                 "result": "failure",
-                "message": exc,
+                "message": str(exc),
             }
         return self._process_output()
 
@@ -64,55 +203,24 @@ class FetchTransactions:
                 break
 
     def _fetch_transactions(self) -> None:
-        """Fetch transactions from Monzo."""
+        """Fetch transactions from Monzo a page at a time."""
         since = self._handler.last_transaction_datetime
         if not since:
             self._process_transactions = False
             since = datetime.now() - timedelta(days=89)
 
-        transactions = Transaction.fetch(
-            auth=self._auth,
-            account_id=self._account_id,
-            since=since,
-            expand=["merchant"],
-        )
+        pager = TransactionPager(auth=self._auth, account_id=self._account_id)
+        ingest = TransactionIngest(process_bills=self._process_transactions)
+        for page in pager.pages(since=since):
+            with transaction.atomic():
+                ingest.ingest(self._to_ingest_transaction(tran) for tran in page)
+                self._handler.last_transaction_datetime = ingest.last_created
+            self._page_count += 1
 
-        if not transactions:
-            return
-
-        for tran in transactions:
-            monzo_transaction = MonzoTransaction()
-            monzo_transaction.transaction_id = tran.transaction_id
-            monzo_transaction.currency = tran.currency
-            monzo_transaction.value = tran.amount
-            monzo_transaction.created = tran.created
-            monzo_transaction.description = tran.description
-            monzo_transaction.has_receipt = False
-            merchant = MonzoMerchant.objects.filter(merchant_id__exact=tran.description)
-            if len(merchant):
-                monzo_transaction.merchant = merchant[0]
-            else:
-                new_merchant = MonzoMerchant()
-                if tran.merchant:
-                    new_merchant.merchant_id = tran.merchant["id"]
-                    new_merchant.name = tran.merchant["name"]
-                else:
-                    new_merchant.merchant_id = tran.description
-                    new_merchant.name = tran.description
-                new_merchant.save()
-                monzo_transaction.merchant = new_merchant
-            monzo_transaction.save()
-            if self._process_transactions:
-                self._process_transaction(transaction=monzo_transaction)
-
-            if (
-                not self._last_transaction
-                or monzo_transaction.created > self._last_transaction
-            ):
-                self._last_transaction = monzo_transaction.created
-            self._transaction_count += 1
-
-        self._handler.last_transaction_datetime = self._last_transaction
+        self._existing_transaction_count = ingest.existing_count
+        self._inserted_transaction_count = ingest.inserted_count
+        self._processed_transaction_count = ingest.processed_count
+        self._transaction_count = ingest.existing_count + ingest.inserted_count
 
     def _process_output(self) -> dict[str, Union[int, str]]:
         """
@@ -125,51 +233,124 @@ class FetchTransactions:
             "result": "success",
             "processed_transactions": self._processed_transaction_count,
             "transactions": self._transaction_count,
+            "inserted_transactions": self._inserted_transaction_count,
+            "existing_transactions": self._existing_transaction_count,
+            "pages": self._page_count,
         }
 
-    def _process_transaction(self, transaction: MonzoTransaction) -> None:
+    @staticmethod
+    def _to_ingest_transaction(tran: Transaction) -> IngestTransaction:
         """
-        Process a given transaction to update bills.
+        Convert a Monzo transaction ready for storing.
 
         Args:
-            transaction: Monzo transaction to process
+            tran: Transaction as returned by Monzo
+
+        Returns:
+            Transaction ready to be ingested
         """
-        merchant: MonzoMerchant = MonzoMerchant(transaction.merchant)
-        if not merchant.for_bill:
-            return
-        bill: Bill = Bill(merchant.for_bill)
-        if bill.bill_type in DEBT_TYPES:
-            self._processed_transaction_count += 1
-            bill.current_balance += transaction.value
+        merchant_id = tran.description
+        merchant_name = tran.description
+        if isinstance(tran.merchant, dict):
+            merchant_id = tran.merchant["id"]
+            merchant_name = tran.merchant["name"]
+        elif tran.merchant:
+            merchant_id = tran.merchant
+        return IngestTransaction(
+            transaction_id=tran.transaction_id,
+            currency=tran.currency,
+            value=tran.amount,
+            created=timezone.make_aware(tran.created, dt_timezone.utc),
+            description=tran.description,
+            merchant_id=merchant_id[:50],
+            merchant_name=merchant_name[:150],
+        )
 
 
 class ProcessInterest:
     """Class to handle Adding interest."""
 
-    def process(self) -> dict[str, int]:
-        """Process transactions."""
-        bills = Bill.objects.all()
-        for bill in bills:
-            if bill.current_balance <= 0 or bill.apr <= 0:
-                continue
-            self._add_interest(bill)
-        return {}
+    def process(self, when: Optional[date] = None) -> dict[str, Union[int, str]]:
+        """
+        Add a month of interest to every eligible bill.
+
+        Bills already charged for the month are skipped so a repeated call does not charge twice.
+
+        Args:
+            when: Date within the month to charge interest for, defaults to today
+
+        Returns:
+            Dict describing the output
+        """
+        month = (when or timezone.now().date()).replace(day=1)
+        with transaction.atomic():
+            bills = list(
+                Bill.objects.select_for_update()
+                .select_related("bill_type")
+                .filter(current_balance__gt=0, apr__gt=0)
+                .filter(
+                    Q(interest_applied_on__isnull=True)
+                    | Q(interest_applied_on__lt=month)
+                )
+            )
+            total_interest = Decimal(0)
+            history: list[BillHistory] = []
+            for bill in bills:
+                interest = self._calculate_interest(
+                    balance=bill.current_balance, apr=bill.apr
+                )
+                bill.current_balance += interest
+                bill.interest_applied_on = month
+                total_interest += interest
+                if bill.bill_type.name in DEBT_TYPES:
+                    history.append(
+                        BillHistory(bill=bill, current_balance=bill.current_balance)
+                    )
+            Bill.objects.bulk_update(bills, ["current_balance", "interest_applied_on"])
+            BillHistory.objects.bulk_create(history)
+            record_rollups(
+                rollup_model=BillHistoryRollup,
+                owner_field="bill_id",
+                values=[
+                    (value.bill_id, value.date, value.current_balance)
+                    for value in history
+                ],
+            )
+            if bills:
+                bump_model_versions(Bill, BillHistory, BillHistoryRollup)
+                record_changes(Bill, (bill.pk for bill in bills))
+                record_changes(BillHistory, self._history_pks(history))
+        return {
+            "result": "success",
+            "bills": len(bills),
+            "interest": str(total_interest),
+        }
 
-    def _add_interest(self, bill: Bill) -> None:
+    @staticmethod
+    def _history_pks(history: list[BillHistory]) -> list[int]:
         """
-        Add interest to the given bill.
+        Find the primary keys of newly created bill history.
+
+        Databases that cannot return them from a bulk insert, such as MySQL, look
+        up the history recorded today for the same bills instead.
 
         Args:
-            bill: Bill to add interest too
+            history: History rows created with bulk_create
+
+        Returns:
+            Primary keys of the rows
         """
-        interest: float = self._calculate_interest(
-            balance=float(bill.current_balance), apr=float(bill.apr)
+        if all(value.pk is not None for value in history):
+            return [value.pk for value in history]
+        return list(
+            BillHistory.objects.filter(
+                bill__in={value.bill_id for value in history},
+                date=date.today(),
+            ).values_list("pk", flat=True)
         )
-        bill.current_balance += interest
-        bill.save()
 
     @staticmethod
-    def _calculate_interest(balance: float, apr: float) -> float:
+    def _calculate_interest(balance: Decimal, apr: Decimal) -> Decimal:
         """
         Calculate the value of interest given the balance and APR.
 
@@ -178,9 +359,82 @@ class ProcessInterest:
             apr: Percentage to calculate
 
         Returns:
-            Amount of interest as a float rounded to two decimal places
+            Amount of interest rounded to two decimal places
+        """
+        monthly_interest = balance * apr / 12 / 100
+        return monthly_interest.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+class LinkMerchantToBill:
+    """Class to link a merchant, and every transaction it has made, to a bill."""
+
+    __slots__ = ("_bill", "_merchant")
+
+    def __init__(self, merchant: MonzoMerchant, bill: Bill) -> None:
+        """
+        Initialise LinkMerchantToBill.
+
+        Args:
+            merchant: Merchant to link
+            bill: Bill the merchant pays towards
+        """
+        self._bill: Bill = bill
+        self._merchant: MonzoMerchant = merchant
+
+    def process(self) -> dict[str, Union[int, str]]:
         """
-        monthly_apr: float = (apr / 12) / 100
-        monthly_interest = balance * monthly_apr
+        Link the merchant and move its past transactions to the bill.
 
-        return round(monthly_interest, 2)
+        Transactions are moved with a single UPDATE, the balance changes and the
+        merchant's spend summary are taken from aggregate queries so no
+        transactions are loaded.
+
+        Returns:
+            Dict describing the output
+        """
+        with transaction.atomic():
+            self._merchant.for_bill = self._bill
+            self._merchant.save()
+            relinked = MonzoTransaction.objects.filter(merchant=self._merchant).exclude(
+                for_bill=self._bill
+            )
+            totals = {
+                row["for_bill_id"]: row["total"]
+                for row in relinked.order_by()
+                .values("for_bill_id")
+                .annotate(total=Sum("value"))
+            }
+            transaction_count = relinked.update(for_bill=self._bill)
+            if transaction_count:
+                rebuild_spend(
+                    summaries=MonzoSpendSummary.objects.filter(merchant=self._merchant),
+                    values=spend_totals(
+                        MonzoTransaction.objects.filter(merchant=self._merchant)
+                    ),
+                )
+                bump_model_versions(MonzoSpendSummary, MonzoTransaction)
+            adjustments = {
+                bill_id: Decimal(-total) / 100
+                for bill_id, total in totals.items()
+                if bill_id is not None
+            }
+            adjustments[self._bill.pk] = adjustments.get(self._bill.pk, Decimal(0)) + (
+                Decimal(sum(totals.values())) / 100
+            )
+            bills = (
+                Bill.objects.select_for_update()
+                .select_related("bill_type")
+                .filter(pk__in=adjustments, bill_type__name__in=DEBT_TYPES)
+            )
+            updated_bills = 0
+            for bill in bills:
+                if not adjustments[bill.pk]:
+                    continue
+                bill.current_balance += adjustments[bill.pk]
+                bill.save()
+                updated_bills += 1
+        return {
+            "result": "success",
+            "transactions": transaction_count,
+            "bills": updated_bills,
+        }
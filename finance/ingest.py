@@ -0,0 +1,283 @@
+"""Classes to support bulk loading of transactions."""
+
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Iterable, Iterator, Optional, Union
+
+from django.db import transaction
+
+from api.models import bump_model_versions
+from finance.models import (
+    DEBT_TYPES,
+    Bill,
+    MonzoMerchant,
+    MonzoSpendSummary,
+    MonzoTransaction,
+)
+from finance.spend import record_spend, spend_month
+
+DEFAULT_BATCH_SIZE = 500
+
+
+@dataclass
+class IngestTransaction:
+    """Data class for a transaction waiting to be stored."""
+
+    transaction_id: str
+    currency: str
+    value: int
+    created: datetime
+    description: str
+    merchant_id: str
+    merchant_name: str
+
+
+class TransactionIngest:
+    """Class to handle storing transactions in batches."""
+
+    __slots__ = (
+        "_batch_size",
+        "_bill_adjustments",
+        "_existing_count",
+        "_inserted_count",
+        "_last_created",
+        "_merchants",
+        "_process_bills",
+        "_processed_count",
+    )
+
+    def __init__(
+        self, process_bills: bool = True, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> None:
+        """
+        Initialise TransactionIngest.
+
+        Args:
+            process_bills: True if linked debt balances should be updated
+            batch_size: Number of transactions to write per query
+        """
+        self._batch_size: int = batch_size
+        self._bill_adjustments: dict[int, Decimal] = {}
+        self._existing_count: int = 0
+        self._inserted_count: int = 0
+        self._last_created: Optional[datetime] = None
+        self._merchants: Optional[dict[str, MonzoMerchant]] = None
+        self._process_bills: bool = process_bills
+        self._processed_count: int = 0
+
+    def ingest(self, transactions: Iterable[IngestTransaction]) -> None:
+        """
+        Store the given transactions, skipping any that already exist.
+
+        Args:
+            transactions: Transactions to store
+        """
+        if self._merchants is None:
+            self._merchants = {
+                merchant.merchant_id: merchant
+                for merchant in MonzoMerchant.objects.select_related(
+                    "for_bill__bill_type"
+                )
+            }
+        inserted_count = self._inserted_count
+        with transaction.atomic():
+            for batch in self._batches(transactions):
+                self._ingest_batch(batch)
+            self._apply_bill_adjustments()
+            if self._inserted_count > inserted_count:
+                bump_model_versions(MonzoMerchant, MonzoSpendSummary, MonzoTransaction)
+
+    @property
+    def existing_count(self) -> int:
+        """
+        Property for the number of transactions that were already stored.
+
+        Returns:
+            Count of skipped transactions
+        """
+        return self._existing_count
+
+    @property
+    def inserted_count(self) -> int:
+        """
+        Property for the number of transactions inserted.
+
+        Returns:
+            Count of inserted transactions
+        """
+        return self._inserted_count
+
+    @property
+    def last_created(self) -> Optional[datetime]:
+        """
+        Property for the date/time of the newest transaction seen.
+
+        Returns:
+            Created date/time of the newest transaction
+        """
+        return self._last_created
+
+    @property
+    def processed_count(self) -> int:
+        """
+        Property for the number of transactions applied to a bill.
+
+        Returns:
+            Count of transactions applied to a bill
+        """
+        return self._processed_count
+
+    def _batches(
+        self, transactions: Iterable[IngestTransaction]
+    ) -> Iterator[list[IngestTransaction]]:
+        """
+        Split the given transactions into batches.
+
+        Args:
+            transactions: Transactions to split
+
+        Returns:
+            Iterator of transaction lists no larger than the batch size
+        """
+        iterator = iter(transactions)
+        while batch := list(islice(iterator, self._batch_size)):
+            yield batch
+
+    def _ingest_batch(self, batch: list[IngestTransaction]) -> None:
+        """
+        Store a single batch of transactions.
+
+        Args:
+            batch: Transactions to store
+        """
+        self._create_missing_merchants(batch)
+        existing = self._stored_ids(batch)
+        new_transactions: dict[str, MonzoTransaction] = {}
+        for tran in batch:
+            if not self._last_created or tran.created > self._last_created:
+                self._last_created = tran.created
+            if (
+                tran.transaction_id in existing
+                or tran.transaction_id in new_transactions
+            ):
+                self._existing_count += 1
+                continue
+            merchant = self._merchants[tran.merchant_id]
+            new_transactions[tran.transaction_id] = MonzoTransaction(
+                transaction_id=tran.transaction_id,
+                currency=tran.currency,
+                value=tran.value,
+                created=tran.created,
+                description=tran.description,
+                merchant=merchant,
+                has_receipt=False,
+                for_bill_id=merchant.for_bill_id,
+            )
+        if not new_transactions:
+            return
+        MonzoTransaction.objects.bulk_create(
+            new_transactions.values(), ignore_conflicts=True
+        )
+        # Rows stored by another writer since the check above are dropped by the
+        # insert. Reads in this transaction see its own inserts but not rows other
+        # transactions have committed since it started, so only ours are found.
+        inserted = self._stored_ids(new_transactions.values())
+        self._existing_count += len(new_transactions) - len(inserted)
+        inserted_transactions = [
+            tran for tran in new_transactions.values() if tran.pk in inserted
+        ]
+        for tran in inserted_transactions:
+            self._track_bill_adjustment(merchant=tran.merchant, value=tran.value)
+        record_spend(
+            summary_model=MonzoSpendSummary,
+            values=(
+                (
+                    spend_month(tran.created),
+                    tran.merchant_id,
+                    tran.for_bill_id,
+                    tran.currency,
+                    1,
+                    tran.value,
+                )
+                for tran in inserted_transactions
+            ),
+        )
+        self._inserted_count += len(inserted_transactions)
+
+    @staticmethod
+    def _stored_ids(
+        transactions: Iterable[Union[IngestTransaction, MonzoTransaction]],
+    ) -> set[str]:
+        """
+        Find which of the given transactions are stored.
+
+        Args:
+            transactions: Transactions to look for
+
+        Returns:
+            Ids of the stored transactions
+        """
+        return set(
+            MonzoTransaction.objects.filter(
+                pk__in=[tran.transaction_id for tran in transactions]
+            ).values_list("pk", flat=True)
+        )
+
+    def _create_missing_merchants(self, batch: list[IngestTransaction]) -> None:
+        """
+        Create any merchants in the batch that are not yet stored.
+
+        Merchants are read back after the insert, so one stored by another writer
+        in the meantime is used as stored, including any bill it is linked to.
+
+        Args:
+            batch: Transactions that may reference new merchants
+        """
+        new_merchants: dict[str, MonzoMerchant] = {}
+        for tran in batch:
+            if tran.merchant_id in self._merchants:
+                continue
+            new_merchants[tran.merchant_id] = MonzoMerchant(
+                merchant_id=tran.merchant_id, name=tran.merchant_name
+            )
+        if not new_merchants:
+            return
+        MonzoMerchant.objects.bulk_create(new_merchants.values(), ignore_conflicts=True)
+        self._merchants.update(
+            (merchant.merchant_id, merchant)
+            for merchant in MonzoMerchant.objects.select_related(
+                "for_bill__bill_type"
+            ).filter(merchant_id__in=new_merchants)
+        )
+
+    def _track_bill_adjustment(self, merchant: MonzoMerchant, value: int) -> None:
+        """
+        Record a balance change for the debt linked to the merchant.
+
+        Args:
+            merchant: Merchant for the transaction
+            value: Value of the transaction in pence
+        """
+        if not self._process_bills or not merchant.for_bill_id:
+            return
+        if merchant.for_bill.bill_type.name not in DEBT_TYPES:
+            return
+        self._processed_count += 1
+        self._bill_adjustments[merchant.for_bill_id] = (
+            self._bill_adjustments.get(merchant.for_bill_id, Decimal(0))
+            + Decimal(value) / 100
+        )
+
+    def _apply_bill_adjustments(self) -> None:
+        """Apply the recorded balance changes to the affected bills."""
+        if not self._bill_adjustments:
+            return
+        bills = Bill.objects.select_related("bill_type").filter(
+            pk__in=self._bill_adjustments
+        )
+        for bill in bills:
+            bill.current_balance += self._bill_adjustments[bill.pk]
+            bill.save()
+        self._bill_adjustments = {}
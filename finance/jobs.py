@@ -0,0 +1,149 @@
+"""Functions to queue and run automation jobs outside of a request."""
+
+from datetime import timedelta
+from time import perf_counter
+from typing import Any, Callable, Optional
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from finance.automation import FetchTransactions, ProcessInterest
+from finance.models import AutomationJob
+
+# Jobs running for longer than this are assumed to belong to a dead worker.
+JOB_TIMEOUT = timedelta(hours=1)
+
+JOB_RUNNERS: dict[str, Callable[[], dict[str, Any]]] = {
+    "fetch_transactions": lambda: FetchTransactions().process(),
+    "process_interest": lambda: ProcessInterest().process(),
+}
+
+
+class JobAlreadyActiveException(Exception):
+    """Exception to handle a job of the same kind already being queued or running."""
+
+    def __init__(self, job: AutomationJob):
+        """
+        Initialise JobAlreadyActiveException.
+
+        Args:
+            job: The job that is already queued or running
+        """
+        super().__init__(f"A {job.kind} job is already {job.status}.")
+        self.job = job
+
+
+def enqueue(kind: str) -> AutomationJob:
+    """
+    Queue a new job.
+
+    Args:
+        kind: Kind of job to queue, must be a key of JOB_RUNNERS
+
+    Raises:
+        JobAlreadyActiveException: On a job of the same kind already being queued or running
+
+    Returns:
+        The queued job
+    """
+    try:
+        with transaction.atomic():
+            return AutomationJob.objects.create(kind=kind, active_kind=kind)
+    except IntegrityError:
+        active_job = AutomationJob.objects.get(active_kind=kind)
+    if active_job.status == "running" and (
+        active_job.started < timezone.now() - JOB_TIMEOUT
+    ):
+        _finish(job=active_job, status="failed", error="Job timed out.")
+        return enqueue(kind=kind)
+    raise JobAlreadyActiveException(job=active_job)
+
+
+def run_next() -> Optional[AutomationJob]:
+    """
+    Claim and run the oldest queued job.
+
+    Returns:
+        The job that was run or None if nothing was queued
+    """
+    with transaction.atomic():
+        job = (
+            AutomationJob.objects.select_for_update(skip_locked=True)
+            .filter(status="queued")
+            .order_by("created")
+            .first()
+        )
+        if not job:
+            return None
+        job.status = "running"
+        job.started = timezone.now()
+        job.save(update_fields=["status", "started"])
+
+    start = perf_counter()
+    try:
+        result = JOB_RUNNERS[job.kind]()
+    except Exception as exc:
+        _finish(
+            job=job,
+            status="failed",
+            error=f"{type(exc).__name__}: {exc}",
+            duration=perf_counter() - start,
+        )
+        return job
+    _finish(
+        job=job,
+        status="failed" if result.get("result") == "failure" else "succeeded",
+        result=result,
+        error=str(result.get("message", "")),
+        duration=perf_counter() - start,
+    )
+    return job
+
+
+def job_details(job: AutomationJob) -> dict[str, Any]:
+    """
+    Describe a job ready for JSON output.
+
+    Args:
+        job: Job to describe
+
+    Returns:
+        Dictionary describing the job
+    """
+    return {
+        "job_id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "created": job.created,
+        "started": job.started,
+        "finished": job.finished,
+        "duration": job.duration,
+        "result": job.result,
+        "error": job.error,
+    }
+
+
+def _finish(
+    job: AutomationJob,
+    status: str,
+    result: Optional[dict[str, Any]] = None,
+    error: str = "",
+    duration: Optional[float] = None,
+) -> None:
+    """
+    Record the outcome of a job and release its kind for new jobs.
+
+    Args:
+        job: Job to update
+        status: Final status of the job
+        result: Output of the job
+        error: Description of any error
+        duration: Time taken in seconds
+    """
+    job.status = status
+    job.result = result
+    job.error = error
+    job.duration = duration
+    job.finished = timezone.now()
+    job.active_kind = None
+    job.save()
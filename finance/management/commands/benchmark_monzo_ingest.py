@@ -0,0 +1,85 @@
+"""Command to time fetching transactions from a local stand-in for Monzo."""
+
+import tracemalloc
+from datetime import timezone as dt_timezone
+from time import perf_counter
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from finance.automation import FetchTransactions
+from finance.monzo_stub import STUB_START, StubMonzoAuthentication
+from finance.utilities import DjangoHandler
+
+
+class Command(BaseCommand):
+    """Command to time fetching transactions from a local stand-in for Monzo."""
+
+    help = (
+        "Time a full transaction fetch against synthetic Monzo data, all changes "
+        "are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser) -> None:
+        """
+        Add arguments for the command.
+
+        Args:
+            parser: Argument parser for the command
+        """
+        parser.add_argument(
+            "--transactions", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+        )
+        parser.add_argument("--merchants", type=int, default=50)
+        parser.add_argument("--skip-memory", action="store_true")
+
+    def handle(self, *args, **options) -> None:
+        """Time a fetch for each number of transactions."""
+        for count in options["transactions"]:
+            output, elapsed, queries = self._fetch(count, options["merchants"])
+            summary = (
+                f"{count} transactions: {output['inserted_transactions']} inserted "
+                f"over {output['pages']} pages in {elapsed:.2f}s, {queries} queries"
+            )
+            if not options["skip_memory"]:
+                # Tracing slows everything down, so memory is measured on a second run.
+                tracemalloc.start()
+                self._fetch(count, options["merchants"])
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                summary += f", peak memory {peak / 1024 / 1024:.1f}MiB"
+            self.stdout.write(summary)
+
+    @staticmethod
+    def _fetch(count: int, merchants: int) -> tuple[dict[str, Any], float, int]:
+        """
+        Fetch synthetic transactions and roll back the changes.
+
+        Args:
+            count: Number of transactions to fetch
+            merchants: Number of merchants to spread the transactions over
+
+        Returns:
+            Output of the fetch, time taken in seconds and number of queries made
+        """
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with transaction.atomic():
+            DjangoHandler().last_transaction_datetime = STUB_START.replace(
+                tzinfo=dt_timezone.utc
+            )
+            auth = StubMonzoAuthentication(
+                transaction_count=count, merchant_count=merchants
+            )
+            start = perf_counter()
+            with connection.execute_wrapper(count_queries):
+                output = FetchTransactions(auth=auth).process()
+            elapsed = perf_counter() - start
+            transaction.set_rollback(True)
+        return output, elapsed, queries
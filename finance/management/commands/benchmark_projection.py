@@ -0,0 +1,57 @@
+"""Command to time debt projections for a large synthetic set of debts."""
+
+from random import Random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from finance.projection import STRATEGIES, Debt, DebtProjection
+
+
+class Command(BaseCommand):
+    """Command to time debt projections for a large synthetic set of debts."""
+
+    help = "Time debt projections for synthetic debts, no database access is made."
+
+    def add_arguments(self, parser) -> None:
+        """
+        Add arguments for the command.
+
+        Args:
+            parser: Argument parser for the command
+        """
+        parser.add_argument("--bills", type=int, default=100)
+        parser.add_argument("--months", type=int, default=360)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options) -> None:
+        """Time each strategy and output the best run."""
+        random = Random(1)
+        debts = []
+        for index in range(options["bills"]):
+            balance = random.randint(50_000, 25_000_000)
+            debts.append(
+                Debt(
+                    pk=index,
+                    name=f"Debt {index}",
+                    balance=balance,
+                    apr=random.uniform(0, 35),
+                    payment=max(balance // random.randint(24, 400), 2_500),
+                )
+            )
+        projection = DebtProjection(debts)
+        for strategy in STRATEGIES:
+            timings = []
+            for _ in range(options["repeat"]):
+                start = perf_counter()
+                projection.project(
+                    overpayment=20_000,
+                    strategy=strategy,
+                    months=options["months"],
+                    schedule=True,
+                )
+                timings.append(perf_counter() - start)
+            self.stdout.write(
+                f"{strategy}: {options['bills']} bills x {options['months']} months "
+                f"in {min(timings) * 1000:.1f}ms"
+            )
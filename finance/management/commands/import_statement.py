@@ -0,0 +1,46 @@
+"""Command to import transactions from a bank statement file."""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.statements import (
+    STATEMENT_FORMATS,
+    StatementException,
+    detect_format,
+    import_statement,
+)
+
+
+class Command(BaseCommand):
+    """Command to import transactions from a bank statement file."""
+
+    help = "Import transactions from a CSV or OFX statement, skipping duplicates."
+
+    def add_arguments(self, parser) -> None:
+        """
+        Add arguments for the command.
+
+        Args:
+            parser: Argument parser for the command
+        """
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=STATEMENT_FORMATS)
+        parser.add_argument("--currency", default="GBP")
+        parser.add_argument("--process-bills", action="store_true")
+
+    def handle(self, *args, **options) -> None:
+        """Import the statement."""
+        path = options["path"]
+        try:
+            with open(path, encoding="utf-8-sig", newline="") as statement:
+                ingest = import_statement(
+                    lines=statement,
+                    statement_format=options["format"] or detect_format(path),
+                    currency=options["currency"],
+                    process_bills=options["process_bills"],
+                )
+        except (OSError, StatementException) as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(
+            f"Imported {ingest.inserted_count} transactions, "
+            f"{ingest.existing_count} were already stored."
+        )
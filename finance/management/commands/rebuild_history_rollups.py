@@ -0,0 +1,40 @@
+"""Command to rebuild the bill and investment history rollups."""
+
+from django.core.management.base import BaseCommand
+
+from api.models import bump_model_versions
+from finance.models import (
+    BillHistory,
+    BillHistoryRollup,
+    InvestmentValue,
+    InvestmentValueRollup,
+)
+from finance.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    """Command to rebuild the bill and investment history rollups."""
+
+    help = "Rebuild the bill and investment history rollups from the raw history."
+
+    def handle(self, *args, **options) -> None:
+        """Rebuild both sets of rollups."""
+        rebuild_rollups(
+            rollup_model=BillHistoryRollup,
+            owner_field="bill_id",
+            values=BillHistory.objects.values_list(
+                "bill_id", "date", "current_balance"
+            ).iterator(chunk_size=2000),
+        )
+        rebuild_rollups(
+            rollup_model=InvestmentValueRollup,
+            owner_field="investment_id",
+            values=InvestmentValue.objects.values_list(
+                "investment_id", "date", "value"
+            ).iterator(chunk_size=2000),
+        )
+        bump_model_versions(BillHistoryRollup, InvestmentValueRollup)
+        self.stdout.write(
+            f"Rebuilt {BillHistoryRollup.objects.count()} bill and "
+            f"{InvestmentValueRollup.objects.count()} investment rollups."
+        )
@@ -0,0 +1,24 @@
+"""Command to rebuild the monthly spend summary."""
+
+from django.core.management.base import BaseCommand
+
+from api.models import bump_model_versions
+from finance.models import MonzoSpendSummary, MonzoTransaction
+from finance.spend import rebuild_spend, spend_totals
+
+
+class Command(BaseCommand):
+    """Command to rebuild the monthly spend summary."""
+
+    help = "Rebuild the monthly spend summary from the stored transactions."
+
+    def handle(self, *args, **options) -> None:
+        """Rebuild the summary."""
+        rebuild_spend(
+            summaries=MonzoSpendSummary.objects.all(),
+            values=spend_totals(MonzoTransaction.objects.all()),
+        )
+        bump_model_versions(MonzoSpendSummary)
+        self.stdout.write(
+            f"Rebuilt {MonzoSpendSummary.objects.count()} spend summary rows."
+        )
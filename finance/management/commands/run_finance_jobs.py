@@ -0,0 +1,45 @@
+"""Command to run queued finance automation jobs."""
+
+from time import sleep
+
+from django.core.management.base import BaseCommand
+
+from finance.jobs import run_next
+
+
+class Command(BaseCommand):
+    """Command to run queued finance automation jobs."""
+
+    help = "Run queued finance automation jobs, polling for new jobs until stopped."
+
+    def add_arguments(self, parser) -> None:
+        """
+        Add arguments for the command.
+
+        Args:
+            parser: Argument parser for the command
+        """
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty rather than polling.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait between checks of an empty queue.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Run jobs until stopped or, with --once, until the queue is empty."""
+        while True:
+            job = run_next()
+            if job:
+                self.stdout.write(
+                    f"Job {job.pk} {job.kind} {job.status} in {job.duration:.2f}s"
+                )
+                continue
+            if options["once"]:
+                return
+            sleep(options["poll_interval"])
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("finance", "0019_alter_monzotransaction_merchant"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bill",
+            name="interest_applied_on",
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from finance.rollups import rebuild_rollups
+
+
+def build_rollups(apps, schema_editor):
+    """Build rollups for the history recorded so far."""
+    BillHistory = apps.get_model("finance", "BillHistory")
+    InvestmentValue = apps.get_model("finance", "InvestmentValue")
+    rebuild_rollups(
+        rollup_model=apps.get_model("finance", "BillHistoryRollup"),
+        owner_field="bill_id",
+        values=BillHistory.objects.values_list(
+            "bill_id", "date", "current_balance"
+        ).iterator(chunk_size=2000),
+    )
+    rebuild_rollups(
+        rollup_model=apps.get_model("finance", "InvestmentValueRollup"),
+        owner_field="investment_id",
+        values=InvestmentValue.objects.values_list(
+            "investment_id", "date", "value"
+        ).iterator(chunk_size=2000),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("finance", "0020_bill_interest_applied_on"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BillHistoryRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "resolution",
+                    models.CharField(
+                        choices=[("day", "Day"), ("week", "Week"), ("month", "Month")],
+                        max_length=5,
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("last_date", models.DateField()),
+                ("last_value", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("min_value", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("max_value", models.DecimalField(decimal_places=2, max_digits=10)),
+                (
+                    "bill",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="finance.bill"
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("bill", "resolution", "period_start")},
+            },
+        ),
+        migrations.CreateModel(
+            name="InvestmentValueRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "resolution",
+                    models.CharField(
+                        choices=[("day", "Day"), ("week", "Week"), ("month", "Month")],
+                        max_length=5,
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("last_date", models.DateField()),
+                ("last_value", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("min_value", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("max_value", models.DecimalField(decimal_places=2, max_digits=10)),
+                (
+                    "investment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="finance.investments",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("investment", "resolution", "period_start")},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("finance", "0021_history_rollups"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="billhistory",
+            index=models.Index(
+                fields=["bill", "date", "current_balance"],
+                name="billhistory_bill_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="investmentvalue",
+            index=models.Index(
+                fields=["investment", "date", "value"],
+                name="investmentvalue_inv_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="monzotransaction",
+            index=models.Index(fields=["created"], name="monzotransaction_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="monzotransaction",
+            index=models.Index(
+                fields=["merchant", "-created"], name="monzotransaction_merch_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("finance", "0023_automationjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="monzo",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from finance.spend import rebuild_spend, spend_totals
+
+
+def build_spend_summary(apps, schema_editor):
+    """Build the spend summary for the transactions stored so far."""
+    MonzoSpendSummary = apps.get_model("finance", "MonzoSpendSummary")
+    MonzoTransaction = apps.get_model("finance", "MonzoTransaction")
+    rebuild_spend(
+        summaries=MonzoSpendSummary.objects.all(),
+        values=spend_totals(MonzoTransaction.objects.all()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("finance", "0024_monzo_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonzoSpendSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField()),
+                ("currency", models.CharField(max_length=5)),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("total", models.BigIntegerField(default=0)),
+                (
+                    "for_bill",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="finance.bill",
+                    ),
+                ),
+                (
+                    "merchant",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="finance.monzomerchant",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["merchant", "month"], name="monzospendsummary_merch_idx"
+                    )
+                ],
+                "unique_together": {("month", "merchant", "for_bill", "currency")},
+            },
+        ),
+        migrations.RunPython(build_spend_summary, migrations.RunPython.noop),
+    ]
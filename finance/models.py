@@ -1,9 +1,16 @@
 """Models for the Finance application."""
 
+from datetime import datetime
+
+from dateutil.relativedelta import relativedelta
 from django.db import models
+from django.db.models import Q
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from api.models import bump_model_versions
+from finance.rollups import record_rollups
+
 DEBT_TYPES = ("Loan", "Credit Card")
 
 
@@ -80,6 +87,7 @@ class Bill(models.Model):
     variable_payment: models.BooleanField = models.BooleanField(default=False)
     start_date: models.DateTimeField = models.DateTimeField(blank=True, null=True)
     last_payment: models.DateTimeField = models.DateTimeField(blank=True, null=True)
+    interest_applied_on: models.DateField = models.DateField(blank=True, null=True)
     paid_from: models.ForeignKey = models.ForeignKey(
         to=PaidFrom, on_delete=models.RESTRICT, null=False
     )
@@ -95,6 +103,25 @@ class Bill(models.Model):
         verbose_name_plural = "Bills"
 
 
+def bills_paid_in_month(month_start: datetime) -> models.QuerySet:
+    """
+    Find the bills being paid in a month.
+
+    Bills without a start date have always been paid and those without a last
+    payment are still being paid.
+
+    Args:
+        month_start: Start of the month
+
+    Returns:
+        QuerySet of the bills started before the month ends and not finished before it starts
+    """
+    return Bill.objects.filter(
+        Q(start_date__isnull=True)
+        | Q(start_date__lt=month_start + relativedelta(months=1))
+    ).filter(Q(last_payment__isnull=True) | Q(last_payment__gte=month_start))
+
+
 class BillHistory(models.Model):
     """Model for the BillHistory."""
 
@@ -106,6 +133,16 @@ class BillHistory(models.Model):
     )
     date: models.DateField = models.DateField(auto_now_add=True)
 
+    class Meta:
+        """Metaclass."""
+
+        indexes = [
+            models.Index(
+                fields=["bill", "date", "current_balance"],
+                name="billhistory_bill_date_idx",
+            ),
+        ]
+
 
 class Investments(models.Model):
     """Model for the Investments table."""
@@ -151,6 +188,71 @@ class InvestmentValue(models.Model):
         """Return a string representation of the model."""
         return f"{self.investment.organisation} ({self.value})"
 
+    class Meta:
+        """Metaclass."""
+
+        indexes = [
+            models.Index(
+                fields=["investment", "date", "value"],
+                name="investmentvalue_inv_date_idx",
+            ),
+        ]
+
+
+ROLLUP_RESOLUTIONS = [
+    ("day", "Day"),
+    ("week", "Week"),
+    ("month", "Month"),
+]
+
+
+class HistoryRollup(models.Model):
+    """Abstract model for history values aggregated over a period."""
+
+    resolution: models.CharField = models.CharField(
+        max_length=5, choices=ROLLUP_RESOLUTIONS
+    )
+    period_start: models.DateField = models.DateField()
+    last_date: models.DateField = models.DateField()
+    last_value: models.DecimalField = models.DecimalField(
+        max_digits=10, decimal_places=2
+    )
+    min_value: models.DecimalField = models.DecimalField(
+        max_digits=10, decimal_places=2
+    )
+    max_value: models.DecimalField = models.DecimalField(
+        max_digits=10, decimal_places=2
+    )
+
+    class Meta:
+        """Metaclass."""
+
+        abstract = True
+
+
+class BillHistoryRollup(HistoryRollup):
+    """Model for the BillHistory aggregated over a period."""
+
+    bill: models.ForeignKey = models.ForeignKey(to=Bill, on_delete=models.CASCADE)
+
+    class Meta:
+        """Metaclass."""
+
+        unique_together = [("bill", "resolution", "period_start")]
+
+
+class InvestmentValueRollup(HistoryRollup):
+    """Model for the InvestmentValue aggregated over a period."""
+
+    investment: models.ForeignKey = models.ForeignKey(
+        to=Investments, on_delete=models.CASCADE
+    )
+
+    class Meta:
+        """Metaclass."""
+
+        unique_together = [("investment", "resolution", "period_start")]
+
 
 class Monzo(models.Model):
     """Model to store Monzo details."""
@@ -171,6 +273,7 @@ class Monzo(models.Model):
     refresh_token: models.CharField = models.CharField(
         max_length=250, blank=True, null=True
     )
+    version: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
 
 
 class MonzoMerchant(models.Model):
@@ -229,6 +332,86 @@ class MonzoTransaction(models.Model):
         to=Bill, on_delete=models.CASCADE, blank=True, null=True
     )
 
+    class Meta:
+        """Metaclass."""
+
+        indexes = [
+            models.Index(fields=["created"], name="monzotransaction_created_idx"),
+            models.Index(
+                fields=["merchant", "-created"], name="monzotransaction_merch_idx"
+            ),
+        ]
+
+
+class MonzoSpendSummary(models.Model):
+    """Model to store the count and total of Monzo transactions per month."""
+
+    month: models.DateField = models.DateField()
+    merchant: models.ForeignKey = models.ForeignKey(
+        to=MonzoMerchant,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+    )
+    for_bill: models.ForeignKey = models.ForeignKey(
+        to=Bill, on_delete=models.CASCADE, blank=True, null=True
+    )
+    currency: models.CharField = models.CharField(max_length=5)
+    count: models.PositiveIntegerField = models.PositiveIntegerField(default=0)
+    total: models.BigIntegerField = models.BigIntegerField(default=0)
+
+    class Meta:
+        """Metaclass."""
+
+        unique_together = [("month", "merchant", "for_bill", "currency")]
+        indexes = [
+            models.Index(
+                fields=["merchant", "month"], name="monzospendsummary_merch_idx"
+            ),
+        ]
+
+
+JOB_KINDS = [
+    ("fetch_transactions", "Fetch transactions"),
+    ("process_interest", "Process interest"),
+]
+
+JOB_STATUSES = [
+    ("queued", "Queued"),
+    ("running", "Running"),
+    ("succeeded", "Succeeded"),
+    ("failed", "Failed"),
+]
+
+
+class AutomationJob(models.Model):
+    """Model to store queued and completed automation jobs."""
+
+    kind: models.CharField = models.CharField(max_length=30, choices=JOB_KINDS)
+    status: models.CharField = models.CharField(
+        max_length=10, choices=JOB_STATUSES, default="queued"
+    )
+    # Holds the kind while the job is queued or running so only one can be active.
+    active_kind: models.CharField = models.CharField(
+        max_length=30, unique=True, blank=True, null=True
+    )
+    created: models.DateTimeField = models.DateTimeField(auto_now_add=True)
+    started: models.DateTimeField = models.DateTimeField(blank=True, null=True)
+    finished: models.DateTimeField = models.DateTimeField(blank=True, null=True)
+    duration: models.FloatField = models.FloatField(blank=True, null=True)
+    result: models.JSONField = models.JSONField(blank=True, null=True)
+    error: models.TextField = models.TextField(blank=True, default="")
+
+    def __str__(self) -> str:
+        """Return the kind and status of the job."""
+        return f"{self.kind} ({self.status})"
+
+    class Meta:
+        """Metaclass."""
+
+        verbose_name = "Automation job"
+        verbose_name_plural = "Automation jobs"
+
 
 # Signals
 
@@ -250,3 +433,29 @@ def update_bill_history_log(sender, instance, **kwargs) -> None:
         new_value.bill = instance
         new_value.current_balance = instance.current_balance
         new_value.save()
+
+
+@receiver(post_save, sender=BillHistory, dispatch_uid="update_bill_history_rollup")
+def update_bill_history_rollup(sender, instance, created, **kwargs) -> None:
+    """Update the bill history rollups."""
+    if created:
+        record_rollups(
+            rollup_model=BillHistoryRollup,
+            owner_field="bill_id",
+            values=[(instance.bill_id, instance.date, instance.current_balance)],
+        )
+        bump_model_versions(BillHistoryRollup)
+
+
+@receiver(
+    post_save, sender=InvestmentValue, dispatch_uid="update_investment_value_rollup"
+)
+def update_investment_value_rollup(sender, instance, created, **kwargs) -> None:
+    """Update the investment value rollups."""
+    if created:
+        record_rollups(
+            rollup_model=InvestmentValueRollup,
+            owner_field="investment_id",
+            values=[(instance.investment_id, instance.date, instance.value)],
+        )
+        bump_model_versions(InvestmentValueRollup)
@@ -0,0 +1,180 @@
+"""Local stand-in for the Monzo API to exercise the integration without Monzo."""
+
+from datetime import datetime, timedelta
+from math import ceil
+from typing import Optional
+
+from monzo.authentication import Authentication
+from monzo.helpers import create_date
+
+STUB_START = datetime(2024, 1, 1, 9, 0, 0)
+STUB_SPACING = timedelta(seconds=1)
+
+
+class StubMonzoAuthentication(Authentication):
+    """
+    Authentication that serves synthetic accounts and transactions.
+
+    Requests never leave the process. Transaction n is created at
+    start + spacing * (n // per_instant), so several can share an instant, and each
+    is built on demand so very large histories are not held in memory. Like Monzo,
+    pages can start from a date/time or from the id of a transaction.
+    """
+
+    __slots__ = [
+        "fail_after",
+        "merchant_count",
+        "per_instant",
+        "requests",
+        "spacing",
+        "start",
+        "transaction_count",
+    ]
+
+    def __init__(
+        self,
+        transaction_count: int = 1000,
+        start: datetime = STUB_START,
+        spacing: timedelta = STUB_SPACING,
+        per_instant: int = 3,
+        merchant_count: int = 3,
+    ) -> None:
+        """
+        Initialise StubMonzoAuthentication.
+
+        Args:
+            transaction_count: Number of transactions in the account
+            start: Naive UTC date/time of the first transaction
+            spacing: Time between instants that have transactions
+            per_instant: Number of transactions created at each instant
+            merchant_count: Number of merchants the transactions are spread over
+        """
+        super().__init__(
+            client_id="id",
+            client_secret="secret",
+            redirect_url="",
+            access_token="token",
+            access_token_expiry=int((datetime.now() + timedelta(days=1)).timestamp()),
+        )
+        self.fail_after: Optional[int] = None
+        self.merchant_count = merchant_count
+        self.per_instant = per_instant
+        self.requests = 0
+        self.spacing = spacing
+        self.start = start
+        self.transaction_count = transaction_count
+
+    def make_request(self, path: str, data=None, **kwargs) -> dict:
+        """
+        Serve a response for the given path.
+
+        Args:
+            path: Path for the API call
+            data: Parameters for the API call
+            kwargs: Unused request options
+
+        Raises:
+            RuntimeError: On more transaction pages being requested than fail_after
+
+        Returns:
+            Dictionary shaped like a Monzo response
+        """
+        if path == "/accounts":
+            accounts = [
+                {
+                    "id": "acc_1",
+                    "description": "user_1",
+                    "created": "2020-01-01T00:00:00.000Z",
+                    "closed": False,
+                }
+            ]
+            return {"data": {"accounts": accounts}}
+        if self.fail_after is not None and self.requests >= self.fail_after:
+            raise RuntimeError("Connection lost")
+        self.requests += 1
+        if data["since"].startswith("tx_"):
+            index = int(data["since"][3:]) + 1
+        else:
+            index = self._first_index(since=create_date(data["since"]))
+        before = create_date(data["before"]) if "before" in data else None
+        page = []
+        while index < self.transaction_count and len(page) < data["limit"]:
+            if before and self.created(index) >= before:
+                break
+            page.append(self.transaction(index))
+            index += 1
+        return {"data": {"transactions": page}}
+
+    def created(self, index: int) -> datetime:
+        """
+        Date/time a transaction was created.
+
+        Args:
+            index: Position of the transaction
+
+        Returns:
+            Naive UTC date/time
+        """
+        return self.start + self.spacing * (index // self.per_instant)
+
+    def transaction(self, index: int) -> dict:
+        """
+        Build a transaction as returned by the Monzo API.
+
+        Args:
+            index: Position of the transaction
+
+        Returns:
+            Dictionary matching a Monzo transaction
+        """
+        created = self.created(index).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        merchant = index % self.merchant_count
+        return {
+            "account_id": "acc_1",
+            "amount": -100 - index,
+            "amount_is_pending": False,
+            "atm_fees_detailed": None,
+            "attachments": None,
+            "can_add_to_tab": False,
+            "can_be_excluded_from_breakdown": False,
+            "can_be_made_subscription": False,
+            "can_match_transactions_in_categorization": False,
+            "can_split_the_bill": False,
+            "categories": {},
+            "category": "general",
+            "counterparty": {},
+            "created": created,
+            "currency": "GBP",
+            "dedupe_id": f"dedupe_{index}",
+            "description": f"SHOP {merchant}",
+            "fees": {},
+            "id": f"tx_{index:05d}",
+            "include_in_spending": True,
+            "international": None,
+            "is_load": False,
+            "labels": None,
+            "local_amount": -100 - index,
+            "local_currency": "GBP",
+            "merchant": {"id": f"merch_{merchant}", "name": f"Shop {merchant}"},
+            "metadata": {},
+            "notes": "",
+            "originator": False,
+            "scheme": "mastercard",
+            "settled": None,
+            "updated": created,
+            "user_id": "user_1",
+        }
+
+    def _first_index(self, since: datetime) -> int:
+        """
+        Find the first transaction created at or after the given date/time.
+
+        Args:
+            since: Naive UTC date/time
+
+        Returns:
+            Position of the transaction
+        """
+        if since <= self.start:
+            return 0
+        return ceil((since - self.start) / self.spacing) * self.per_instant
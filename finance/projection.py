@@ -0,0 +1,246 @@
+"""Classes to project when debts will be paid off."""
+
+from array import array
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Any, Optional
+
+from dateutil.relativedelta import relativedelta
+from django.core.cache import cache
+
+from api.models import model_versions
+from finance.models import DEBT_TYPES, Bill, BillType
+
+STRATEGIES = ("none", "snowball", "avalanche")
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+@dataclass
+class Debt:
+    """Data class for a debt to be projected."""
+
+    pk: int
+    name: str
+    balance: int
+    apr: float
+    payment: int
+
+
+class DebtProjection:
+    """
+    Class to build amortization schedules for a set of debts.
+
+    Balances are simulated together a month at a time in arrays of pence, so
+    the cost grows with the number of debts and months rather than with any
+    per debt objects.
+    """
+
+    __slots__ = ("_debts",)
+
+    def __init__(self, debts: list[Debt]) -> None:
+        """
+        Initialise DebtProjection.
+
+        Args:
+            debts: Debts to project
+        """
+        self._debts = debts
+
+    @classmethod
+    def from_bills(cls) -> "DebtProjection":
+        """
+        Create a projection for every debt bill with an outstanding balance.
+
+        Returns:
+            DebtProjection for the debt bills
+        """
+        bills = (
+            Bill.objects.filter(bill_type__name__in=DEBT_TYPES, current_balance__gt=0)
+            .order_by("name")
+            .values_list("pk", "name", "current_balance", "apr", "monthly_payments")
+        )
+        return cls(
+            [
+                Debt(
+                    pk=pk,
+                    name=name,
+                    balance=int(balance * 100),
+                    apr=float(apr),
+                    payment=int(payment * 100),
+                )
+                for pk, name, balance, apr, payment in bills
+            ]
+        )
+
+    def project(
+        self,
+        overpayment: int = 0,
+        strategy: str = "none",
+        months: int = 360,
+        schedule: bool = False,
+    ) -> dict[str, Any]:
+        """
+        Project the debts until they are paid off or the horizon is reached.
+
+        With no strategy each debt pays its own monthly payment and any overpayment
+        is spread evenly. Snowball and avalanche put the overpayment, plus the
+        payments freed up by debts already cleared, towards the smallest balance or
+        the highest APR respectively.
+
+        Args:
+            overpayment: Extra amount in pence paid each month
+            strategy: One of none, snowball or avalanche
+            months: Number of months to project
+            schedule: True to include the month end balance of each debt
+
+        Returns:
+            Dictionary describing when each debt is paid off and the interest paid
+        """
+        count = len(self._debts)
+        balances = array("q", (debt.balance for debt in self._debts))
+        payments = array("q", (debt.payment for debt in self._debts))
+        rates = array("d", (debt.apr / 12 / 100 for debt in self._debts))
+        interest = array("q", [0]) * count
+        paid = array("q", [0]) * count
+        payoff = array("q", [-1]) * count
+        schedules: list[array] = [array("q") for _ in range(count)]
+        avalanche_order = sorted(range(count), key=lambda index: -rates[index])
+        open_debts = [index for index in range(count) if balances[index] > 0]
+        freed = 0
+
+        for month in range(months):
+            if not open_debts:
+                break
+            pool = overpayment + (freed if strategy != "none" else 0)
+            for index in open_debts:
+                charge = round(balances[index] * rates[index])
+                payment = min(payments[index], balances[index] + charge)
+                balances[index] += charge - payment
+                interest[index] += charge
+                paid[index] += payment
+                if strategy != "none":
+                    pool += payments[index] - payment
+            if strategy == "none":
+                share = pool // len(open_debts)
+                targets = [(index, share) for index in open_debts]
+            else:
+                order = (
+                    sorted(open_debts, key=lambda index: balances[index])
+                    if strategy == "snowball"
+                    else [index for index in avalanche_order if balances[index] > 0]
+                )
+                targets = [(index, pool) for index in order]
+            for index, available in targets:
+                extra = min(available, balances[index], pool)
+                balances[index] -= extra
+                paid[index] += extra
+                pool -= extra
+            still_open = []
+            for index in open_debts:
+                if schedule:
+                    schedules[index].append(balances[index])
+                if balances[index] > 0:
+                    still_open.append(index)
+                    continue
+                payoff[index] = month + 1
+                freed += payments[index]
+            open_debts = still_open
+
+        start = date.today().replace(day=1)
+        debts = []
+        for index, debt in enumerate(self._debts):
+            details = {
+                "pk": debt.pk,
+                "name": debt.name,
+                "payoff_months": payoff[index] if payoff[index] >= 0 else None,
+                "payoff_date": self._month_label(start, payoff[index]),
+                "remaining_balance": self._pounds(balances[index]),
+                "total_interest": self._pounds(interest[index]),
+                "total_paid": self._pounds(paid[index]),
+            }
+            if schedule:
+                details["schedule"] = [
+                    self._pounds(balance) for balance in schedules[index]
+                ]
+            debts.append(details)
+        debt_free = max(payoff, default=0) if min(payoff, default=0) >= 0 else -1
+        return {
+            "strategy": strategy,
+            "overpayment": self._pounds(overpayment),
+            "months": months,
+            "debt_free_date": self._month_label(start, debt_free),
+            "total_interest": self._pounds(sum(interest)),
+            "debts": debts,
+        }
+
+    @staticmethod
+    def _month_label(start: date, months: int) -> Optional[str]:
+        """
+        Describe the month a number of months after the start.
+
+        Args:
+            start: First day of the current month
+            months: Number of months ahead, negative for never
+
+        Returns:
+            Month as YYYY-MM or None for never
+        """
+        if months < 0:
+            return None
+        return (start + relativedelta(months=months)).strftime("%Y-%m")
+
+    @staticmethod
+    def _pounds(pence: int) -> Decimal:
+        """
+        Convert pence to pounds.
+
+        Args:
+            pence: Amount in pence
+
+        Returns:
+            Amount in pounds
+        """
+        return Decimal(pence) / 100
+
+
+def cached_projection(
+    overpayment: int = 0,
+    strategy: str = "none",
+    months: int = 360,
+    schedule: bool = False,
+) -> dict[str, Any]:
+    """
+    Project the debt bills, reusing the result until a bill changes.
+
+    The cache key includes the change counts of the bills, which are kept in the
+    database, so evicting cache entries cannot bring back a stale projection.
+
+    Args:
+        overpayment: Extra amount in pence paid each month
+        strategy: One of none, snowball or avalanche
+        months: Number of months to project
+        schedule: True to include the month end balance of each debt
+
+    Returns:
+        Dictionary describing when each debt is paid off and the interest paid
+    """
+    versions = model_versions(Bill, BillType)
+    version = ".".join(
+        str(versions.get(model._meta.label_lower, 0)) for model in (Bill, BillType)
+    )
+    key = (
+        f"finance:projection:{version}:{date.today():%Y-%m}:"
+        f"{overpayment}:{strategy}:{months}:{int(schedule)}"
+    )
+    projection = cache.get(key)
+    if projection is None:
+        projection = DebtProjection.from_bills().project(
+            overpayment=overpayment,
+            strategy=strategy,
+            months=months,
+            schedule=schedule,
+        )
+        cache.set(key, projection, timeout=CACHE_TIMEOUT)
+    return projection
@@ -0,0 +1,198 @@
+"""Functions to maintain and read history values aggregated over a period."""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterable, Iterator, Sequence
+
+from django.db import models, transaction
+
+RESOLUTIONS = ("day", "week", "month")
+
+RollupValue = tuple[int, date, Decimal]
+
+# Investment primary key, organisation name, date and value.
+PortfolioValue = tuple[int, str, date, Decimal]
+
+
+def period_start(day: date, resolution: str) -> date:
+    """
+    Identify the first day of the period containing the given day.
+
+    Args:
+        day: Day to find the period for
+        resolution: One of day, week or month
+
+    Returns:
+        First day of the period, weeks start on a Monday
+    """
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    return day
+
+
+def record_rollups(
+    rollup_model: type[models.Model],
+    owner_field: str,
+    values: Iterable[RollupValue],
+) -> None:
+    """
+    Fold new history values into the daily, weekly and monthly rollups.
+
+    Args:
+        rollup_model: Rollup model to update
+        owner_field: Attribute name of the foreign key on the rollup model, e.g. bill_id
+        values: Tuples of owner primary key, date and value
+    """
+    values = sorted(values, key=lambda value: value[1])
+    if not values:
+        return
+    owners = {owner for owner, _, _ in values}
+    starts = {
+        period_start(day, resolution)
+        for _, day, _ in values
+        for resolution in RESOLUTIONS
+    }
+    with transaction.atomic():
+        rollups = {
+            (
+                getattr(rollup, owner_field),
+                rollup.resolution,
+                rollup.period_start,
+            ): rollup
+            for rollup in rollup_model.objects.select_for_update().filter(
+                **{f"{owner_field}__in": owners}, period_start__in=starts
+            )
+        }
+        new_rollups: dict[tuple[int, str, date], models.Model] = {}
+        for owner, day, value in values:
+            for resolution in RESOLUTIONS:
+                key = (owner, resolution, period_start(day, resolution))
+                rollup = rollups.get(key) or new_rollups.get(key)
+                if not rollup:
+                    new_rollups[key] = rollup_model(
+                        **{owner_field: owner},
+                        resolution=resolution,
+                        period_start=key[2],
+                        last_date=day,
+                        last_value=value,
+                        min_value=value,
+                        max_value=value,
+                    )
+                    continue
+                rollup.min_value = min(rollup.min_value, value)
+                rollup.max_value = max(rollup.max_value, value)
+                if day >= rollup.last_date:
+                    rollup.last_date = day
+                    rollup.last_value = value
+        rollup_model.objects.bulk_create(new_rollups.values())
+        rollup_model.objects.bulk_update(
+            rollups.values(), ["last_date", "last_value", "min_value", "max_value"]
+        )
+
+
+def rebuild_rollups(
+    rollup_model: type[models.Model],
+    owner_field: str,
+    values: Iterable[RollupValue],
+    batch_size: int = 2000,
+) -> None:
+    """
+    Replace all rollups with ones built from the given history values.
+
+    Args:
+        rollup_model: Rollup model to rebuild
+        owner_field: Attribute name of the foreign key on the rollup model, e.g. bill_id
+        values: Every history value as tuples of owner primary key, date and value
+        batch_size: Number of values to fold in at a time
+    """
+    with transaction.atomic():
+        rollup_model.objects.all().delete()
+        batch: list[RollupValue] = []
+        for value in values:
+            batch.append(value)
+            if len(batch) >= batch_size:
+                record_rollups(rollup_model, owner_field, batch)
+                batch = []
+        record_rollups(rollup_model, owner_field, batch)
+
+
+def forward_fill(
+    values: Iterable[PortfolioValue], start: date, end: date
+) -> Iterator[tuple[date, Decimal, dict[str, Decimal]]]:
+    """
+    Carry each investment's last known value forward to value the portfolio daily.
+
+    Totals are adjusted as each value arrives so every day costs one step
+    regardless of the number of investments.
+
+    Args:
+        values: Investment values ordered by date, including those before the start
+        start: First day to value
+        end: Last day to value
+
+    Returns:
+        Iterator of the day, the total value and the total for each organisation
+    """
+    latest: dict[int, Decimal] = {}
+    organisations: dict[str, Decimal] = {}
+    total = Decimal(0)
+    iterator = iter(values)
+    value = next(iterator, None)
+    day = start
+    while day <= end:
+        while value and value[2] <= day:
+            investment, organisation, _, amount = value
+            change = amount - latest.get(investment, Decimal(0))
+            latest[investment] = amount
+            total += change
+            organisations[organisation] = (
+                organisations.get(organisation, Decimal(0)) + change
+            )
+            value = next(iterator, None)
+        yield day, total, dict(organisations)
+        day += timedelta(days=1)
+
+
+def downsample(points: Sequence[tuple[float, float]], threshold: int) -> list[int]:
+    """
+    Pick the points that best preserve the shape of a series.
+
+    Uses the Largest-Triangle-Three-Buckets algorithm, the first and last points
+    are always kept.
+
+    Args:
+        points: Series as x, y pairs ordered by x
+        threshold: Maximum number of points to keep, at least three are kept
+
+    Returns:
+        Indexes of the points to keep in ascending order
+    """
+    count = len(points)
+    threshold = max(threshold, 3)
+    if threshold >= count:
+        return list(range(count))
+    selected = [0]
+    bucket_size = (count - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, count)
+        next_bucket = points[end:next_end] or [points[-1]]
+        avg_x = sum(x for x, _ in next_bucket) / len(next_bucket)
+        avg_y = sum(y for _, y in next_bucket) / len(next_bucket)
+        prev_x, prev_y = points[previous]
+        best_area = -1.0
+        for index in range(start, end):
+            x, y = points[index]
+            area = abs(
+                (prev_x - avg_x) * (y - prev_y) - (prev_x - x) * (avg_y - prev_y)
+            )
+            if area > best_area:
+                best_area = area
+                previous = index
+        selected.append(previous)
+    selected.append(count - 1)
+    return selected
@@ -0,0 +1,123 @@
+"""Functions to maintain the monthly spend summary of Monzo transactions."""
+
+from datetime import date, datetime
+from datetime import timezone as dt_timezone
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from django.db import models, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+# Month, merchant ID, bill ID, currency, count and total in pence.
+SpendValue = tuple[date, Optional[str], Optional[int], str, int, int]
+
+
+def spend_month(created: datetime) -> date:
+    """
+    Identify the month a transaction is summarised in.
+
+    Args:
+        created: Date/time the transaction was created
+
+    Returns:
+        First day of the month in UTC
+    """
+    return created.astimezone(dt_timezone.utc).date().replace(day=1)
+
+
+def spend_totals(transactions: models.QuerySet) -> Iterator[SpendValue]:
+    """
+    Total the given transactions by month, merchant, bill and currency.
+
+    Args:
+        transactions: Transactions to total
+
+    Returns:
+        Iterator of summary values
+    """
+    rows = (
+        transactions.annotate(month=TruncMonth("created"))
+        .order_by()
+        .values_list("month", "merchant_id", "for_bill_id", "currency")
+        .annotate(count=Count("pk"), total=Sum("value"))
+    )
+    for month, merchant_id, bill_id, currency, count, total in rows.iterator(
+        chunk_size=2000
+    ):
+        if isinstance(month, datetime):
+            month = month.date()
+        yield month, merchant_id, bill_id, currency, count, total
+
+
+def record_spend(
+    summary_model: type[models.Model], values: Iterable[SpendValue]
+) -> None:
+    """
+    Add transaction counts and totals to the summary.
+
+    Args:
+        summary_model: Summary model to update
+        values: Counts and totals to add
+    """
+    totals: dict[tuple[date, Optional[str], Optional[int], str], list[int]] = {}
+    for month, merchant_id, bill_id, currency, count, total in values:
+        key = (month, merchant_id, bill_id, currency)
+        current = totals.setdefault(key, [0, 0])
+        current[0] += count
+        current[1] += total
+    if not totals:
+        return
+    merchants = {key[1] for key in totals}
+    merchant_filter = Q(merchant_id__in=merchants - {None})
+    if None in merchants:
+        merchant_filter |= Q(merchant__isnull=True)
+    with transaction.atomic():
+        summaries = {
+            (
+                summary.month,
+                summary.merchant_id,
+                summary.for_bill_id,
+                summary.currency,
+            ): summary
+            for summary in summary_model.objects.select_for_update()
+            .filter(merchant_filter)
+            .filter(month__in={key[0] for key in totals})
+        }
+        new_summaries = []
+        for key, (count, total) in totals.items():
+            summary = summaries.get(key)
+            if not summary:
+                new_summaries.append(
+                    summary_model(
+                        month=key[0],
+                        merchant_id=key[1],
+                        for_bill_id=key[2],
+                        currency=key[3],
+                        count=count,
+                        total=total,
+                    )
+                )
+                continue
+            summary.count += count
+            summary.total += total
+        summary_model.objects.bulk_create(new_summaries)
+        summary_model.objects.bulk_update(summaries.values(), ["count", "total"])
+
+
+def rebuild_spend(
+    summaries: models.QuerySet, values: Iterable[SpendValue], batch_size: int = 2000
+) -> None:
+    """
+    Replace summary rows with ones built from the given values.
+
+    Args:
+        summaries: Summary rows to replace
+        values: Every summary value covering the replaced rows
+        batch_size: Number of values to fold in at a time
+    """
+    iterator = iter(values)
+    with transaction.atomic():
+        summaries.delete()
+        while batch := list(islice(iterator, batch_size)):
+            record_spend(summary_model=summaries.model, values=batch)
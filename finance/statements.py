@@ -0,0 +1,338 @@
+"""Functions to import bank statements a row at a time."""
+
+import csv
+import html
+import re
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+from hashlib import sha256
+from typing import Iterable, Iterator, Optional
+
+from django.utils import timezone
+
+from finance.ingest import IngestTransaction, TransactionIngest
+
+STATEMENT_FORMATS = ("csv", "ofx")
+
+CSV_COLUMNS = {
+    "transaction_id": ("transaction id",),
+    "date": ("date", "transaction date"),
+    "time": ("time",),
+    "amount": ("amount", "value"),
+    "money_in": ("money in", "paid in", "credit"),
+    "money_out": ("money out", "paid out", "debit"),
+    "name": ("name", "merchant", "payee"),
+    "description": ("description", "memo", "reference", "details"),
+    "currency": ("currency",),
+}
+
+CSV_DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y")
+
+OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+OFX_DATE = re.compile(r"(\d{8})(\d{6})?(?:\.\d+)?(?:\[([+-]?\d+(?:\.\d+)?)(?::\w+)?])?")
+
+
+class StatementException(Exception):
+    """Exception to handle a statement that cannot be read."""
+
+
+class StatementIds:
+    """Class to create deterministic transaction IDs from statement contents."""
+
+    __slots__ = ("_occurrences",)
+
+    def __init__(self) -> None:
+        """Initialise StatementIds."""
+        self._occurrences: dict[bytes, int] = {}
+
+    def transaction_id(self, *parts: object) -> str:
+        """
+        Create the ID for a transaction.
+
+        Identical rows within a statement are numbered so each is kept, while
+        importing the same statement again produces the same IDs.
+
+        Args:
+            parts: Values that identify the transaction
+
+        Returns:
+            Transaction ID
+        """
+        content = sha256("|".join(str(part) for part in parts).encode()).digest()
+        occurrence = self._occurrences.get(content, 0)
+        self._occurrences[content] = occurrence + 1
+        return f"imp_{sha256(content + str(occurrence).encode()).hexdigest()[:40]}"
+
+
+def parse_csv(
+    lines: Iterable[str], currency: str = "GBP"
+) -> Iterator[IngestTransaction]:
+    """
+    Read transactions from a CSV statement.
+
+    Columns are matched by name, either an amount column or money in and money out
+    columns are needed. Monzo exports keep their own transaction IDs.
+
+    Args:
+        lines: Lines of the statement
+        currency: Currency used when the statement has no currency column
+
+    Raises:
+        StatementException: On missing columns or an unreadable row
+
+    Returns:
+        Iterator of transactions
+    """
+    reader = csv.reader(lines)
+    rows = _csv_rows(reader)
+    header = next(rows, None)
+    if not header:
+        raise StatementException("The statement is empty")
+    names = [name.strip().lower() for name in header]
+    columns = {
+        field: next((names.index(alias) for alias in aliases if alias in names), None)
+        for field, aliases in CSV_COLUMNS.items()
+    }
+    if columns["date"] is None or (
+        columns["amount"] is None and columns["money_out"] is None
+    ):
+        raise StatementException("Line 1: A date and amount column are required")
+    ids = StatementIds()
+    for row in rows:
+        if not any(row):
+            continue
+        values = {
+            field: row[index].strip() if index is not None and index < len(row) else ""
+            for field, index in columns.items()
+        }
+        try:
+            created = _parse_csv_date(values["date"], values["time"])
+            if columns["amount"] is not None:
+                amount = _parse_amount(values["amount"])
+            else:
+                amount = (
+                    _parse_amount(values["money_in"])
+                    - _parse_amount(values["money_out"]).copy_abs()
+                )
+        except ValueError as exc:
+            raise StatementException(f"Line {reader.line_num}: {exc}") from exc
+        description = values["description"] or values["name"] or "Unknown"
+        name = values["name"] or description
+        row_currency = values["currency"] or currency
+        pence = int(amount * 100)
+        transaction_id = values["transaction_id"]
+        if not transaction_id.startswith("tx_"):
+            transaction_id = ids.transaction_id(
+                created.isoformat(), pence, row_currency, description
+            )
+        yield IngestTransaction(
+            transaction_id=transaction_id[:50],
+            currency=row_currency[:5],
+            value=pence,
+            created=created,
+            description=description[:250],
+            merchant_id=name[:50],
+            merchant_name=name[:150],
+        )
+
+
+def parse_ofx(lines: Iterable[str]) -> Iterator[IngestTransaction]:
+    """
+    Read transactions from an OFX statement, SGML or XML.
+
+    Args:
+        lines: Lines of the statement
+
+    Raises:
+        StatementException: On an unreadable transaction
+
+    Returns:
+        Iterator of transactions
+    """
+    currency = "GBP"
+    ids = StatementIds()
+    current: Optional[dict[str, str]] = None
+    for line_number, line in enumerate(lines, start=1):
+        for closing, tag, text in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if not closing:
+                    current = {}
+                    continue
+                if current is None:
+                    continue
+                try:
+                    created = _parse_ofx_date(current.get("DTPOSTED", ""))
+                    pence = int(_parse_amount(current.get("TRNAMT", "")) * 100)
+                except ValueError as exc:
+                    raise StatementException(f"Line {line_number}: {exc}") from exc
+                name = current.get("NAME") or current.get("MEMO") or "Unknown"
+                description = current.get("MEMO") or name
+                yield IngestTransaction(
+                    transaction_id=ids.transaction_id(
+                        created.isoformat(),
+                        pence,
+                        currency,
+                        description,
+                        current.get("FITID", ""),
+                    ),
+                    currency=currency[:5],
+                    value=pence,
+                    created=created,
+                    description=description[:250],
+                    merchant_id=name[:50],
+                    merchant_name=name[:150],
+                )
+                current = None
+            elif closing:
+                continue
+            elif tag == "CURDEF":
+                currency = text.strip()
+            elif current is not None:
+                current[tag] = html.unescape(text.strip())
+
+
+def import_statement(
+    lines: Iterable[str],
+    statement_format: str,
+    currency: str = "GBP",
+    process_bills: bool = False,
+) -> TransactionIngest:
+    """
+    Store the transactions from a statement, skipping any already stored.
+
+    Rows are read and written in batches so memory use does not grow with the
+    size of the statement.
+
+    Args:
+        lines: Lines of the statement
+        statement_format: One of csv or ofx
+        currency: Currency used when a CSV statement has no currency column
+        process_bills: True if linked debt balances should be updated
+
+    Raises:
+        StatementException: On an unknown format or unreadable statement
+
+    Returns:
+        The ingest holding counts of inserted and existing transactions
+    """
+    if statement_format == "csv":
+        transactions = parse_csv(lines=lines, currency=currency)
+    elif statement_format == "ofx":
+        transactions = parse_ofx(lines=lines)
+    else:
+        raise StatementException(f"Unknown statement format {statement_format}")
+    ingest = TransactionIngest(process_bills=process_bills, batch_size=1000)
+    ingest.ingest(transactions)
+    return ingest
+
+
+def detect_format(file_name: str) -> str:
+    """
+    Identify the statement format from the file name.
+
+    Args:
+        file_name: Name of the statement file
+
+    Returns:
+        ofx for .ofx and .qfx files, otherwise csv
+    """
+    return "ofx" if file_name.lower().endswith((".ofx", ".qfx")) else "csv"
+
+
+def _csv_rows(reader: Iterator[list[str]]) -> Iterator[list[str]]:
+    """
+    Read the rows of a CSV statement.
+
+    Args:
+        reader: CSV reader for the statement
+
+    Raises:
+        StatementException: On a row the CSV reader cannot split
+
+    Returns:
+        Iterator of rows
+    """
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            raise StatementException(f"Line {reader.line_num}: {exc}") from exc
+        yield row
+
+
+def _parse_amount(amount: str) -> Decimal:
+    """
+    Parse an amount in pounds.
+
+    Args:
+        amount: Amount, optionally with a currency symbol and thousands separators
+
+    Raises:
+        ValueError: On an amount that is not a number
+
+    Returns:
+        Amount in pounds, zero for an empty amount
+    """
+    amount = amount.replace(",", "").replace("£", "").strip()
+    if not amount:
+        return Decimal(0)
+    try:
+        return Decimal(amount)
+    except InvalidOperation as exc:
+        raise ValueError(f"Invalid amount {amount}") from exc
+
+
+def _parse_csv_date(day: str, time: str) -> datetime:
+    """
+    Parse the date and optional time of a CSV row.
+
+    Args:
+        day: Date in one of CSV_DATE_FORMATS
+        time: Time as HH:MM or HH:MM:SS, may be empty
+
+    Raises:
+        ValueError: On an unrecognised date or time
+
+    Returns:
+        Aware date/time
+    """
+    for date_format in CSV_DATE_FORMATS:
+        try:
+            created = datetime.strptime(day, date_format)
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"Invalid date {day}")
+    if time:
+        clock = datetime.strptime(time, "%H:%M:%S" if time.count(":") == 2 else "%H:%M")
+        created = created.replace(
+            hour=clock.hour, minute=clock.minute, second=clock.second
+        )
+    return timezone.make_aware(created)
+
+
+def _parse_ofx_date(value: str) -> datetime:
+    """
+    Parse an OFX date/time such as 20240105120000.000[-5:EST].
+
+    Args:
+        value: OFX date/time, GMT unless an offset is given
+
+    Raises:
+        ValueError: On an unrecognised date/time
+
+    Returns:
+        Aware date/time
+    """
+    match = OFX_DATE.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid date {value}")
+    day, time, offset = match.groups()
+    created = datetime.strptime(day + (time or "000000"), "%Y%m%d%H%M%S")
+    tzinfo = dt_timezone(timedelta(hours=float(offset))) if offset else dt_timezone.utc
+    return created.replace(tzinfo=tzinfo)
@@ -1 +1,1036 @@
 """Tests for Finance."""
+
+import json
+import re
+from dataclasses import replace
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F, QuerySet, Sum
+from django.test import TestCase
+from django.utils import timezone as django_timezone
+from monzo.exceptions import MonzoAuthenticationError
+
+from api.models import ChangeLog
+from finance.automation import (
+    FetchTransactions,
+    LinkMerchantToBill,
+    ProcessInterest,
+    TransactionPager,
+)
+from finance.ingest import IngestTransaction, TransactionIngest
+from finance.jobs import JOB_RUNNERS, JobAlreadyActiveException, enqueue, run_next
+from finance.models import (
+    AutomationJob,
+    Bill,
+    BillHistory,
+    BillHistoryRollup,
+    BillType,
+    Investments,
+    InvestmentValue,
+    Monzo,
+    MonzoMerchant,
+    MonzoSpendSummary,
+    MonzoTransaction,
+    Organisation,
+    PaidFrom,
+)
+from finance.monzo_stub import STUB_START, StubMonzoAuthentication
+from finance.projection import Debt, DebtProjection, cached_projection
+from finance.rollups import downsample
+from finance.statements import import_statement, parse_ofx
+from finance.utilities import DjangoHandler, LockedAuthentication
+
+START = STUB_START
+
+
+class FetchTransactionsTests(TestCase):
+    """Tests for paging through Monzo transactions."""
+
+    def setUp(self) -> None:
+        """Create credentials and a window of transactions."""
+        DjangoHandler()._credentials_record = None
+        Monzo.objects.create(client_id="id", client_secret="secret")
+        # Several transactions share each second so pages end part way through one.
+        self.auth = StubMonzoAuthentication(transaction_count=250, start=START)
+
+    def test_pages_cover_window_once(self) -> None:
+        """Each transaction is yielded exactly once across pages."""
+        pager = TransactionPager(auth=self.auth, account_id="acc_1", page_size=100)
+        ids = [
+            tran.transaction_id for page in pager.pages(since=START) for tran in page
+        ]
+        self.assertEqual(len(ids), 250)
+        self.assertEqual(len(set(ids)), 250)
+
+    def test_page_of_one_timestamp(self) -> None:
+        """Transactions sharing a timestamp beyond a full page are all yielded."""
+        auth = StubMonzoAuthentication(transaction_count=10, per_instant=7)
+        pager = TransactionPager(auth=auth, account_id="acc_1", page_size=3)
+        ids = [
+            tran.transaction_id for page in pager.pages(since=START) for tran in page
+        ]
+        self.assertEqual(ids, [f"tx_{index:05d}" for index in range(10)])
+
+    def test_checkpoint_written_per_page(self) -> None:
+        """An interrupted sync keeps committed pages and resumes after them."""
+        auth = self.auth
+        auth.fail_after = 2
+        DjangoHandler().last_transaction_datetime = START.replace(tzinfo=timezone.utc)
+        with self.assertRaises(RuntimeError):
+            FetchTransactions(auth=auth).process()
+        self.assertEqual(MonzoTransaction.objects.count(), 200)
+        checkpoint = Monzo.objects.get().last_fetched_datetime
+        self.assertEqual(
+            checkpoint, START.replace(tzinfo=timezone.utc) + timedelta(seconds=66)
+        )
+
+        auth.fail_after = None
+        output = FetchTransactions(auth=auth).process()
+        self.assertEqual(MonzoTransaction.objects.count(), 250)
+        self.assertEqual(output["inserted_transactions"], 50)
+        self.assertEqual(output["pages"], 1)
+
+
+class TransactionIngestTests(TestCase):
+    """Tests for storing transactions in batches."""
+
+    def setUp(self) -> None:
+        """Create a debt to link merchants to."""
+        self.debt = Bill.objects.create(
+            name="Card",
+            description="Card",
+            organisation=Organisation.objects.create(name="Bank", url="https://bank"),
+            bill_type=BillType.objects.create(name="Credit Card"),
+            paid_from=PaidFrom.objects.create(name="Main Balance"),
+            current_balance=Decimal("100.00"),
+        )
+
+    @staticmethod
+    def transaction(index: int, merchant_id: str = "merch_0") -> IngestTransaction:
+        """
+        Create a transaction to ingest.
+
+        Args:
+            index: Number of the transaction
+            merchant_id: Merchant of the transaction
+
+        Returns:
+            Transaction to ingest
+        """
+        return IngestTransaction(
+            transaction_id=f"tx_{index}",
+            currency="GBP",
+            value=-100,
+            created=START.replace(tzinfo=timezone.utc) + timedelta(minutes=index),
+            description="SHOP",
+            merchant_id=merchant_id,
+            merchant_name="Shop",
+        )
+
+    def test_counts_match_stored_rows(self) -> None:
+        """Repeated and already stored transactions are counted as existing."""
+        TransactionIngest().ingest([self.transaction(index) for index in range(3)])
+        ingest = TransactionIngest(batch_size=4)
+        ingest.ingest(
+            [self.transaction(index) for index in (1, 2, 3, 3, 4, 5, 5)],
+        )
+        self.assertEqual(ingest.inserted_count, 3)
+        self.assertEqual(ingest.existing_count, 4)
+        self.assertEqual(MonzoTransaction.objects.count(), 6)
+        self.assertEqual(
+            MonzoSpendSummary.objects.aggregate(count=Sum("count"))["count"], 6
+        )
+
+    def test_merchant_stored_meanwhile_keeps_bill(self) -> None:
+        """A merchant another writer stored is used with the bill it is linked to."""
+        ingest = TransactionIngest()
+        ingest.ingest([self.transaction(0)])
+        MonzoMerchant.objects.create(
+            merchant_id="merch_1", name="Card payment", for_bill=self.debt
+        )
+        ingest.ingest([self.transaction(1, merchant_id="merch_1")])
+        self.assertEqual(MonzoTransaction.objects.get(pk="tx_1").for_bill, self.debt)
+        self.assertEqual(ingest.processed_count, 1)
+        self.debt.refresh_from_db()
+        self.assertEqual(self.debt.current_balance, Decimal("99.00"))
+
+
+class CredentialCacheTests(TestCase):
+    """Tests for sharing Monzo credentials between workers."""
+
+    def setUp(self) -> None:
+        """Store credentials with an expired access token."""
+        DjangoHandler()._credentials_record = None
+        self.expired = int((datetime.now() - timedelta(hours=1)).timestamp())
+        self.valid = int((datetime.now() + timedelta(hours=1)).timestamp())
+        DjangoHandler().store(
+            access_token="old",
+            client_id="id",
+            client_secret="secret",
+            expiry=self.expired,
+        )
+
+    def test_cached_record_reused_until_changed(self) -> None:
+        """The cached row is reused until another worker stores new tokens."""
+        handler = DjangoHandler()
+        with self.assertNumQueries(1):
+            self.assertEqual(handler.fetch()["access_token"], "old")
+        Monzo.objects.update(access_token="new", version=F("version") + 1)
+        with self.assertNumQueries(2):
+            self.assertEqual(handler.fetch()["access_token"], "new")
+
+    def test_refresh_reuses_token_from_another_worker(self) -> None:
+        """A refresh adopts a valid token stored while waiting on the lock."""
+        auth = LockedAuthentication(
+            client_id="id",
+            client_secret="secret",
+            redirect_url="",
+            access_token="old",
+            access_token_expiry=self.expired,
+            refresh_token="refresh",
+        )
+        Monzo.objects.update(
+            access_token="new", expiry=self.valid, refresh_token="refresh 2"
+        )
+        auth.refresh_access()
+        self.assertEqual(auth.access_token, "new")
+        self.assertEqual(auth.access_token_expiry, self.valid)
+        self.assertEqual(auth.refresh_token, "refresh 2")
+
+    def test_refresh_calls_monzo_for_stale_token(self) -> None:
+        """A refresh goes to Monzo when the stored token is the expired one."""
+        auth = LockedAuthentication(
+            client_id="id",
+            client_secret="secret",
+            redirect_url="",
+            access_token="old",
+            access_token_expiry=self.expired,
+        )
+        with self.assertRaises(MonzoAuthenticationError):
+            auth.refresh_access()
+
+    def test_checkpoint_keeps_newer_tokens(self) -> None:
+        """Writing the checkpoint does not overwrite tokens from another worker."""
+        handler = DjangoHandler()
+        handler.fetch()
+        Monzo.objects.update(access_token="new", version=F("version") + 1)
+        handler.last_transaction_datetime = START.replace(tzinfo=timezone.utc)
+        self.assertEqual(Monzo.objects.get().access_token, "new")
+        self.assertEqual(handler.fetch()["access_token"], "new")
+
+
+class ProcessInterestTests(TestCase):
+    """Tests for adding monthly interest."""
+
+    def setUp(self) -> None:
+        """Create a debt with interest and one without."""
+        organisation = Organisation.objects.create(name="Bank", url="https://bank")
+        paid_from = PaidFrom.objects.create(name="Main Balance")
+        loan = BillType.objects.create(name="Loan")
+        self.bill = Bill.objects.create(
+            name="Loan",
+            description="Loan",
+            organisation=organisation,
+            bill_type=loan,
+            paid_from=paid_from,
+            current_balance=Decimal("1000.00"),
+            apr=Decimal("19.900"),
+        )
+        Bill.objects.create(
+            name="Free",
+            description="Interest free",
+            organisation=organisation,
+            bill_type=loan,
+            paid_from=paid_from,
+            current_balance=Decimal("500.00"),
+        )
+
+    def test_interest_charged_once_per_month(self) -> None:
+        """Repeated runs in the same month only charge interest once."""
+        output = ProcessInterest().process(when=date(2024, 3, 5))
+        self.assertEqual(output["bills"], 1)
+        self.assertEqual(output["interest"], "16.58")
+        self.assertEqual(ProcessInterest().process(when=date(2024, 3, 28))["bills"], 0)
+        self.bill.refresh_from_db()
+        self.assertEqual(self.bill.current_balance, Decimal("1016.58"))
+        self.assertEqual(
+            BillHistory.objects.filter(bill=self.bill).last().current_balance,
+            Decimal("1016.58"),
+        )
+        self.assertEqual(ProcessInterest().process(when=date(2024, 4, 1))["bills"], 1)
+
+    def test_interest_logged_as_changes(self) -> None:
+        """Bills and history written in bulk are added to the change log."""
+        since = ChangeLog.objects.latest("sequence").sequence
+        ProcessInterest().process(when=date(2024, 3, 5))
+        self.assertEqual(
+            list(
+                ChangeLog.objects.filter(sequence__gt=since).values_list(
+                    "label", "object_pk"
+                )
+            ),
+            [
+                ("finance.bill", str(self.bill.pk)),
+                (
+                    "finance.billhistory",
+                    str(BillHistory.objects.filter(bill=self.bill).last().pk),
+                ),
+            ],
+        )
+
+
+class LinkMerchantToBillTests(TestCase):
+    """Tests for linking a merchant and its history to a bill."""
+
+    def setUp(self) -> None:
+        """Create two debts and a merchant with some history."""
+        organisation = Organisation.objects.create(name="Bank", url="https://bank")
+        paid_from = PaidFrom.objects.create(name="Main Balance")
+        loan = BillType.objects.create(name="Loan")
+        self.old_bill, self.new_bill = (
+            Bill.objects.create(
+                name=name,
+                description=name,
+                organisation=organisation,
+                bill_type=loan,
+                paid_from=paid_from,
+                current_balance=Decimal("1000.00"),
+            )
+            for name in ("Old", "New")
+        )
+        self.merchant = MonzoMerchant.objects.create(merchant_id="merch_0", name="Shop")
+        MonzoTransaction.objects.bulk_create(
+            MonzoTransaction(
+                transaction_id=f"tx_{index}",
+                currency="GBP",
+                value=-1000,
+                created=START.replace(tzinfo=timezone.utc) + timedelta(days=index),
+                description="SHOP",
+                merchant=self.merchant,
+                has_receipt=False,
+                for_bill=self.old_bill if index == 0 else None,
+            )
+            for index in range(3)
+        )
+
+    def test_history_moved_to_bill(self) -> None:
+        """Past transactions move to the bill and both balances are corrected."""
+        output = LinkMerchantToBill(
+            merchant=self.merchant, bill=self.new_bill
+        ).process()
+        self.assertEqual(output["transactions"], 3)
+        self.assertEqual(output["bills"], 2)
+        self.assertEqual(
+            MonzoTransaction.objects.filter(for_bill=self.new_bill).count(), 3
+        )
+        self.old_bill.refresh_from_db()
+        self.new_bill.refresh_from_db()
+        self.assertEqual(self.old_bill.current_balance, Decimal("1010.00"))
+        self.assertEqual(self.new_bill.current_balance, Decimal("970.00"))
+
+        output = LinkMerchantToBill(
+            merchant=self.merchant, bill=self.new_bill
+        ).process()
+        self.assertEqual(output["transactions"], 0)
+        self.new_bill.refresh_from_db()
+        self.assertEqual(self.new_bill.current_balance, Decimal("970.00"))
+
+
+class HistoryRollupTests(TestCase):
+    """Tests for the pre-aggregated history series."""
+
+    def test_rollup_tracks_last_min_and_max(self) -> None:
+        """Every saved history row is folded into the rollups."""
+        organisation = Organisation.objects.create(name="Bank", url="https://bank")
+        bill = Bill.objects.create(
+            name="Card",
+            description="Card",
+            organisation=organisation,
+            bill_type=BillType.objects.create(name="Credit Card"),
+            paid_from=PaidFrom.objects.create(name="Pot"),
+            current_balance=Decimal("200.00"),
+        )
+        for balance in ("350.00", "120.00"):
+            bill.current_balance = Decimal(balance)
+            bill.save()
+        rollup = BillHistoryRollup.objects.get(bill=bill, resolution="month")
+        self.assertEqual(rollup.last_value, Decimal("120.00"))
+        self.assertEqual(rollup.min_value, Decimal("120.00"))
+        self.assertEqual(rollup.max_value, Decimal("350.00"))
+
+    def test_downsample_keeps_extremes(self) -> None:
+        """Downsampling keeps the end points and a spike in the series."""
+        points = [(float(x), 10.0 if x == 500 else 0.0) for x in range(1000)]
+        keep = downsample(points, threshold=50)
+        self.assertEqual(len(keep), 50)
+        self.assertEqual(keep[0], 0)
+        self.assertEqual(keep[-1], 999)
+        self.assertIn(500, keep)
+
+
+class QueryPlanTests(TestCase):
+    """Tests that the finance time series queries are served by indexes."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Create a large set of history and transactions."""
+        organisation = Organisation.objects.create(name="Bank", url="https://bank")
+        bill_type = BillType.objects.create(name="Loan")
+        paid_from = PaidFrom.objects.create(name="Pot")
+        Bill.objects.bulk_create(
+            Bill(
+                name=f"Bill {index}",
+                description="Bill",
+                organisation=organisation,
+                bill_type=bill_type,
+                paid_from=paid_from,
+            )
+            for index in range(40)
+        )
+        Investments.objects.bulk_create(
+            Investments(
+                organisation=organisation,
+                description="Fund",
+                current_value=Decimal(100),
+                date_purchased=date(2020, 1, 1),
+            )
+            for _ in range(40)
+        )
+        bill_ids = list(Bill.objects.values_list("pk", flat=True))
+        investment_ids = list(Investments.objects.values_list("pk", flat=True))
+        BillHistory.objects.bulk_create(
+            BillHistory(bill_id=bill_ids[index % 40], current_balance=Decimal(index))
+            for index in range(20000)
+        )
+        InvestmentValue.objects.bulk_create(
+            InvestmentValue(investment_id=investment_ids[index % 40], value=index)
+            for index in range(20000)
+        )
+        BillHistoryRollup.objects.bulk_create(
+            BillHistoryRollup(
+                bill_id=bill_ids[index % 40],
+                resolution="day",
+                period_start=date(2020, 1, 1) + timedelta(days=index // 40),
+                last_date=date(2020, 1, 1) + timedelta(days=index // 40),
+                last_value=index,
+                min_value=index,
+                max_value=index,
+            )
+            for index in range(20000)
+        )
+        MonzoMerchant.objects.bulk_create(
+            MonzoMerchant(merchant_id=f"merch_{index}", name="Shop")
+            for index in range(200)
+        )
+        MonzoTransaction.objects.bulk_create(
+            MonzoTransaction(
+                transaction_id=f"tx_{index}",
+                currency="GBP",
+                value=-index,
+                created=datetime(2020, 1, 1, tzinfo=timezone.utc)
+                + timedelta(hours=index),
+                description="Shop",
+                merchant_id=f"merch_{index % 200}",
+            )
+            for index in range(20000)
+        )
+        with connection.cursor() as cursor:
+            if connection.vendor == "mysql":
+                cursor.execute(
+                    "ANALYZE TABLE finance_billhistory, finance_investmentvalue, "
+                    "finance_billhistoryrollup, finance_monzotransaction"
+                )
+            else:
+                cursor.execute("ANALYZE")
+        cls.bill_id = bill_ids[0]
+        cls.investment_id = investment_ids[0]
+
+    def assertUsesIndex(self, queryset: QuerySet, index_name: str) -> None:
+        """
+        Assert a query is served by a named index.
+
+        Args:
+            queryset: Query to check
+            index_name: Name of the index expected to serve the query
+        """
+        self.assertIn(index_name, self._checked_plan(queryset))
+
+    def assertUsesUniqueTogether(self, queryset: QuerySet, fields: tuple) -> None:
+        """
+        Assert a query is served by the index of a unique together constraint.
+
+        The index is named by the database rather than the model, so the plan is
+        checked for a lookup on every column of the constraint instead.
+
+        Args:
+            queryset: Query to check
+            fields: Fields of the constraint, in index order
+        """
+        meta = queryset.model._meta
+        self.assertIn(fields, meta.unique_together)
+        columns = [meta.get_field(field).column for field in fields]
+        plan = self._checked_plan(queryset)
+        if connection.vendor == "mysql":
+            self.assertIn(
+                f'"used_key_parts":{json.dumps(columns, separators=(",", ":"))}',
+                re.sub(r"\s", "", plan),
+            )
+        else:
+            lookups = " AND ".join(f"{column}=?" for column in columns[:-1])
+            self.assertRegex(
+                plan, rf"USING INDEX \S+ \({re.escape(lookups)} AND {columns[-1]}\W"
+            )
+
+    def _checked_plan(self, queryset: QuerySet) -> str:
+        """
+        Explain a query, asserting it neither scans the table nor sorts itself.
+
+        Args:
+            queryset: Query to check
+
+        Returns:
+            Query plan
+        """
+        if connection.vendor == "mysql":
+            plan = queryset.explain(format="json")
+            self.assertNotIn('"access_type": "ALL"', plan)
+            self.assertNotIn('"using_filesort": true', plan)
+        else:
+            plan = queryset.explain()
+            self.assertNotRegex(plan, r"(?m)SCAN finance_\w+$")
+            self.assertNotIn("TEMP B-TREE", plan)
+        return plan
+
+    def test_bill_history(self) -> None:
+        """Bill history for a window is read from the bill and date index."""
+        self.assertUsesIndex(
+            BillHistory.objects.filter(bill=self.bill_id, date__gt=date(2020, 1, 1))
+            .order_by("date")
+            .values_list("date", "current_balance"),
+            "billhistory_bill_date_idx",
+        )
+
+    def test_investment_history(self) -> None:
+        """Investment history for a window is read from the investment and date index."""
+        self.assertUsesIndex(
+            InvestmentValue.objects.filter(
+                investment=self.investment_id, date__gt=date(2020, 1, 1)
+            )
+            .order_by("date")
+            .values_list("date", "value"),
+            "investmentvalue_inv_date_idx",
+        )
+
+    def test_history_rollups(self) -> None:
+        """Rollups for a chart are read from the unique index."""
+        self.assertUsesUniqueTogether(
+            BillHistoryRollup.objects.filter(
+                bill=self.bill_id, resolution="day", period_start__gte=date(2020, 6, 1)
+            ).order_by("period_start"),
+            ("bill", "resolution", "period_start"),
+        )
+
+    def test_recent_transactions(self) -> None:
+        """Recent transactions are read from the created index."""
+        self.assertUsesIndex(
+            MonzoTransaction.objects.filter(
+                created__gt=datetime(2022, 1, 1, tzinfo=timezone.utc)
+            ).order_by("-created"),
+            "monzotransaction_created_idx",
+        )
+
+    def test_merchant_transactions(self) -> None:
+        """Transactions for a merchant are read from the merchant index."""
+        self.assertUsesIndex(
+            MonzoTransaction.objects.filter(merchant_id="merch_1").order_by("-created"),
+            "monzotransaction_merch_idx",
+        )
+
+
+class AutomationJobTests(TestCase):
+    """Tests for the automation job queue."""
+
+    def test_duplicate_job_refused(self) -> None:
+        """A second job of the same kind is refused until the first finishes."""
+        job = enqueue(kind="process_interest")
+        with self.assertRaises(JobAlreadyActiveException):
+            enqueue(kind="process_interest")
+        self.assertEqual(run_next(), job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "succeeded")
+        self.assertEqual(job.result["bills"], 0)
+        self.assertIsNotNone(job.duration)
+        self.assertNotEqual(enqueue(kind="process_interest"), job)
+
+    def test_job_errors_recorded(self) -> None:
+        """An exception in a job marks it as failed with the error."""
+        job = enqueue(kind="fetch_transactions")
+        original = JOB_RUNNERS["fetch_transactions"]
+        JOB_RUNNERS["fetch_transactions"] = lambda: 1 / 0
+        try:
+            run_next()
+        finally:
+            JOB_RUNNERS["fetch_transactions"] = original
+        job = AutomationJob.objects.get(pk=job.pk)
+        self.assertEqual(job.status, "failed")
+        self.assertIn("ZeroDivisionError", job.error)
+        self.assertIsNone(job.active_kind)
+
+    def test_automation_view_queues_job(self) -> None:
+        """The automation URL returns straight away with the job id."""
+        response = self.client.get("/finance/monzo/automation/process_interest")
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+        self.assertEqual(
+            self.client.get("/finance/monzo/automation/process_interest").status_code,
+            409,
+        )
+        status = self.client.get(f"/finance/monzo/automation/jobs/{job_id}/").json()
+        self.assertEqual(status["status"], "queued")
+
+
+class TransactionBrowserTests(TestCase):
+    """Tests for paging through stored transactions."""
+
+    def setUp(self) -> None:
+        """Create transactions for two merchants, several sharing a second."""
+        self.client.force_login(User.objects.create_user(username="user"))
+        merchants = [
+            MonzoMerchant.objects.create(merchant_id=f"merch_{index}", name="Shop")
+            for index in range(2)
+        ]
+        MonzoTransaction.objects.bulk_create(
+            MonzoTransaction(
+                transaction_id=f"tx_{index:03d}",
+                currency="GBP",
+                value=-index,
+                created=START.replace(tzinfo=timezone.utc)
+                + timedelta(seconds=index // 4),
+                description="SHOP",
+                merchant=merchants[index % 2],
+                has_receipt=False,
+            )
+            for index in range(120)
+        )
+
+    def test_pages_cover_transactions_once(self) -> None:
+        """Following the older links visits every transaction exactly once."""
+        ids: list[str] = []
+        query = ""
+        while True:
+            with self.assertNumQueries(4):
+                response = self.client.get(f"/finance/monzo/transactions/?{query}")
+            ids.extend(tran.pk for tran in response.context["transaction_list"])
+            query = response.context["next_query"]
+            if not query:
+                break
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), 120)
+
+    def test_filters(self) -> None:
+        """Value and merchant filters narrow the transactions."""
+        response = self.client.get(
+            "/finance/monzo/transactions/merch_1/?min=-20&max=-10"
+        )
+        self.assertEqual(
+            [tran.value for tran in response.context["transaction_list"]],
+            [-19, -17, -15, -13, -11],
+        )
+        self.assertEqual(response.context["next_query"], "")
+
+
+class SpendSummaryTests(TestCase):
+    """Tests for the monthly spend summary."""
+
+    def setUp(self) -> None:
+        """Ingest transactions for three merchants over the last few months."""
+        self.client.force_login(User.objects.create_user(username="user"))
+        self.transactions = [
+            IngestTransaction(
+                transaction_id=f"tx_{index:03d}",
+                currency="GBP",
+                value=-100 * (index % 3 + 1),
+                created=django_timezone.now() - timedelta(days=index * 2),
+                description="SHOP",
+                merchant_id=f"merch_{index % 3}",
+                merchant_name=f"Shop {index % 3}",
+            )
+            for index in range(60)
+        ]
+        TransactionIngest(batch_size=25).ingest(self.transactions)
+
+    def summary(self) -> list[tuple]:
+        """
+        List the summary rows.
+
+        Returns:
+            Summary rows as tuples
+        """
+        return list(
+            MonzoSpendSummary.objects.order_by(
+                "month", "merchant_id", "currency"
+            ).values_list("month", "merchant_id", "for_bill_id", "count", "total")
+        )
+
+    def test_ingest_matches_rebuild(self) -> None:
+        """The incrementally maintained summary matches one rebuilt from scratch."""
+        incremental = self.summary()
+        self.assertEqual(sum(row[3] for row in incremental), 60)
+        call_command("rebuild_spend_summary", stdout=StringIO())
+        self.assertEqual(self.summary(), incremental)
+
+    def test_endpoints_read_summary(self) -> None:
+        """The merchant and trend endpoints total the summary in one query each."""
+        with self.assertNumQueries(4):
+            merchants = self.client.get("/finance/monzo/spend/merchants.json").json()
+        self.assertEqual(
+            [merchant["merchant_id"] for merchant in merchants["data"]],
+            ["merch_2", "merch_1", "merch_0"],
+        )
+        self.assertEqual(merchants["data"][0]["total"], -6000)
+        with self.assertNumQueries(4):
+            trend = self.client.get(
+                "/finance/monzo/spend/trend.json?merchant=merch_0"
+            ).json()
+        self.assertEqual(len(trend["data"]), 12)
+        self.assertEqual(sum(month["total"] for month in trend["data"]), -2000)
+
+    def test_ingest_changes_etag(self) -> None:
+        """Ingesting new transactions changes the ETag of the spend endpoints."""
+        etag = self.client.get("/finance/monzo/spend/trend.json")["ETag"]
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                "/finance/monzo/spend/trend.json", HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        TransactionIngest().ingest(self.transactions)
+        response = self.client.get(
+            "/finance/monzo/spend/trend.json", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+        TransactionIngest().ingest(
+            [replace(self.transactions[0], transaction_id="tx_new")]
+        )
+        response = self.client.get(
+            "/finance/monzo/spend/trend.json", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_link_moves_summary(self) -> None:
+        """Linking a merchant to a bill moves its summary rows to the bill."""
+        bill = Bill.objects.create(
+            name="Loan",
+            description="Loan",
+            organisation=Organisation.objects.create(name="Bank", url="https://bank"),
+            bill_type=BillType.objects.create(name="Utility"),
+            paid_from=PaidFrom.objects.create(name="Main Balance"),
+        )
+        merchant = MonzoMerchant.objects.get(pk="merch_1")
+        LinkMerchantToBill(merchant=merchant, bill=bill).process()
+        self.assertEqual(
+            MonzoSpendSummary.objects.filter(for_bill=bill).aggregate(
+                total=Sum("total")
+            )["total"],
+            -4000,
+        )
+
+
+class InvestmentsViewTests(TestCase):
+    """Tests for the investments list."""
+
+    def setUp(self) -> None:
+        """Log in and create two organisations."""
+        self.client.force_login(User.objects.create_user(username="user"))
+        self.organisations = [
+            Organisation.objects.create(name=name, url="https://bank")
+            for name in ("Bank A", "Bank B")
+        ]
+
+    def add_investments(self, count: int) -> None:
+        """
+        Create investments spread across the organisations.
+
+        Args:
+            count: Number of investments to create
+        """
+        for index in range(count):
+            Investments.objects.create(
+                organisation=self.organisations[index % 2],
+                description="Fund",
+                current_value=Decimal("10.00"),
+                date_purchased=date(2024, 1, 1),
+            )
+
+    def test_query_count_constant(self) -> None:
+        """The number of queries does not grow with the number of investments."""
+        self.add_investments(count=2)
+        with self.assertNumQueries(4):
+            self.client.get("/finance/investments/")
+        self.add_investments(count=20)
+        with self.assertNumQueries(4):
+            response = self.client.get("/finance/investments/")
+        self.assertEqual(response.context["total"], Decimal("220.00"))
+        self.assertEqual(
+            [
+                (row["organisation__name"], row["total"])
+                for row in response.context["organisation_totals"]
+            ],
+            [("Bank A", Decimal("110.00")), ("Bank B", Decimal("110.00"))],
+        )
+
+    def test_organisations_sharing_a_name(self) -> None:
+        """Organisations with the same name are totalled separately."""
+        self.organisations.append(
+            Organisation.objects.create(name="Bank A", url="https://other-bank")
+        )
+        for organisation, value in zip(self.organisations, ("1.00", "2.00", "4.00")):
+            Investments.objects.create(
+                organisation=organisation,
+                description="Fund",
+                current_value=Decimal(value),
+                date_purchased=date(2024, 1, 1),
+            )
+        response = self.client.get("/finance/investments/")
+        self.assertEqual(response.context["total"], Decimal("7.00"))
+        self.assertEqual(
+            [
+                (row["organisation__name"], row["total"])
+                for row in response.context["organisation_totals"]
+            ],
+            [
+                ("Bank A", Decimal("1.00")),
+                ("Bank A", Decimal("4.00")),
+                ("Bank B", Decimal("2.00")),
+            ],
+        )
+
+    def test_portfolio_history_forward_fills(self) -> None:
+        """Each day carries forward the last value of every investment."""
+        investments = [
+            Investments.objects.create(
+                organisation=self.organisations[index // 2],
+                description="Fund",
+                current_value=Decimal("0.00"),
+                date_purchased=date(2023, 1, 1),
+            )
+            for index in range(3)
+        ]
+        for investment, day, value in [
+            (0, date(2023, 11, 1), "80.00"),
+            (0, date(2023, 12, 1), "100.00"),
+            (0, date(2024, 1, 3), "150.00"),
+            (1, date(2024, 1, 2), "50.00"),
+            (2, date(2024, 1, 4), "10.00"),
+            (2, date(2024, 1, 6), "20.00"),
+        ]:
+            InvestmentValue.objects.filter(
+                pk=InvestmentValue.objects.create(
+                    investment=investments[investment], value=Decimal(value)
+                ).pk
+            ).update(date=day)
+        with self.assertNumQueries(5):
+            response = self.client.get(
+                "/finance/investments/portfolio.json?start=2024-01-01&end=2024-01-05"
+            )
+            data = json.loads(b"".join(response.streaming_content))["data"]
+        self.assertEqual(
+            [Decimal(day["total"]) for day in data],
+            [Decimal(value) for value in ("100", "150", "200", "210", "210")],
+        )
+        self.assertEqual(
+            {name: Decimal(value) for name, value in data[-1]["organisations"].items()},
+            {"Bank A": Decimal("200"), "Bank B": Decimal("10")},
+        )
+
+
+class StatementImportTests(TestCase):
+    """Tests for importing bank statements."""
+
+    csv_statement = (
+        "Transaction ID,Date,Time,Name,Amount,Currency,Description\n"
+        "tx_0001,05/01/2024,09:30:00,Cafe,-3.20,GBP,COFFEE\n"
+        ",05/01/2024,12:00:00,Cafe,-3.20,GBP,COFFEE\n"
+        ",05/01/2024,12:00:00,Cafe,-3.20,GBP,COFFEE\n"
+        ',06/01/2024,,Employer,"1,500.00",GBP,SALARY\n'
+    )
+
+    ofx_statement = (
+        "OFXHEADER:100\n"
+        "<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><CURDEF>EUR\n"
+        "<BANKTRANLIST>\n"
+        "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240105120000[+1:CET]"
+        "<TRNAMT>-12.50<FITID>A1<NAME>Shop &amp; Co</STMTTRN>\n"
+        "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240106<TRNAMT>100<FITID>A2"
+        "<MEMO>Refund</STMTTRN>\n"
+        "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n"
+    )
+
+    def test_csv_reimport_skips_duplicates(self) -> None:
+        """Importing the same statement twice stores each row once."""
+        ingest = import_statement(
+            lines=StringIO(self.csv_statement), statement_format="csv"
+        )
+        self.assertEqual(ingest.inserted_count, 4)
+        self.assertTrue(MonzoTransaction.objects.filter(pk="tx_0001").exists())
+        self.assertEqual(
+            MonzoTransaction.objects.filter(description="SALARY").get().value, 150000
+        )
+        ingest = import_statement(
+            lines=StringIO(self.csv_statement), statement_format="csv"
+        )
+        self.assertEqual(ingest.inserted_count, 0)
+        self.assertEqual(ingest.existing_count, 4)
+
+    def test_ofx(self) -> None:
+        """OFX transactions are read with their currency, offset and names."""
+        transactions = list(parse_ofx(StringIO(self.ofx_statement)))
+        self.assertEqual([tran.value for tran in transactions], [-1250, 10000])
+        self.assertEqual(transactions[0].merchant_name, "Shop & Co")
+        self.assertEqual(transactions[0].currency, "EUR")
+        self.assertEqual(
+            transactions[0].created, datetime(2024, 1, 5, 11, tzinfo=timezone.utc)
+        )
+        self.assertEqual(transactions[1].description, "Refund")
+
+    def test_upload(self) -> None:
+        """A statement uploaded through the view is imported."""
+        self.client.force_login(User.objects.create_user(username="user"))
+        response = self.client.post(
+            "/finance/monzo/transactions/import/",
+            {
+                "statement": SimpleUploadedFile(
+                    "statement.ofx", self.ofx_statement.encode()
+                )
+            },
+        )
+        self.assertEqual(
+            response.context["success_message"],
+            "Imported 2 transactions, 0 were already stored.",
+        )
+        self.assertEqual(MonzoTransaction.objects.count(), 2)
+
+    def test_malformed_upload(self) -> None:
+        """A row the CSV reader cannot split is reported with its line."""
+        self.client.force_login(User.objects.create_user(username="user"))
+        statement = self.csv_statement + f',07/01/2024,,Shop,-1.00,GBP,{"x" * 200000}\n'
+        response = self.client.post(
+            "/finance/monzo/transactions/import/",
+            {"statement": SimpleUploadedFile("statement.csv", statement.encode())},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context["error"],
+            "Unable to import the statement. Line 6: field larger than field limit "
+            "(131072)",
+        )
+        self.assertFalse(MonzoTransaction.objects.exists())
+
+
+class PaymentsViewTests(TestCase):
+    """Tests for the payments list."""
+
+    def setUp(self) -> None:
+        """Create bills paid from a pot and the main balance."""
+        self.client.force_login(User.objects.create_user(username="user"))
+        organisation = Organisation.objects.create(name="Bank", url="https://bank")
+        bill_type = BillType.objects.create(name="Utility")
+        pot = PaidFrom.objects.create(name="Pot")
+        main = PaidFrom.objects.create(name="Main Balance")
+        for index, (start, end) in enumerate(
+            [
+                (None, None),
+                ("2024-02-10", None),
+                ("2024-05-01", None),
+                (None, "2024-02-01"),
+            ]
+        ):
+            Bill.objects.create(
+                name=f"Bill {index}",
+                description="Bill",
+                organisation=organisation,
+                bill_type=bill_type,
+                paid_from=pot if index % 2 else main,
+                monthly_payments=Decimal(10 * (index + 1)),
+                start_date=start and f"{start}T00:00:00Z",
+                last_payment=end and f"{end}T00:00:00Z",
+            )
+
+    def test_totals_for_month(self) -> None:
+        """Only bills active in the month are listed and totalled."""
+        with self.assertNumQueries(4):
+            response = self.client.get("/finance/payments/?month=2024-03")
+        self.assertEqual(
+            [bill.name for bill in response.context["payment_list"]],
+            ["Bill 0", "Bill 1"],
+        )
+        self.assertEqual(response.context["monthly_total"], Decimal(30))
+        self.assertEqual(response.context["from_pot_total"], Decimal(20))
+        self.assertEqual(response.context["from_balance_total"], Decimal(10))
+
+
+class DebtProjectionTests(TestCase):
+    """Tests for the debt payoff projection."""
+
+    def setUp(self) -> None:
+        """Clear projections cached by other tests at the same change counts."""
+        cache.clear()
+
+    def test_interest_free_debt(self) -> None:
+        """A debt with no interest is cleared after balance / payment months."""
+        projection = DebtProjection(
+            [Debt(pk=1, name="Loan", balance=120_000, apr=0.0, payment=10_000)]
+        ).project()
+        self.assertEqual(projection["debts"][0]["payoff_months"], 12)
+        self.assertEqual(projection["total_interest"], Decimal(0))
+
+    def test_avalanche_saves_interest(self) -> None:
+        """Targeting the highest APR pays less interest than spreading the overpayment."""
+        projection = DebtProjection(
+            [
+                Debt(pk=1, name="Card", balance=300_000, apr=29.9, payment=9_000),
+                Debt(pk=2, name="Loan", balance=500_000, apr=4.9, payment=15_000),
+            ]
+        )
+        none = projection.project(overpayment=20_000, strategy="none")
+        avalanche = projection.project(overpayment=20_000, strategy="avalanche")
+        self.assertLess(avalanche["total_interest"], none["total_interest"])
+        self.assertIsNotNone(avalanche["debt_free_date"])
+
+    def test_cache_invalidated_on_bill_save(self) -> None:
+        """Saving a bill replaces the cached projection."""
+        bill = Bill.objects.create(
+            name="Loan",
+            description="Loan",
+            organisation=Organisation.objects.create(name="Bank", url="https://bank"),
+            bill_type=BillType.objects.create(name="Loan"),
+            paid_from=PaidFrom.objects.create(name="Pot"),
+            current_balance=Decimal("1000.00"),
+            monthly_payments=Decimal("100.00"),
+        )
+        self.assertEqual(cached_projection()["debts"][0]["payoff_months"], 10)
+        bill.current_balance = Decimal("500.00")
+        bill.save()
+        self.assertEqual(cached_projection()["debts"][0]["payoff_months"], 5)
+
+    def test_cache_invalidated_by_interest(self) -> None:
+        """Interest written in bulk replaces the cached projection."""
+        Bill.objects.create(
+            name="Loan",
+            description="Loan",
+            organisation=Organisation.objects.create(name="Bank", url="https://bank"),
+            bill_type=BillType.objects.create(name="Loan"),
+            paid_from=PaidFrom.objects.create(name="Pot"),
+            current_balance=Decimal("1000.00"),
+            monthly_payments=Decimal("100.00"),
+            apr=Decimal("19.900"),
+        )
+        before = cached_projection()["debts"][0]["total_paid"]
+        ProcessInterest().process(when=date(2024, 3, 5))
+        self.assertGreater(cached_projection()["debts"][0]["total_paid"], before)
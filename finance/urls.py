@@ -11,14 +11,20 @@ from finance.views import (
     MonzoTransactionsView,
     MonzoTransactionView,
     PaymentsView,
+    StatementImportView,
+    automation_job,
     bill,
     bill_delete,
     bill_history,
+    debt_projection,
     investment,
     investment_add,
     investment_delete,
     investment_history,
     investment_output_form,
+    portfolio_history,
+    spend_merchants,
+    spend_trend,
 )
 
 app_name = "finance"
@@ -27,6 +33,7 @@ urlpatterns = [
     path("investments/", InvestmentsView.as_view(), name="investments"),
     path("investments/form", investment_output_form, name="investment_output_form"),
     path("investments/add", investment_add, name="investment_add"),
+    path("investments/portfolio.json", portfolio_history, name="portfolio_history"),
     path("investments/<int:pk>/", investment, name="investment"),
     path("investments/<int:pk>/delete", investment_delete, name="investments_delete"),
     path(
@@ -45,17 +52,30 @@ urlpatterns = [
         MonzoAutomationProcessInterestView.as_view(),
         name="monzo_automation",
     ),
+    path(
+        "monzo/automation/jobs/<int:pk>/",
+        automation_job,
+        name="monzo_automation_job",
+    ),
     path(
         "monzo/transactions/",
         MonzoTransactionsView.as_view(),
         name="monzo_transactions",
     ),
+    path(
+        "monzo/transactions/import/",
+        StatementImportView.as_view(),
+        name="statement_import",
+    ),
     path(
         "monzo/transactions/<str:merchant_id>/",
         MonzoTransactionView.as_view(),
         name="monzo_transaction",
     ),
+    path("monzo/spend/merchants.json", spend_merchants, name="spend_merchants"),
+    path("monzo/spend/trend.json", spend_trend, name="spend_trend"),
     path("payments/", PaymentsView.as_view(), name="payments"),
+    path("payments/projection.json", debt_projection, name="debt_projection"),
     path("payments/<int:pk>/", bill, name="bill"),
     path("payments/<int:pk>/delete", bill_delete, name="bill_delete"),
     path("payments/<int:pk>/<str:period>.json", bill_history, name="bill_json"),
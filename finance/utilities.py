@@ -1,15 +1,25 @@
 """Collection of classes and functions tp help normal activities."""
 
-from datetime import datetime, timedelta
+from datetime import datetime
+from time import time
 from typing import Optional, Union
 
+from django.db import transaction
+from django.db.models import F
+from monzo.authentication import Authentication
 from monzo.handlers.storage import Storage
 
 from finance.models import Monzo
 
 
 class DjangoHandler(Storage):
-    """Class that will store credentials in the django database."""
+    """
+    Class that will store credentials in the django database.
+
+    The credential row is cached per process and reused for as long as its version
+    matches the stored one, so a token stored by another worker is picked up on
+    the next read.
+    """
 
     __instance = None
     _credentials_record = None
@@ -50,16 +60,17 @@ class DjangoHandler(Storage):
             client_id: Client ID
             client_secret: Client secret
         """
-        self._fetch_monzo_credential_object()
-        if not self._credentials_record:
-            return
-        self._credentials_record.access_token = None
-        self._credentials_record.client_id = client_id
-        self._credentials_record.client_secret = client_secret
-        self._credentials_record.expiry = None
-        self._credentials_record.refresh_token = None
-        self._credentials_record.last_fetched_datetime = None
-        self._credentials_record.save()
+        with transaction.atomic():
+            record = self._lock_monzo_credential_object()
+            record.access_token = None
+            record.client_id = client_id
+            record.client_secret = client_secret
+            record.expiry = None
+            record.refresh_token = None
+            record.last_fetched_datetime = None
+            record.version += 1
+            record.save()
+        self._credentials_record = record
 
     def store(
         self,
@@ -79,15 +90,16 @@ class DjangoHandler(Storage):
             expiry: Access token expiry as a unix timestamp
             refresh_token: Refresh token that can be used to renew the access token
         """
-        self._fetch_monzo_credential_object()
-        if not self._credentials_record:
-            self._credentials_record = Monzo()
-        self._credentials_record.access_token = access_token
-        self._credentials_record.client_id = client_id
-        self._credentials_record.client_secret = client_secret
-        self._credentials_record.expiry = expiry
-        self._credentials_record.refresh_token = refresh_token
-        self._credentials_record.save()
+        with transaction.atomic():
+            record = self._lock_monzo_credential_object()
+            record.access_token = access_token
+            record.client_id = client_id
+            record.client_secret = client_secret
+            record.expiry = expiry
+            record.refresh_token = refresh_token
+            record.version += 1
+            record.save()
+        self._credentials_record = record
 
     @property
     def configured(self) -> bool:
@@ -153,22 +165,67 @@ class DjangoHandler(Storage):
         Args:
             when: Date and time of the last fetched monzo transaction
         """
-        # Increment when so we don't get the previous record again.
-        if not self._credentials_record:
-            self._credentials_record = Monzo()
-        when += timedelta(seconds=1)
+        # Transactions at exactly this time are fetched again on the next run, the
+        # ingest skips them so a page ending part way through a second is safe.
+        # Only the checkpoint is written so tokens refreshed by another worker since
+        # this process last read them are not overwritten.
+        self._fetch_monzo_credential_object()
         self._credentials_record.last_fetched_datetime = when
-        self._credentials_record.save()
+        if not self._credentials_record.pk:
+            self._credentials_record.save()
+            return
+        Monzo.objects.filter(pk=self._credentials_record.pk).update(
+            last_fetched_datetime=when, version=F("version") + 1
+        )
 
     def _fetch_monzo_credential_object(self) -> None:
-        """Fetch the monzo credential object from the database."""
-        if self._credentials_record:
-            return
-        credentials = Monzo.objects.all()
-        if len(credentials):
-            self._credentials_record = credentials[0]
-            return
-        self._credentials_record = Monzo()
+        """Fetch the monzo credential object from the database if it has changed."""
+        if self._credentials_record and self._credentials_record.pk:
+            version = (
+                Monzo.objects.filter(pk=self._credentials_record.pk)
+                .values_list("version", flat=True)
+                .first()
+            )
+            if version == self._credentials_record.version:
+                return
+        self._credentials_record = Monzo.objects.order_by("pk").first() or Monzo()
+
+    @staticmethod
+    def _lock_monzo_credential_object() -> Monzo:
+        """
+        Fetch the monzo credential object locked until the transaction ends.
+
+        Returns:
+            Locked credential object, or a new one if none are stored
+        """
+        return Monzo.objects.select_for_update().order_by("pk").first() or Monzo()
+
+
+class LockedAuthentication(Authentication):
+    """
+    Authentication that serialises access token refreshes between processes.
+
+    The credential row is locked while refreshing so only one worker calls Monzo,
+    workers that were waiting on the lock reuse the token it stored.
+    """
+
+    __slots__: list[str] = []
+
+    def refresh_access(self) -> None:
+        """Fetch a new access token unless another worker already has."""
+        with transaction.atomic():
+            record = Monzo.objects.select_for_update().order_by("pk").first()
+            if (
+                record
+                and record.access_token
+                and record.access_token != self._access_token
+                and (record.expiry or 0) > time()
+            ):
+                self._access_token = str(record.access_token)
+                self._access_token_expiry = record.expiry
+                self._refresh_token = str(record.refresh_token or "")
+                return
+            super().refresh_access()
 
 
 def create_redirect_url(request) -> str:
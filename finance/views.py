@@ -1,25 +1,48 @@
 """Views for the Finance application."""
 
-from datetime import datetime, timedelta
-from typing import Any, Union
-
-from django.http import HttpResponse, HttpResponseNotFound, JsonResponse
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import TextIOWrapper
+from itertools import chain
+from typing import Any, Optional, Union
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import OuterRef, Q, QuerySet, Subquery, Sum
+from django.http import (
+    HttpResponse,
+    HttpResponseNotFound,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import redirect, render
+from django.urls import reverse
+from django.utils import timezone
 from django.views import generic
 from monzo.authentication import Authentication
 from monzo.exceptions import MonzoAuthenticationError, MonzoServerError
 
-from finance.automation import FetchTransactions, ProcessInterest
+from api.etags import versioned_condition
+from finance.automation import LinkMerchantToBill
+from finance.jobs import JobAlreadyActiveException, enqueue, job_details
 from finance.models import (
+    AutomationJob,
     Bill,
-    BillHistory,
+    BillHistoryRollup,
+    BillType,
     Investments,
     InvestmentValue,
+    InvestmentValueRollup,
     MonzoMerchant,
+    MonzoSpendSummary,
     MonzoTransaction,
     Organisation,
+    bills_paid_in_month,
 )
+from finance.projection import STRATEGIES, cached_projection
+from finance.rollups import downsample, forward_fill, period_start
+from finance.statements import StatementException, detect_format, import_statement
 from finance.utilities import DjangoHandler, create_redirect_url
+from intranet.helpers import stream_json_list
 
 
 class FinanceView(generic.ListView):
@@ -28,35 +51,41 @@ class FinanceView(generic.ListView):
     template_name = "finance/bills.html"
     context_object_name = "bill_list"
 
-    def get_queryset(self):
+    def get_queryset(self) -> QuerySet:
         """
         Get investment objects to display in index view.
 
         Return:
-            List of Investment objects
+            QuerySet of Investment objects with their organisations
         """
-        investments = Investments.objects.all().order_by("organisation__name")
-        return list(investments)
+        return Investments.objects.select_related("organisation").order_by(
+            "organisation__name"
+        )
 
 
-def bill_history(
-    request, pk: int, period: str = "year"
+def history_series(
+    request, rollups: QuerySet, period: str
 ) -> Union[HttpResponse, JsonResponse]:
     """
-    View to handle fetching bill history data.
+    Build the chart data for a history series.
+
+    Periods up to a year read the daily rollups, longer periods read the weekly
+    rollups. A points query parameter reduces the series further while keeping
+    its shape.
 
     Args:
         request: Request object
-        pk: primary key for the bill to fetch data for
+        rollups: Rollups for the bill or investment being charted
         period: period to fetch data for
+
     Returns:
-        Json containing data for the given investment and period
+        Json containing data for the given period
     """
     if not request.user.is_authenticated:
         return HttpResponse(status=401)
-    response_list: list[dict[str, Union[str]]] = []
     days = 0
     weeks = 0
+    resolution = "day"
     if period == "day":
         days = 1
     elif period == "week":
@@ -67,19 +96,33 @@ def bill_history(
         days = 365
     else:
         days = 1826
+        resolution = "week"
     time_delta = timedelta(days=days, weeks=weeks)
-    lookup_time = datetime.now() - time_delta
-    bill_values = BillHistory.objects.filter(date__gt=lookup_time, bill=pk).order_by(
-        "date"
+    first_day = (datetime.now() - time_delta).date() + timedelta(days=1)
+    values = list(
+        rollups.filter(
+            resolution=resolution,
+            period_start__gte=period_start(first_day, resolution),
+        )
+        .order_by("period_start")
+        .values_list("period_start", "last_value", "min_value", "max_value")
     )
-    if len(bill_values) > 0:
-        response_list.extend(
-            {
-                "date": bill_value.date.strftime("%Y-%m-%d"),
-                "value": bill_value.current_balance,
-            }
-            for bill_value in bill_values
+    points = request.GET.get("points", "")
+    if points.isdigit():
+        keep = downsample(
+            [(day.toordinal(), float(value)) for day, value, _, _ in values],
+            threshold=int(points),
         )
+        values = [values[index] for index in keep]
+    response_list: list[dict[str, Union[str, Decimal]]] = [
+        {
+            "date": day.strftime("%Y-%m-%d"),
+            "value": last_value,
+            "min": min_value,
+            "max": max_value,
+        }
+        for day, last_value, min_value, max_value in values
+    ]
     response = {
         "status": "success",
         "record_count": len(response_list),
@@ -88,6 +131,86 @@ def bill_history(
     return JsonResponse(data=response, safe=False)
 
 
+@versioned_condition(InvestmentValue, Investments, Organisation, daily=True)
+def portfolio_history(request) -> Union[HttpResponse, StreamingHttpResponse]:
+    """
+    View to handle the value of the whole portfolio over time.
+
+    Accepts start and end (YYYY-MM-DD, up to ten years apart) query parameters,
+    defaulting to the last year. Each investment's last known value is carried
+    forward so every day has a total and a total per organisation.
+
+    Args:
+        request: Request object
+
+    Returns:
+        Json streamed a day at a time
+    """
+    if not request.user.is_authenticated:
+        return HttpResponse(status=401)
+    try:
+        end = date.fromisoformat(request.GET.get("end", date.today().isoformat()))
+        start = date.fromisoformat(
+            request.GET.get("start", (end - timedelta(days=364)).isoformat())
+        )
+    except ValueError:
+        return JsonResponse({"status": "error", "error": "Invalid date"}, status=400)
+    if not timedelta(0) <= end - start <= timedelta(days=3660):
+        return JsonResponse({"status": "error", "error": "Invalid window"}, status=400)
+    fields = ("investment_id", "investment__organisation__name", "date", "value")
+    # Each investment's last value before the window seeds the forward fill, read
+    # with one lookup per investment rather than its whole earlier history.
+    seed_ids = Investments.objects.annotate(
+        value_id=Subquery(
+            InvestmentValue.objects.filter(investment=OuterRef("pk"), date__lt=start)
+            .order_by("-date", "-pk")
+            .values("pk")[:1]
+        )
+    ).values("value_id")
+    seeds = (
+        InvestmentValue.objects.filter(pk__in=seed_ids)
+        .order_by("date", "pk")
+        .values_list(*fields)
+    )
+    values = (
+        InvestmentValue.objects.filter(date__gte=start, date__lte=end)
+        .order_by("date", "pk")
+        .values_list(*fields)
+        .iterator(chunk_size=2000)
+    )
+    days = (
+        {"date": day.strftime("%Y-%m-%d"), "total": total, "organisations": totals}
+        for day, total, totals in forward_fill(
+            values=chain(seeds, values), start=start, end=end
+        )
+    )
+    return StreamingHttpResponse(
+        stream_json_list(days, record_count=(end - start).days + 1),
+        content_type="application/json",
+    )
+
+
+@versioned_condition(Bill, BillHistoryRollup, daily=True)
+def bill_history(
+    request, pk: int, period: str = "year"
+) -> Union[HttpResponse, JsonResponse]:
+    """
+    View to handle fetching bill history data.
+
+    Args:
+        request: Request object
+        pk: primary key for the bill to fetch data for
+        period: period to fetch data for
+    Returns:
+        Json containing data for the given investment and period
+    """
+    return history_series(
+        request=request,
+        rollups=BillHistoryRollup.objects.filter(bill=pk),
+        period=period,
+    )
+
+
 class InvestmentsView(generic.ListView):
     """View to see a list of Investments."""
 
@@ -102,24 +225,30 @@ class InvestmentsView(generic.ListView):
             Context data ready for output in a template
         """
         context = super().get_context_data(**kwargs)
+        context["organisation_totals"] = list(
+            Investments.objects.values("organisation_id", "organisation__name")
+            .annotate(total=Sum("current_value"))
+            .order_by("organisation__name", "organisation_id")
+        )
         context["total"] = sum(
-            investment_item.current_value
-            for investment_item in context["investment_list"]
+            (row["total"] for row in context["organisation_totals"]), Decimal(0)
         )
 
         return context
 
-    def get_queryset(self):
+    def get_queryset(self) -> QuerySet:
         """
         Get investment objects to display in index view.
 
         Return:
-            List of Investment objects
+            QuerySet of Investment objects with their organisations
         """
-        investments = Investments.objects.all().order_by("organisation__name")
-        return list(investments)
+        return Investments.objects.select_related("organisation").order_by(
+            "organisation__name"
+        )
 
 
+@versioned_condition(Investments, InvestmentValueRollup, daily=True)
 def investment_history(
     request, pk: int, period: str = "year"
 ) -> Union[HttpResponse, JsonResponse]:
@@ -133,40 +262,11 @@ def investment_history(
     Returns:
         Json containing data for the given investment and period
     """
-    if not request.user.is_authenticated:
-        return HttpResponse(status=401)
-    response_list: list[dict[str, Union[str]]] = []
-    days = 0
-    weeks = 0
-    if period == "day":
-        days = 1
-    elif period == "week":
-        weeks = 1
-    elif period == "month":
-        days = 30
-    elif period == "year":
-        days = 365
-    else:
-        days = 1826
-    time_delta = timedelta(days=days, weeks=weeks)
-    lookup_time = datetime.now() - time_delta
-    investment_values = InvestmentValue.objects.filter(
-        date__gt=lookup_time, investment=pk
-    ).order_by("date")
-    if len(investment_values) > 0:
-        response_list.extend(
-            {
-                "date": investment_value.date.strftime("%Y-%m-%d"),
-                "value": investment_value.value,
-            }
-            for investment_value in investment_values
-        )
-    response = {
-        "status": "success",
-        "record_count": len(response_list),
-        "data": response_list,
-    }
-    return JsonResponse(data=response, safe=False)
+    return history_series(
+        request=request,
+        rollups=InvestmentValueRollup.objects.filter(investment=pk),
+        period=period,
+    )
 
 
 class Monzo(generic.TemplateView):
@@ -237,8 +337,35 @@ class Monzo(generic.TemplateView):
         )
 
 
+def enqueue_job(kind: str) -> JsonResponse:
+    """
+    Queue an automation job and describe it.
+
+    Args:
+        kind: Kind of job to queue
+
+    Returns:
+        JSON Response with a 202 code, or 409 if a job of the same kind is active
+    """
+    try:
+        job = enqueue(kind=kind)
+    except JobAlreadyActiveException as exc:
+        return JsonResponse(
+            {"error": str(exc), "job_id": exc.job.pk, "status": exc.job.status},
+            status=409,
+        )
+    return JsonResponse(
+        {
+            "job_id": job.pk,
+            "status": job.status,
+            "status_url": reverse("finance:monzo_automation_job", args=[job.pk]),
+        },
+        status=202,
+    )
+
+
 class MonzoAutomationFetchTransactionsView(generic.TemplateView):
-    """View to trigger Monzo automation to fetch transactions."""
+    """View to queue Monzo automation to fetch transactions."""
 
     template_name = "finance/monzo_automation.html"
 
@@ -250,15 +377,13 @@ class MonzoAutomationFetchTransactionsView(generic.TemplateView):
             request: Request object
 
         Returns:
-            JSON Response
+            JSON Response describing the queued job
         """
-        automation = FetchTransactions()
-
-        return JsonResponse(automation.process())
+        return enqueue_job(kind="fetch_transactions")
 
 
 class MonzoAutomationProcessInterestView(generic.TemplateView):
-    """View to trigger Monzo automation to process interest."""
+    """View to queue Monzo automation to process interest."""
 
     template_name = "finance/monzo_automation.html"
 
@@ -270,14 +395,131 @@ class MonzoAutomationProcessInterestView(generic.TemplateView):
             request: Request object
 
         Returns:
-            JSON Response
+            JSON Response describing the queued job
+        """
+        return enqueue_job(kind="process_interest")
+
+
+def automation_job(request, pk: int) -> Union[HttpResponse, JsonResponse]:
+    """
+    View to handle fetching the status of an automation job.
+
+    Args:
+        request: Request object
+        pk: primary key for the job
+
+    Returns:
+        JSON Response describing the job
+    """
+    try:
+        job = AutomationJob.objects.get(pk=pk)
+    except AutomationJob.DoesNotExist:
+        return HttpResponseNotFound("No such job")
+    return JsonResponse(job_details(job=job))
+
+
+class TransactionBrowserMixin:
+    """Mixin to filter Monzo transactions and page through them newest first."""
+
+    filter_params = ("from", "to", "min", "max", "merchant", "bill")
+    page_size = 50
+
+    def transaction_page(self, transactions: QuerySet) -> dict[str, Any]:
         """
-        automation = ProcessInterest()
+        Filter the transactions and fetch the page after the ?after= cursor.
 
-        return JsonResponse(automation.process())
+        Pages are keyed on (created, transaction_id) so each page is a range scan of
+        the created index however far back it is. Supported filters are from and to
+        (YYYY-MM-DD), min and max (value in pence), merchant (merchant ID) and bill
+        (bill ID), invalid values are ignored.
 
+        Args:
+            transactions: Transactions to browse
 
-class MonzoTransactionsView(generic.TemplateView):
+        Returns:
+            Context containing the page of transactions and the queries for the first and next pages
+        """
+        params = self.request.GET
+        start = self._parse_date(params.get("from", ""))
+        if start:
+            transactions = transactions.filter(created__gte=start)
+        end = self._parse_date(params.get("to", ""))
+        if end:
+            transactions = transactions.filter(created__lt=end + timedelta(days=1))
+        for param, lookup in (("min", "value__gte"), ("max", "value__lte")):
+            value = params.get(param, "")
+            if value.lstrip("-").isdigit():
+                transactions = transactions.filter(**{lookup: int(value)})
+        if params.get("merchant"):
+            transactions = transactions.filter(merchant_id=params["merchant"])
+        if params.get("bill", "").isdigit():
+            transactions = transactions.filter(for_bill_id=int(params["bill"]))
+        after = self._parse_cursor(params.get("after", ""))
+        if after:
+            created, transaction_id = after
+            transactions = transactions.filter(created__lte=created).filter(
+                Q(created__lt=created) | Q(transaction_id__lt=transaction_id)
+            )
+        page = list(
+            transactions.select_related("merchant__for_bill", "for_bill").order_by(
+                "-created", "-transaction_id"
+            )[: self.page_size + 1]
+        )
+        next_query = ""
+        if len(page) > self.page_size:
+            page = page[: self.page_size]
+            query = params.copy()
+            query["after"] = f"{page[-1].created.isoformat()}|{page[-1].transaction_id}"
+            next_query = query.urlencode()
+        first_query = params.copy()
+        first_query.pop("after", None)
+        return {
+            "transaction_list": page,
+            "next_query": next_query,
+            "first_query": first_query.urlencode() if after else None,
+            "filters": {param: params.get(param, "") for param in self.filter_params},
+        }
+
+    @staticmethod
+    def _parse_cursor(cursor: str) -> Optional[tuple[datetime, str]]:
+        """
+        Split a page cursor into the created date/time and transaction ID.
+
+        Args:
+            cursor: Cursor in the form created|transaction_id
+
+        Returns:
+            Created date/time and transaction ID, or None if the cursor is invalid
+        """
+        created, _, transaction_id = cursor.partition("|")
+        try:
+            when = datetime.fromisoformat(created)
+        except ValueError:
+            return None
+        if not transaction_id:
+            return None
+        if timezone.is_naive(when):
+            when = timezone.make_aware(when)
+        return when, transaction_id
+
+    @staticmethod
+    def _parse_date(value: str) -> Optional[datetime]:
+        """
+        Parse a YYYY-MM-DD date into the start of that day.
+
+        Args:
+            value: Date to parse
+
+        Returns:
+            Start of the day, or None if the date is invalid
+        """
+        try:
+            return timezone.make_aware(datetime.strptime(value, "%Y-%m-%d"))
+        except ValueError:
+            return None
+
+
+class MonzoTransactionsView(TransactionBrowserMixin, generic.TemplateView):
     """View to trigger Monzo automation."""
 
     template_name = "finance/monzo_transactions.html"
@@ -292,15 +534,8 @@ class MonzoTransactionsView(generic.TemplateView):
         Returns:
             Rendered request
         """
-        last_30_days = datetime.now() - timedelta(days=30)
-        transactions = (
-            MonzoTransaction.objects.all()
-            .filter(created__gt=last_30_days)
-            .order_by("-created")
-        )
-        bills = Bill.objects.all().order_by("name")
-
-        context = {"transaction_list": transactions, "bills": bills}
+        context = self.transaction_page(transactions=MonzoTransaction.objects.all())
+        context["bills"] = Bill.objects.all().order_by("name")
         return render(
             request=request, template_name=self.template_name, context=context
         )
@@ -314,15 +549,14 @@ class MonzoTransactionsView(generic.TemplateView):
         """
         linked_bill = Bill.objects.get(pk=request.POST["bill"])
         merchant = MonzoMerchant.objects.get(pk=request.POST["merchant"])
-        merchant.for_bill = linked_bill
-        merchant.save()
+        LinkMerchantToBill(merchant=merchant, bill=linked_bill).process()
         context = {"output": linked_bill.name}
         return render(
             request=request, template_name="printed_output.html", context=context
         )
 
 
-class MonzoTransactionView(generic.TemplateView):
+class MonzoTransactionView(TransactionBrowserMixin, generic.TemplateView):
     """View to trigger Monzo automation."""
 
     template_name = "finance/monzo_transaction.html"
@@ -338,11 +572,48 @@ class MonzoTransactionView(generic.TemplateView):
             Rendered request
         """
         merchant_id = kwargs["merchant_id"]
-        transactions = MonzoTransaction.objects.filter(
-            merchant_id__exact=merchant_id
-        ).order_by("-created")
+        context = self.transaction_page(
+            transactions=MonzoTransaction.objects.filter(merchant_id__exact=merchant_id)
+        )
+        context["merchant_id"] = merchant_id
+        return render(
+            request=request, template_name=self.template_name, context=context
+        )
+
+
+class StatementImportView(generic.TemplateView):
+    """View to import transactions from a bank statement."""
 
-        context = {"transaction_list": transactions, "merchant_id": merchant_id}
+    template_name = "finance/statement_import.html"
+
+    def post(self, request, *args, **kwargs) -> HttpResponse:
+        """
+        Process the post request.
+
+        Return:
+            Rendered view
+        """
+        if not request.user.is_authenticated:
+            return HttpResponse(status=401)
+        context = {}
+        statement = request.FILES.get("statement")
+        if not statement:
+            context["error"] = "Please choose a statement to import"
+            return render(
+                request=request, template_name=self.template_name, context=context
+            )
+        try:
+            ingest = import_statement(
+                lines=TextIOWrapper(statement.file, encoding="utf-8-sig", newline=""),
+                statement_format=detect_format(statement.name),
+            )
+        except (StatementException, UnicodeDecodeError) as exc:
+            context["error"] = f"Unable to import the statement. {exc}"
+        else:
+            context["success_message"] = (
+                f"Imported {ingest.inserted_count} transactions, "
+                f"{ingest.existing_count} were already stored."
+            )
         return render(
             request=request, template_name=self.template_name, context=context
         )
@@ -362,56 +633,198 @@ class PaymentsView(generic.ListView):
             Context data ready for output in a template
         """
         context = super().get_context_data(**kwargs)
-        context["monthly_total"] = sum(
-            payment.monthly_payments for payment in context["payment_list"]
-        )
-        context["from_pot_total"] = sum(
-            bill_item.monthly_payments
-            for bill_item in context["payment_list"]
-            if bill_item.paid_from.name == "Pot"
-        )
-        context["from_balance_total"] = sum(
-            bill_item.monthly_payments
-            for bill_item in context["payment_list"]
-            if bill_item.paid_from.name == "Main Balance"
+        context.update(
+            self.object_list.aggregate(
+                monthly_total=Sum("monthly_payments", default=0),
+                from_pot_total=Sum(
+                    "monthly_payments", filter=Q(paid_from__name="Pot"), default=0
+                ),
+                from_balance_total=Sum(
+                    "monthly_payments",
+                    filter=Q(paid_from__name="Main Balance"),
+                    default=0,
+                ),
+            )
         )
+        context["month"] = self._month_start().strftime("%Y-%m")
 
         return context
 
-    def get_queryset(self):
+    def get_queryset(self) -> QuerySet:
         """
-        Get investment objects to display in index view.
+        Get the bills being paid in the requested month, defaulting to this month.
+
+        Return:
+            QuerySet of Bill objects
+        """
+        return (
+            bills_paid_in_month(self._month_start())
+            .select_related("paid_from", "bill_type", "organisation")
+            .order_by("due_day")
+        )
+
+    def _month_start(self) -> datetime:
+        """
+        Identify the start of the month requested with ?month=YYYY-MM.
 
         Return:
-            List of Investment objects
-        """
-        current_payments = []
-        payments = Bill.objects.all().order_by("due_day")
-        current_year = datetime.now().year
-        current_month = datetime.now().month
-        for payment in payments:
-            payment_start_year = 1901
-            payment_start_month = 1
-            if payment.start_date:
-                payment_start_year = payment.start_date.year
-                payment_start_month = payment.start_date.month
-            if (
-                payment_start_year > current_year
-                or payment_start_year == current_year
-                and payment_start_month > current_month
-            ):
-                continue
-            if payment.last_payment:
-                payment_end_year = payment.last_payment.year
-                payment_end_month = payment.last_payment.month
-                if (
-                    current_year > payment_end_year
-                    or current_year == payment_end_year
-                    and current_month > payment_end_month
-                ):
-                    continue
-            current_payments.append(payment)
-        return current_payments
+            Start of the requested month, or this month if none or an invalid month was given
+        """
+        try:
+            month = datetime.strptime(self.request.GET.get("month", ""), "%Y-%m")
+        except ValueError:
+            month = datetime.now().replace(
+                day=1, hour=0, minute=0, second=0, microsecond=0
+            )
+        return timezone.make_aware(month)
+
+
+@versioned_condition(Bill, BillType, daily=True)
+def debt_projection(request) -> Union[HttpResponse, JsonResponse]:
+    """
+    View to handle projecting when the debt bills will be paid off.
+
+    Accepts overpayment (pounds per month), strategy (none, snowball or avalanche),
+    months (horizon, up to 50 years) and schedule (1 to include monthly balances)
+    query parameters.
+
+    Args:
+        request: Request object
+
+    Returns:
+        Json containing the projection
+    """
+    if not request.user.is_authenticated:
+        return HttpResponse(status=401)
+    try:
+        overpayment = int(Decimal(request.GET.get("overpayment", "0")) * 100)
+        months = int(request.GET.get("months", "360"))
+    except (ArithmeticError, ValueError):
+        return JsonResponse({"status": "error", "error": "Invalid number"}, status=400)
+    strategy = request.GET.get("strategy", "none")
+    if strategy not in STRATEGIES or overpayment < 0 or not 0 < months <= 600:
+        return JsonResponse(
+            {"status": "error", "error": "Invalid projection"}, status=400
+        )
+    projection = cached_projection(
+        overpayment=overpayment,
+        strategy=strategy,
+        months=months,
+        schedule=request.GET.get("schedule") == "1",
+    )
+    return JsonResponse({"status": "success", "data": projection})
+
+
+def spend_window(request) -> Optional[tuple[date, str]]:
+    """
+    Read the months and currency query parameters used by the spend views.
+
+    Args:
+        request: Request object
+
+    Returns:
+        First month to include and the currency, or None if months is invalid
+    """
+    months = request.GET.get("months", "12")
+    if not months.isdigit() or not 0 < int(months) <= 120:
+        return None
+    first_month = date.today().replace(day=1) - relativedelta(months=int(months) - 1)
+    return first_month, request.GET.get("currency", "GBP")
+
+
+@versioned_condition(MonzoMerchant, MonzoSpendSummary, daily=True)
+def spend_merchants(request) -> Union[HttpResponse, JsonResponse]:
+    """
+    View to handle listing the merchants with the highest spend.
+
+    Accepts months (number of months including this one, up to 10 years), currency
+    and limit (number of merchants, up to 100) query parameters. Only the monthly
+    spend summary is read.
+
+    Args:
+        request: Request object
+
+    Returns:
+        Json containing the merchants ordered by spend
+    """
+    if not request.user.is_authenticated:
+        return HttpResponse(status=401)
+    window = spend_window(request=request)
+    limit = request.GET.get("limit", "10")
+    if not window or not limit.isdigit() or not 0 < int(limit) <= 100:
+        return JsonResponse({"status": "error", "error": "Invalid window"}, status=400)
+    first_month, currency = window
+    merchants = (
+        MonzoSpendSummary.objects.filter(month__gte=first_month, currency=currency)
+        .values("merchant_id", "merchant__name")
+        .annotate(transactions=Sum("count"), spend=Sum("total"))
+        .filter(spend__lt=0)
+        .order_by("spend")[: int(limit)]
+    )
+    return JsonResponse(
+        {
+            "status": "success",
+            "data": [
+                {
+                    "merchant_id": merchant["merchant_id"],
+                    "name": merchant["merchant__name"],
+                    "count": merchant["transactions"],
+                    "total": merchant["spend"],
+                }
+                for merchant in merchants
+            ],
+        }
+    )
+
+
+@versioned_condition(MonzoMerchant, MonzoSpendSummary, daily=True)
+def spend_trend(request) -> Union[HttpResponse, JsonResponse]:
+    """
+    View to handle the monthly spend trend.
+
+    Accepts months (number of months including this one, up to 10 years), currency,
+    merchant (merchant ID) and bill (bill ID) query parameters. Months without any
+    transactions are included with a zero total. Only the monthly spend summary is
+    read.
+
+    Args:
+        request: Request object
+
+    Returns:
+        Json containing the count and total of transactions for each month
+    """
+    if not request.user.is_authenticated:
+        return HttpResponse(status=401)
+    window = spend_window(request=request)
+    if not window:
+        return JsonResponse({"status": "error", "error": "Invalid window"}, status=400)
+    first_month, currency = window
+    summaries = MonzoSpendSummary.objects.filter(
+        month__gte=first_month, currency=currency
+    )
+    if request.GET.get("merchant"):
+        summaries = summaries.filter(merchant_id=request.GET["merchant"])
+    if request.GET.get("bill", "").isdigit():
+        summaries = summaries.filter(for_bill_id=int(request.GET["bill"]))
+    totals = {
+        row["month"]: row
+        for row in summaries.values("month").annotate(
+            transactions=Sum("count"), spend=Sum("total")
+        )
+    }
+    trend = []
+    month = first_month
+    while month <= date.today():
+        row = totals.get(month, {})
+        trend.append(
+            {
+                "month": month.strftime("%Y-%m"),
+                "count": row.get("transactions", 0),
+                "total": row.get("spend", 0),
+            }
+        )
+        month += relativedelta(months=1)
+    return JsonResponse({"status": "success", "data": trend})
 
 
 def bill(request, pk: int) -> HttpResponse:
@@ -1,6 +1,115 @@
 """Helper methods and classes for Intranet."""
 
+import csv
+import json
+from datetime import date, time
+from itertools import islice
+from typing import Any, Iterable, Iterator
+
 from django.core.files.storage import FileSystemStorage
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+def stream_json_list(items: Iterable[Any], **extra: Any) -> Iterator[str]:
+    """
+    Encode a list as JSON a chunk at a time, ready for a StreamingHttpResponse.
+
+    Args:
+        items: Items for the data list
+        extra: Further keys to add to the response before the data
+
+    Returns:
+        Iterator of JSON chunks forming {"status": "success", ..., "data": [...]}
+    """
+    header = json.dumps({"status": "success", **extra}, cls=DjangoJSONEncoder)
+    yield f'{header[:-1]}, "data": ['
+    separator = ""
+    for item in items:
+        yield separator + json.dumps(item, cls=DjangoJSONEncoder)
+        separator = ", "
+    yield "]}"
+
+
+def stream_ndjson(
+    headers: list[str], rows: Iterable[tuple], batch_size: int = 500
+) -> Iterator[str]:
+    """
+    Encode rows as newline delimited JSON objects, ready for a StreamingHttpResponse.
+
+    Args:
+        headers: Key for each column of a row
+        rows: Rows of values
+        batch_size: Number of rows joined into each chunk
+
+    Returns:
+        Iterator of chunks holding a JSON object per line
+    """
+    encoder = DjangoJSONEncoder()
+    lines = (encoder.encode(dict(zip(headers, row))) + "\n" for row in rows)
+    return _batched(lines, batch_size)
+
+
+def stream_csv(
+    headers: list[str], rows: Iterable[tuple], batch_size: int = 500
+) -> Iterator[str]:
+    """
+    Encode rows as CSV with a header line, ready for a StreamingHttpResponse.
+
+    Dates and times are written as they are in JSON.
+
+    Args:
+        headers: Column names for the header line
+        rows: Rows of values
+        batch_size: Number of rows joined into each chunk
+
+    Returns:
+        Iterator of chunks of CSV lines
+    """
+    encoder = DjangoJSONEncoder()
+    writer = csv.writer(_Echo())
+
+    def lines() -> Iterator[str]:
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow(
+                [
+                    encoder.default(value) if isinstance(value, (date, time)) else value
+                    for value in row
+                ]
+            )
+
+    return _batched(lines(), batch_size)
+
+
+def _batched(lines: Iterator[str], batch_size: int) -> Iterator[str]:
+    """
+    Join lines into larger chunks so each write carries many rows.
+
+    Args:
+        lines: Lines to join
+        batch_size: Number of lines per chunk
+
+    Returns:
+        Iterator of chunks
+    """
+    while chunk := "".join(islice(lines, batch_size)):
+        yield chunk
+
+
+class _Echo:
+    """Class standing in for a file so csv.writer returns each line it writes."""
+
+    def write(self, value: str) -> str:
+        """
+        Return the value rather than storing it.
+
+        Args:
+            value: Line written by csv.writer
+
+        Returns:
+            The line
+        """
+        return value
 
 
 class OverwriteStorageName(FileSystemStorage):
@@ -54,6 +54,11 @@ if int(os.getenv("DJANGO_DEBUG", 0)) == 1:
             "NAME": BASE_DIR / "db.sqlite3",
         }
     }
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
 else:
     DATABASES = {
         "default": {
@@ -65,6 +70,16 @@ else:
             "PASSWORD": str(os.getenv("DATABASE_PASSWORD")),
         },
     }
+    # Shared by every worker, the table is created by createcachetable. Each API
+    # response is an entry, so the default limit of 300 entries would be culled
+    # constantly.
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "intranet_cache",
+            "OPTIONS": {"MAX_ENTRIES": 20_000},
+        }
+    }
 
 # Application definition
 
@@ -131,7 +146,7 @@ OAUTH2_PROVIDER = {
     },
 }
 
-REST_FRAMEWORK: dict[str, Union[set[str], list[str]]] = {
+REST_FRAMEWORK: dict[str, Union[int, str, set[str], list[str]]] = {
     # Use Django's standard `django.contrib.auth` permissions,
     # or allow read-only access for unauthenticated users.
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
@@ -139,6 +154,8 @@ REST_FRAMEWORK: dict[str, Union[set[str], list[str]]] = {
         "oauth2_provider.contrib.rest_framework.OAuth2Authentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.StableCursorPagination",
+    "PAGE_SIZE": 100,
 }
 
 # Database
@@ -2,8 +2,41 @@
 
 from django.views import generic
 
+from api.dashboard import build_dashboard, server_timing
+
 
 class IndexView(generic.TemplateView):
     """View implementation for the main index page."""
 
     template_name = "index.html"
+
+    def get_context_data(self, **kwargs):
+        """
+        Add the dashboard for signed in users.
+
+        Args:
+            kwargs: Keyword view arguments
+
+        Returns:
+            Template context
+        """
+        context = super().get_context_data(**kwargs)
+        if self.request.user.is_authenticated:
+            context["dashboard"], context["dashboard_timings"] = build_dashboard()
+        return context
+
+    def render_to_response(self, context, **response_kwargs):
+        """
+        Render the page with the dashboard timings in a Server-Timing header.
+
+        Args:
+            context: Template context
+            response_kwargs: Keyword arguments for the response
+
+        Returns:
+            Response rendering the page
+        """
+        response = super().render_to_response(context, **response_kwargs)
+        if "dashboard_timings" in context:
+            response["Server-Timing"] = server_timing(context["dashboard_timings"])
+        return response
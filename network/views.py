@@ -6,11 +6,14 @@ from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
 from django.views import generic
 
+from api.etags import versioned_condition
 from network.models import (
     AdditionalAnsibleGroup,
     AnsibleDeviceConfiguration,
     Application,
     Device,
+    DeviceType,
+    DomainName,
     OperatingSystem,
     Website,
 )
@@ -249,6 +252,7 @@ def hosts_zip(request) -> HttpResponse:
     return HttpResponse(content_type="text/plain", content=output)
 
 
+@versioned_condition(Device, DomainName, Website)
 def network(request) -> JsonResponse:
     """
     Create and output the node map as a JSON response.
@@ -313,6 +317,7 @@ def rack(request) -> HttpResponse:
     return render(request, "network/rack.html", {})
 
 
+@versioned_condition(Device, DeviceType)
 def rack_json(request) -> JsonResponse:
     """
     Handle the Rack json.